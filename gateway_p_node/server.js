@@ -74,14 +74,124 @@ app.get("/api/content", (req, res) => {
   const type = req.query.type || "all";
   const limit = parseInt(req.query.limit || "20", 10);
   const genre = req.query.genre || "";
+  const page_token = req.query.pageToken || "";
+  const sort_by = req.query.sortBy || "";
+  const order = req.query.order || "";
+  const fields = req.query.fields ? req.query.fields.split(",") : [];
+  // ETag = catalog_version do Service A; If-None-Match vira if_version
+  const if_version = (req.get("If-None-Match") || "").split(",")[0].trim().replace(/^W\//, "").replace(/"/g, "");
   
   const start = process.hrtime.bigint();
-  clientA.GetContent({ type, limit, genre }, (err, response) => {
+  clientA.GetContent({ type, limit, genre, page_token, sort_by, order, fields, if_version }, (err, response) => {
     const duration = Number(process.hrtime.bigint() - start) / 1e9;
     const status = err ? "error" : "success";
     grpcRequestDuration.labels("ServiceA", "GetContent", status).observe(duration);
     grpcRequestsTotal.labels("ServiceA", "GetContent", status).inc();
     
+    if (err) return res.status(500).json({ error: err.message });
+    if (response.catalog_version) res.set("ETag", `"${response.catalog_version}"`);
+    if (response.not_modified) return res.status(304).end();
+    // Com projeção, omite os campos não pedidos (o loader preenche valores padrão)
+    const items = fields.length
+      ? response.items.map((item) => Object.fromEntries(fields.map((f) => [f, item[f]])))
+      : response.items;
+    res.json({
+      items,
+      total: response.total,
+      nextPageToken: response.next_page_token,
+      catalogVersion: response.catalog_version,
+      source: "ServiceA"
+    });
+  });
+});
+
+// Catálogo completo via StreamContent: repassa cada bloco como NDJSON (um
+// item por linha) sem acumular a resposta inteira em memória
+app.get("/api/content/stream", (req, res) => {
+  const type = req.query.type || "all";
+  const limit = parseInt(req.query.limit || "0", 10);
+  const genre = req.query.genre || "";
+  const page_token = req.query.pageToken || "";
+  
+  const start = process.hrtime.bigint();
+  const call = clientA.StreamContent({ type, limit, genre, page_token });
+  res.setHeader("Content-Type", "application/x-ndjson");
+  
+  call.on("data", (chunk) => {
+    const lines = chunk.items.map((item) => JSON.stringify(item)).join("\n") + "\n";
+    // Respeita o backpressure do cliente HTTP: pausa o stream gRPC até drenar
+    if (!res.write(lines)) {
+      call.pause();
+      res.once("drain", () => call.resume());
+    }
+  });
+  
+  call.on("error", (err) => {
+    const duration = Number(process.hrtime.bigint() - start) / 1e9;
+    grpcRequestDuration.labels("ServiceA", "StreamContent", "error").observe(duration);
+    grpcRequestsTotal.labels("ServiceA", "StreamContent", "error").inc();
+    if (!res.headersSent) return res.status(500).json({ error: err.message });
+    res.end();
+  });
+  
+  call.on("end", () => {
+    const duration = Number(process.hrtime.bigint() - start) / 1e9;
+    grpcRequestDuration.labels("ServiceA", "StreamContent", "success").observe(duration);
+    grpcRequestsTotal.labels("ServiceA", "StreamContent", "success").inc();
+    res.end();
+  });
+  
+  // Cliente desconectou antes do fim: cancela a chamada no Service A
+  res.on("close", () => {
+    if (!res.writableFinished) call.cancel();
+  });
+});
+
+// Página inicial: todas as prateleiras numa única chamada ao Service A
+// (GetContentBatch), em vez de um GetContent por prateleira
+app.get("/api/home", (req, res) => {
+  const limit = parseInt(req.query.limit || "10", 10);
+  const genre = req.query.genre || "Drama";
+  const shelves = [
+    { name: "movies", query: { type: "movie", limit, genre: "" } },
+    { name: "series", query: { type: "series", limit, genre: "" } },
+    { name: "live", query: { type: "live", limit, genre: "" } },
+    { name: `genre:${genre}`, query: { type: "all", limit, genre } },
+  ];
+  
+  const start = process.hrtime.bigint();
+  clientA.GetContentBatch({ queries: shelves.map((s) => s.query) }, (err, response) => {
+    const duration = Number(process.hrtime.bigint() - start) / 1e9;
+    const status = err ? "error" : "success";
+    grpcRequestDuration.labels("ServiceA", "GetContentBatch", status).observe(duration);
+    grpcRequestsTotal.labels("ServiceA", "GetContentBatch", status).inc();
+    
+    if (err) return res.status(500).json({ error: err.message });
+    res.json({
+      shelves: shelves.map((shelf, i) => ({
+        name: shelf.name,
+        items: response.responses[i].items,
+        total: response.responses[i].total
+      })),
+      source: "ServiceA"
+    });
+  });
+});
+
+// Busca textual no catálogo via Service A (SearchContent)
+app.get("/api/search", (req, res) => {
+  const query = req.query.q || "";
+  const limit = parseInt(req.query.limit || "10", 10);
+  const prefix = req.query.prefix === "true";
+  const type = req.query.type || "";
+  
+  const start = process.hrtime.bigint();
+  clientA.SearchContent({ query, limit, prefix, type }, (err, response) => {
+    const duration = Number(process.hrtime.bigint() - start) / 1e9;
+    const status = err ? "error" : "success";
+    grpcRequestDuration.labels("ServiceA", "SearchContent", status).observe(duration);
+    grpcRequestsTotal.labels("ServiceA", "SearchContent", status).inc();
+    
     if (err) return res.status(500).json({ error: err.message });
     res.json({
       items: response.items,
@@ -91,34 +201,61 @@ app.get("/api/content", (req, res) => {
   });
 });
 
+// Contagens por tipo, gênero e ano para a barra de filtros (GetFacets)
+app.get("/api/facets", (req, res) => {
+  const type = req.query.type || "all";
+  const genre = req.query.genre || "";
+  
+  const start = process.hrtime.bigint();
+  clientA.GetFacets({ type, genre }, (err, response) => {
+    const duration = Number(process.hrtime.bigint() - start) / 1e9;
+    const status = err ? "error" : "success";
+    grpcRequestDuration.labels("ServiceA", "GetFacets", status).observe(duration);
+    grpcRequestsTotal.labels("ServiceA", "GetFacets", status).inc();
+    
+    if (err) return res.status(500).json({ error: err.message });
+    res.json({
+      total: response.total,
+      types: response.types,
+      genres: response.genres,
+      years: response.years,
+      catalogVersion: response.catalog_version,
+      source: "ServiceA"
+    });
+  });
+});
+
 // API de metadados: obt\u00e9m recomenda\u00e7\u00f5es do Service B via streaming
 app.get("/api/metadata/:contentId", (req, res) => {
   const contentId = req.params.contentId;
   const userId = req.query.userId || "guest";
   
   const start = process.hrtime.bigint();
-  const call = clientB.StreamMetadata({ content_id: contentId, user_id: userId });
+  // Itens chegam em lotes (MetadataBatch): menos mensagens por stream
+  const call = clientB.StreamMetadataBatched({ content_id: contentId, user_id: userId });
   const metadata = [];
   
-  call.on("data", (item) => {
-    metadata.push({
-      key: item.key,
-      value: item.value,
-      relevanceScore: item.relevance_score
-    });
+  call.on("data", (batch) => {
+    for (const item of batch.items) {
+      metadata.push({
+        key: item.key,
+        value: item.value,
+        relevanceScore: item.relevance_score
+      });
+    }
   });
   
   call.on("error", (err) => {
     const duration = Number(process.hrtime.bigint() - start) / 1e9;
-    grpcRequestDuration.labels("ServiceB", "StreamMetadata", "error").observe(duration);
-    grpcRequestsTotal.labels("ServiceB", "StreamMetadata", "error").inc();
+    grpcRequestDuration.labels("ServiceB", "StreamMetadataBatched", "error").observe(duration);
+    grpcRequestsTotal.labels("ServiceB", "StreamMetadataBatched", "error").inc();
     res.status(500).json({ error: err.message });
   });
   
   call.on("end", () => {
     const duration = Number(process.hrtime.bigint() - start) / 1e9;
-    grpcRequestDuration.labels("ServiceB", "StreamMetadata", "success").observe(duration);
-    grpcRequestsTotal.labels("ServiceB", "StreamMetadata", "success").inc();
+    grpcRequestDuration.labels("ServiceB", "StreamMetadataBatched", "success").observe(duration);
+    grpcRequestsTotal.labels("ServiceB", "StreamMetadataBatched", "success").inc();
     res.json({
       contentId,
       metadata,
@@ -146,25 +283,29 @@ app.get("/api/browse", async (req, res) => {
     // Se houver itens, busca metadados do primeiro via Service B
     if (catalogResponse.items.length > 0) {
       const firstItem = catalogResponse.items[0];
-      const metaCall = clientB.StreamMetadata({ 
+      const metaCall = clientB.StreamMetadataBatched({ 
         content_id: firstItem.id, 
         user_id: "guest" 
       });
       const metadata = [];
       
-      metaCall.on("data", (item) => metadata.push({
-        key: item.key,
-        value: item.value,
-        relevanceScore: item.relevance_score
-      }));
+      metaCall.on("data", (batch) => {
+        for (const item of batch.items) {
+          metadata.push({
+            key: item.key,
+            value: item.value,
+            relevanceScore: item.relevance_score
+          });
+        }
+      });
       
       metaCall.on("error", (err) => {
-        grpcRequestsTotal.labels("ServiceB", "StreamMetadata", "error").inc();
+        grpcRequestsTotal.labels("ServiceB", "StreamMetadataBatched", "error").inc();
       });
       
       metaCall.on("end", () => {
         const duration = Number(process.hrtime.bigint() - start) / 1e9;
-        grpcRequestsTotal.labels("ServiceB", "StreamMetadata", "success").inc();
+        grpcRequestsTotal.labels("ServiceB", "StreamMetadataBatched", "success").inc();
         httpRequestDuration.labels("GET", "/api/browse", 200).observe(duration);
         
         res.json({
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark do filtro de catálogo do Service A: varredura linear (implementação
+original) vs índice invertido (tipo, gênero) com interseção de listas.
+
+Mede p50/p99 por consulta com o catálogo crescendo de 10^3 a 10^6 itens.
+
+Uso: python scripts/bench_catalog_index.py [--sizes 1000,10000,100000,1000000]
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "services" / "a_py"))
+
+from catalog import CatalogIndex  # noqa: E402
+
+TYPES = ["movie", "series", "live"]
+GENRES = [
+    "Ação", "Aventura", "Comédia", "Crime", "Drama", "Entretenimento", "Esportes",
+    "Família", "Ficção Científica", "Notícias", "Romance", "Sobrenatural", "Suspense",
+    "Thriller", "Terror", "Documentário", "Animação", "Musical", "Fantasia", "Guerra",
+]
+
+# (tipo, gênero, limite) no formato enviado pelo gateway
+QUERIES = [
+    ("all", "", 20),
+    ("movie", "", 20),
+    ("series", "Drama", 10),
+    ("movie", "Terror", 20),
+    ("live", "Esportes", 0),
+]
+
+
+# Vocabulário para títulos e descrições sintéticos (com acentos, como o catálogo real)
+WORDS = (
+    "jornada infinita segredos passado risadas cidade último guardião dimensões paralelas "
+    "sombria família moderna império crime canal notícias esportes aventura épica galáxias "
+    "thriller psicológico memórias esquecidas comédia romântica metrópole agitada guerreiro "
+    "esperança humanidade cientistas portal realidades alternativas detetives sobrenaturais "
+    "brasileira contemporânea ascensão sindicato organizado entretenimento transmissões "
+    "coração sertão amazônia oceano estrela noite verão inverno herói vilão mistério "
+    "floresta cavaleiro dragão reino perdido tempo viagem futuro robô máquina memória "
+    "destino vingança amor amizade liberdade revolução silêncio tempestade fogo gelo"
+).split()
+
+
+def synthetic_catalog(size, seed=42):
+    """Gera um catálogo sintético com a mesma forma do CONTENT_CATALOG"""
+    rng = random.Random(seed)
+    catalog = []
+    for i in range(size):
+        content_type = rng.choice(TYPES)
+        catalog.append({
+            "id": f"{content_type[0]}{i}",
+            "title": " ".join(rng.sample(WORDS, rng.randint(2, 4))).title(),
+            "description": " ".join(rng.sample(WORDS, rng.randint(6, 12))).capitalize(),
+            "type": content_type,
+            "genres": rng.sample(GENRES, rng.randint(1, 3)),
+            "year": rng.randint(1980, 2024),
+            "rating": round(rng.uniform(5.0, 9.9), 1),
+            "duration": "1h 30min",
+        })
+    return catalog
+
+
+def linear_scan(catalog, content_type, genre, limit):
+    """Filtro original: duas varreduras completas do catálogo"""
+    filtered = catalog if content_type == "all" else [
+        c for c in catalog if c["type"] == content_type
+    ]
+    if genre:
+        filtered = [c for c in filtered if genre in c["genres"]]
+    limit = limit if limit > 0 else len(filtered)
+    return filtered[:limit]
+
+
+def measure(fn, rounds):
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    p50 = statistics.median(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    return p50 * 1e6, p99 * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000")
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",")]
+    print(f"{'itens':>9} {'consulta':<24} {'scan p50':>11} {'scan p99':>11} {'índice p50':>11} {'índice p99':>11}  (µs)")
+    for size in sizes:
+        catalog = synthetic_catalog(size)
+        index = CatalogIndex(catalog)
+        # Varredura em catálogos grandes é lenta; reduz as rodadas para não demorar minutos
+        scan_rounds = max(5, min(args.rounds, 2_000_000 // size))
+        for content_type, genre, limit in QUERIES:
+            expected = linear_scan(catalog, content_type, genre, limit)
+            assert index.query(content_type, genre, limit) == expected
+            scan = measure(lambda: linear_scan(catalog, content_type, genre, limit), scan_rounds)
+            indexed = measure(lambda: index.query(content_type, genre, limit), args.rounds)
+            label = f"{content_type}/{genre or '-'}/{limit}"
+            print(f"{size:>9} {label:<24} {scan[0]:>11.1f} {scan[1]:>11.1f} {indexed[0]:>11.1f} {indexed[1]:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark de memória das representações do catálogo do Service A.
+
+Grava um catálogo sintético em JSONL e, para cada backend, carrega-o num
+processo novo e mede o RSS (MiB por milhão de itens) só dos itens e dos
+itens + índices (CatalogIndex, incluindo a busca textual), o pico de RSS da
+carga e o custo de materializar uma página de 20 itens:
+
+- dicts:    lista de dicionários (layout do CONTENT_CATALOG)
+- mmap:     MappedCatalogFile (JSONL mapeado, decodificado sob demanda)
+- columnar: ColumnarCatalog (colunas, códigos internados, buffer de texto)
+
+O limite de memória do pod está em k8s/a.yaml (256Mi).
+
+Uso: python scripts/bench_catalog_memory.py [--size 1000000] [--backends dicts,mmap,columnar]
+"""
+
+import argparse
+import gc
+import json
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPTS_DIR))
+sys.path.insert(0, str(SCRIPTS_DIR.parent / "services" / "a_py"))
+
+from bench_catalog_index import measure, synthetic_catalog  # noqa: E402
+from catalog import CatalogFileReader, CatalogIndex, MappedCatalogFile, write_catalog_file  # noqa: E402
+from columnar import ColumnarCatalog  # noqa: E402
+
+MIB = 1024 * 1024
+
+
+def rss(field="VmRSS"):
+    """RSS atual (VmRSS) ou pico de RSS (VmHWM) do processo, em bytes (Linux)"""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) * 1024
+    raise RuntimeError(f"{field} not found in /proc/self/status")
+
+
+def load_items(backend, path):
+    if backend == "dicts":
+        with open(path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+    if backend == "mmap":
+        return MappedCatalogFile(path)
+    return ColumnarCatalog(CatalogFileReader(path))
+
+
+def child(backend, path):
+    """Executado num processo próprio: imprime as medidas em JSON"""
+    gc.collect()
+    base = rss()
+    start = time.perf_counter()
+    items = load_items(backend, path)
+    gc.collect()
+    items_rss = rss() - base
+    index = CatalogIndex(items)
+    load_time = time.perf_counter() - start
+    gc.collect()
+    total_rss = rss() - base
+
+    rng = random.Random(1)
+    pages = [rng.sample(range(len(index)), 20) for _ in range(200)]
+    it = iter(pages * 2)
+    page = measure(lambda: [index.items[pos] for pos in next(it)], len(pages))
+    print(json.dumps({
+        "items": items_rss,
+        "total": total_rss,
+        "peak": rss("VmHWM") - base,
+        "load": load_time,
+        "page_p50": page[0],
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=1_000_000)
+    parser.add_argument("--backends", default="dicts,mmap,columnar")
+    parser.add_argument("--child", nargs=2, metavar=("BACKEND", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child)
+        return
+
+    per_million = 1_000_000 / args.size
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "catalog.jsonl")
+        write_catalog_file(synthetic_catalog(args.size), path)
+        print(f"{args.size} itens; MiB por milhão de itens")
+        print(f"{'backend':<10} {'itens':>8} {'+índices':>9} {'pico':>8} {'carga (s)':>10} {'página 20 (µs)':>15}")
+        for backend in args.backends.split(","):
+            out = subprocess.run(
+                [sys.executable, __file__, "--child", backend, path],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            r = json.loads(out)
+            print(f"{backend:<10} {r['items'] / MIB * per_million:>8.1f} {r['total'] / MIB * per_million:>9.1f} "
+                  f"{r['peak'] / MIB * per_million:>8.1f} {r['load']:>10.1f} {r['page_p50']:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Benchmark da compressão das respostas de /api/content no a_rest, por
+tamanho de resposta e algoritmo:
+
+- bytes e taxa de compressão de cada algoritmo (gzip e deflate, nível 6,
+  o mesmo do a_rest);
+- sob demanda: custo de comprimir o corpo a cada requisição;
+- cache: custo de servir a variante já comprimida (hit do cache de
+  respostas comprimidas), que só paga a compressão no primeiro acesso.
+
+O Service A gRPC usa os mesmos algoritmos (via grpc-encoding), com a
+compressão feita pelo gRPC a cada mensagem.
+
+Uso: python scripts/bench_compression.py [--sizes 20,100,1000] [--rounds 300]
+"""
+
+import argparse
+import gzip
+import zlib
+
+from fastapi import Response
+
+from bench_catalog_index import measure, synthetic_catalog
+from bench_json_responses import dumps_stdlib, pre_encoded_body
+
+LEVEL = 6
+COMPRESSORS = {
+    "gzip": lambda body: gzip.compress(body, LEVEL, mtime=0),
+    "deflate": lambda body: zlib.compress(body, LEVEL),
+}
+
+
+def encoded_response(body, encoding):
+    return Response(body, media_type="application/json", headers={"Content-Encoding": encoding})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="20,100,1000")
+    parser.add_argument("--rounds", type=int, default=300)
+    args = parser.parse_args()
+
+    print(f"{'itens':>6} {'algoritmo':<9} {'bytes':>9} {'comprimido':>11} {'taxa':>6} "
+          f"{'sob demanda p50 (µs)':>21} {'cache p50 (µs)':>15}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        body = pre_encoded_body([dumps_stdlib(row) for row in synthetic_catalog(size)])
+        for encoding, compress in COMPRESSORS.items():
+            cached = compress(body)
+            on_demand, _ = measure(lambda: encoded_response(compress(body), encoding), args.rounds)
+            hit, _ = measure(lambda: encoded_response(cached, encoding), args.rounds)
+            print(f"{size:>6} {encoding:<9} {len(body):>9} {len(cached):>11} {len(cached) / len(body):>6.0%} "
+                  f"{on_demand:>21.1f} {hit:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark do custo de serialização das respostas de /api/content no a_rest,
+por tamanho de resposta:
+
+- json: lista de dicts codificada a cada requisição pelo JSONResponse (o
+  caminho original);
+- orjson: a mesma lista de dicts codificada com orjson (JSON_BACKEND=orjson);
+- pré-codificado: corpo montado juntando os bytes de cada item, codificados
+  uma única vez (o que o a_rest faz num miss do cache de respostas);
+- cache: corpo inteiro já pronto (hit do cache de respostas).
+
+Todos produzem os mesmos bytes; o tempo inclui a criação do Response.
+
+Uso: python scripts/bench_json_responses.py [--sizes 20,100,1000] [--rounds 500]
+"""
+
+import argparse
+import json
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+
+from bench_catalog_index import measure, synthetic_catalog
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+CATALOG_VERSION = "0123456789abcdef"
+
+
+def dumps_stdlib(content):
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dict_response(rows):
+    return JSONResponse({"items": rows, "total": len(rows), "catalogVersion": CATALOG_VERSION, "source": "A-REST"})
+
+
+def orjson_response(rows):
+    content = {"items": rows, "total": len(rows), "catalogVersion": CATALOG_VERSION, "source": "A-REST"}
+    return Response(orjson.dumps(content), media_type="application/json")
+
+
+def pre_encoded_body(item_json):
+    return (b'{"items":[' + b",".join(item_json) + b'],"total":' + str(len(item_json)).encode()
+            + b',"catalogVersion":' + dumps_stdlib(CATALOG_VERSION) + b',"source":"A-REST"}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="20,100,1000")
+    parser.add_argument("--rounds", type=int, default=500)
+    args = parser.parse_args()
+
+    print(f"{'itens':>6} {'caminho':<15} {'bytes':>9} {'p50 (µs)':>10} {'p99 (µs)':>10} {'x json':>8}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        rows = synthetic_catalog(size)
+        item_json = [dumps_stdlib(row) for row in rows]
+        cached = pre_encoded_body(item_json)
+        variants = [("json", lambda: dict_response(rows))]
+        if orjson is not None:
+            variants.append(("orjson", lambda: orjson_response(rows)))
+        variants += [
+            ("pré-codificado", lambda: Response(pre_encoded_body(item_json), media_type="application/json")),
+            ("cache", lambda: Response(cached, media_type="application/json")),
+        ]
+        baseline = None
+        for label, build in variants:
+            body = build().body
+            assert body == cached, label
+            p50, p99 = measure(build, args.rounds)
+            baseline = baseline or p50
+            print(f"{size:>6} {label:<15} {len(body):>9} {p50:>10.1f} {p99:>10.1f} {baseline / p50:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark do agrupamento de itens no stream de metadados do Service B.
+
+Sobe o server.py do Service B (SERVER_MODE=aio, PROCESSING_DELAY=0) com um
+catálogo sintético e listas grandes de recomendações (RECOMMENDATIONS), e
+compara o StreamMetadata (uma mensagem por item) com o StreamMetadataBatched
+em lotes de 1, 8 e 64 itens. Os streams vêm do cache de resultados,
+aquecido antes da medição, então o que se mede é o custo de serialização e
+enquadramento de cada mensagem. Reporta mensagens/s, itens/s e bytes/s
+(payload protobuf + 5 bytes de prefixo gRPC por mensagem).
+
+Requer os stubs gerados em services/b_py/proto (ver Dockerfile).
+
+Uso: python scripts/bench_metadata_batches.py [--batches 1,8,64] [--recommendations 500] [--streams 2000]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_catalog_index import synthetic_catalog
+from bench_workers import SERVICE_DIRS, free_port, wait_for_port
+
+sys.path.insert(0, str(SERVICE_DIRS["b"]))
+
+import grpc  # noqa: E402
+from proto import services_pb2, services_pb2_grpc  # noqa: E402
+
+# Prefixo de cada mensagem gRPC: flag de compressão + tamanho (4 bytes)
+GRPC_MESSAGE_PREFIX = 5
+
+
+def stream_call(stub, batch):
+    """Chamada do stream: batch 0 = StreamMetadata, um item por mensagem"""
+    request = services_pb2.MetadataRequest(content_id="m1", user_id="bench", batch_size=batch)
+    if batch == 0:
+        return stub.StreamMetadata(request)
+    return stub.StreamMetadataBatched(request)
+
+
+async def measure(port, batch, streams, concurrency):
+    async with grpc.aio.insecure_channel(f"127.0.0.1:{port}") as channel:
+        stub = services_pb2_grpc.ServiceBStub(channel)
+        # Aquece o cache e mede o tamanho de um stream (é sempre o mesmo)
+        messages = [m async for m in stream_call(stub, batch)]
+        items = sum(len(m.items) for m in messages) if batch else len(messages)
+        payload = sum(m.ByteSize() + GRPC_MESSAGE_PREFIX for m in messages)
+
+        pending = iter(range(streams))
+
+        async def worker():
+            for _ in pending:
+                async for _ in stream_call(stub, batch):
+                    pass
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.perf_counter() - start
+    return len(messages), items, payload, wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batches", default="1,8,64", help="itens por MetadataBatch")
+    parser.add_argument("--recommendations", type=int, default=500)
+    parser.add_argument("--catalog-size", type=int, default=20000)
+    parser.add_argument("--streams", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16, help="streams abertos ao mesmo tempo")
+    args = parser.parse_args()
+
+    with tempfile.NamedTemporaryFile("w", suffix=".jsonl", encoding="utf-8") as catalog:
+        items = synthetic_catalog(args.catalog_size)
+        items[0]["id"] = "m1"
+        for item in items:
+            catalog.write(json.dumps(item, ensure_ascii=False) + "\n")
+        catalog.flush()
+
+        port, metrics_port = free_port(), free_port()
+        env = dict(os.environ, SERVER_MODE="aio", PORT=str(port), METRICS_PORT=str(metrics_port),
+                   WORKERS="1", PROCESSING_DELAY="0", CATALOG_PATH=catalog.name,
+                   RECOMMENDATIONS=str(args.recommendations))
+        env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+        server = subprocess.Popen(
+            [sys.executable, "server.py"], cwd=SERVICE_DIRS["b"], env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_for_port(port, timeout=60)
+            print(f"{args.recommendations} recomendações | {args.streams} streams, {args.concurrency} simultâneos")
+            print(f"{'lote':<14} {'msgs/stream':>11} {'streams/s':>10} {'msgs/s':>10} {'itens/s':>10} {'MB/s':>8}")
+            for batch in [0] + [int(b) for b in args.batches.split(",")]:
+                messages, count, payload, wall = asyncio.run(measure(port, batch, args.streams, args.concurrency))
+                rate = args.streams / wall
+                label = "sem lote" if batch == 0 else f"{batch}"
+                print(f"{label:<14} {messages:>11} {rate:>10.0f} {messages * rate:>10.0f} "
+                      f"{count * rate:>10.0f} {payload * rate / 1e6:>8.1f}")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
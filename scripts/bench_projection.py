@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Benchmark de projeção de campos (ContentRequest.fields / ?fields= no a_rest):
+tamanho do payload e custo de construir + serializar uma resposta com a
+projeção de listagem (id, title, thumbnail, rating) vs. o item completo, em
+protobuf (Service A) e JSON (a_rest).
+
+Requer os stubs gerados em services/a_py/proto (ver Dockerfile).
+
+Uso: python scripts/bench_projection.py [--sizes 20,100,1000]
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "services" / "a_py"))
+
+from bench_catalog_index import measure, synthetic_catalog  # noqa: E402
+from proto import services_pb2  # noqa: E402
+from server import build_content_item, parse_fields  # noqa: E402
+
+LIST_VIEW = ["id", "title", "thumbnail", "rating"]
+
+
+def protobuf_response(rows, fields):
+    items = [build_content_item(c, fields) for c in rows]
+    return services_pb2.ContentResponse(items=items, total=len(items)).SerializeToString()
+
+
+def json_response(rows, fields):
+    if fields:
+        rows = [{f: c[f] for f in fields if f in c} for c in rows]
+    return json.dumps({"items": rows, "total": len(rows), "source": "A-REST"}).encode("utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="20,100,1000")
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'itens':>6} {'formato':<9} {'projeção':<9} {'bytes':>9} {'p50 (µs)':>10} {'p99 (µs)':>10}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        rows = synthetic_catalog(size)
+        for fmt, encode in (("protobuf", protobuf_response), ("json", json_response)):
+            for label, fields in (("completa", ()), ("listagem", parse_fields(LIST_VIEW))):
+                payload = encode(rows, fields)
+                p50, p99 = measure(lambda: encode(rows, fields), args.rounds)
+                print(f"{size:>6} {fmt:<9} {label:<9} {len(payload):>9} {p50:>10.1f} {p99:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark do motor de recomendações do Service B (services/b_py/recommender.py).
+
+Para catálogos sintéticos de 10^4 a 10^6 itens mede o tempo de construção,
+o número de assinaturas distintas (vetores na matriz) e p50/p99 por
+consulta de:
+
+- ingênuo: produto com o embedding de todos os itens + argpartition
+- recommend: produto sobre as assinaturas (anônimo e com perfil)
+- lote 8 / 64: recommend_batch, custo por consulta
+
+Uso: python scripts/bench_recommender.py [--sizes 10000,100000,1000000] [--k 5]
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPTS_DIR))
+sys.path.insert(0, str(SCRIPTS_DIR.parent / "services" / "b_py"))
+
+from bench_catalog_index import measure, synthetic_catalog  # noqa: E402
+from recommender import Recommender  # noqa: E402
+
+
+def measure_naive(rec, ids, k, rounds):
+    """Referência: um vetor por item, pontuando todos a cada consulta (a
+    matriz completa só existe durante esta medição)"""
+    item_vectors = rec.signature_vectors[rec.item_signature]
+
+    def naive():
+        pos = rec.position(next(ids))
+        scores = item_vectors @ rec.query_vector(pos, "")
+        top = np.argpartition(-scores, k)[:k + 1]
+        return top[np.argsort(-scores[top])]
+
+    return measure(naive, rounds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'itens':>9} {'constr. (s)':>11} {'assinat.':>9} {'consulta':<12} {'p50 (µs)':>10} {'p99 (µs)':>10}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        items = synthetic_catalog(size)
+        start = time.perf_counter()
+        rec = Recommender(items)
+        build = time.perf_counter() - start
+        rng = random.Random(7)
+        ids = [items[rng.randrange(size)]["id"] for _ in range(args.rounds * 64)]
+        for content_id in ids[:50]:
+            rec.observe(content_id, "user-1")
+        it = iter(ids)
+
+        results = [
+            ("ingênuo", measure_naive(rec, it, args.k, min(args.rounds, 50))),
+            ("anônimo", measure(lambda: rec.recommend(next(it), "", args.k), args.rounds)),
+            ("perfil", measure(lambda: rec.recommend(next(it), "user-1", args.k), args.rounds)),
+        ]
+        for batch in (8, 64):
+            rounds = max(5, args.rounds // batch * 4)
+            p50, p99 = measure(lambda: rec.recommend_batch([(next(it), "user-1") for _ in range(batch)], args.k), rounds)
+            results.append((f"lote {batch}", (p50 / batch, p99 / batch)))
+            it = iter(ids)
+
+        for label, (p50, p99) in results:
+            print(f"{size:>9} {build:>11.1f} {len(rec.signature_vectors):>9} {label:<12} {p50:>10.0f} {p99:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Benchmark da busca textual do Service A (SearchContent) sobre catálogos
+sintéticos de 10^4 a 10^6 itens: p50/p99 por consulta para termos únicos,
+múltiplos termos e prefixo (type-ahead), com e sem filtro de tipo.
+
+Uso: python scripts/bench_search.py [--sizes 10000,100000,1000000]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "services" / "a_py"))
+
+from bench_catalog_index import measure, synthetic_catalog  # noqa: E402
+from postings import to_bitmap  # noqa: E402
+from search import SearchIndex  # noqa: E402
+
+# (consulta, prefixo, tipo)
+QUERIES = [
+    ("dragão", False, ""),
+    ("Ação", False, ""),
+    ("jornada infinita", False, ""),
+    ("cidade sombria noite", False, ""),
+    ("dra", True, ""),
+    ("guardião esp", True, ""),
+    ("memória", False, "series"),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'itens':>9} {'consulta':<28} {'p50 (µs)':>10} {'p99 (µs)':>10}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        catalog = synthetic_catalog(size)
+        start = time.perf_counter()
+        index = SearchIndex(catalog)
+        print(f"{size:>9} {'(construção do índice)':<28} {(time.perf_counter() - start) * 1e6:>10.0f}")
+        by_type = {}
+        for pos, item in enumerate(catalog):
+            by_type.setdefault(item["type"], []).append(pos)
+        type_bitmaps = {content_type: to_bitmap(positions, size) for content_type, positions in by_type.items()}
+        for query, prefix, content_type in QUERIES:
+            allowed = by_type.get(content_type) if content_type else None
+            allowed_bitmap = type_bitmaps.get(content_type) if content_type else None
+            p50, p99 = measure(lambda: index.search(query, args.limit, prefix, allowed, allowed_bitmap), args.rounds)
+            label = f"{query}{'*' if prefix else ''}{' [' + content_type + ']' if content_type else ''}"
+            print(f"{size:>9} {label:<28} {p50:>10.1f} {p99:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
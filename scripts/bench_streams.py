@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Benchmark de streams simultâneos por pod no StreamMetadata do Service B.
+
+Para cada modo (SERVER_MODE=thread e aio) sobe o server.py do Service B,
+abre N streams ao mesmo tempo a partir de um cliente grpc.aio e reporta:
+pico de streams abertos no servidor (métrica grpc_server_active_streams),
+tempo total, streams/s, latência p50/p99 por stream, erros e pico de RSS
+do servidor.
+
+No modo thread cada stream ocupa uma das 10 threads do executor enquanto
+dorme entre os itens; no modo aio cada stream é uma corrotina suspensa.
+`--delay` (PROCESSING_DELAY do servidor) controla quanto tempo cada stream
+fica aberto; streams que não terminam em `--timeout` contam como erro.
+
+Requer os stubs gerados em services/b_py/proto (ver Dockerfile).
+
+Uso: python scripts/bench_streams.py [--modes thread,aio] [--streams 1000,20000] [--delay 2] [--timeout 60]
+"""
+
+import argparse
+import asyncio
+import os
+import re
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+from bench_workers import SERVICE_DIRS, free_port, wait_for_port
+
+sys.path.insert(0, str(SERVICE_DIRS["b"]))
+
+import grpc  # noqa: E402
+from proto import services_pb2, services_pb2_grpc  # noqa: E402
+
+ACTIVE_RE = re.compile(r'^grpc_server_active_streams\{method="StreamMetadata"\} (\S+)$', re.M)
+
+
+def active_streams(metrics_port):
+    with urllib.request.urlopen(f"http://127.0.0.1:{metrics_port}/metrics", timeout=5) as r:
+        match = ACTIVE_RE.search(r.read().decode())
+    return int(float(match.group(1))) if match else 0
+
+
+def peak_rss_mib(pid):
+    for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+        if line.startswith("VmHWM:"):
+            return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+async def open_streams(port, metrics_port, streams, channels, timeout):
+    chans = [
+        grpc.aio.insecure_channel(f"127.0.0.1:{port}", options=[("grpc.use_local_subchannel_pool", 1)])
+        for _ in range(channels)
+    ]
+    stubs = [services_pb2_grpc.ServiceBStub(ch) for ch in chans]
+    latencies, errors = [], 0
+    peak = 0
+    done = asyncio.Event()
+
+    async def sample():
+        nonlocal peak
+        while not done.is_set():
+            peak = max(peak, await asyncio.to_thread(active_streams, metrics_port))
+            await asyncio.sleep(0.05)
+
+    async def one(i):
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            call = stubs[i % len(stubs)].StreamMetadata(services_pb2.MetadataRequest(content_id="m1"), timeout=timeout)
+            async for _ in call:
+                pass
+            latencies.append(time.perf_counter() - start)
+        except grpc.aio.AioRpcError:
+            errors += 1
+
+    sampler = asyncio.create_task(sample())
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(streams)))
+    wall = time.perf_counter() - start
+    done.set()
+    await sampler
+    for ch in chans:
+        await ch.close()
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] if latencies else float("nan")
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] if latencies else float("nan")
+    return peak, wall, p50, p99, errors
+
+
+def run(mode, streams, channels, delay, timeout):
+    port, metrics_port = free_port(), free_port()
+    env = dict(os.environ, SERVER_MODE=mode, PORT=str(port), METRICS_PORT=str(metrics_port),
+               MAX_CONCURRENT_RPCS="0", WORKERS="1", PROCESSING_DELAY=str(delay))
+    env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    server = subprocess.Popen(
+        [sys.executable, "server.py"], cwd=SERVICE_DIRS["b"], env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_port(port)
+        wait_for_port(metrics_port)
+        result = asyncio.run(open_streams(port, metrics_port, streams, channels, timeout))
+        return result + (peak_rss_mib(server.pid),)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", default="thread,aio")
+    parser.add_argument("--streams", default="1000,20000", help="streams abertos de uma vez")
+    parser.add_argument("--channels", type=int, default=8, help="conexões HTTP/2 do cliente")
+    parser.add_argument("--delay", type=float, default=2.0, help="PROCESSING_DELAY por item (s)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="deadline de cada stream (s)")
+    args = parser.parse_args()
+
+    print(f"PROCESSING_DELAY={args.delay}s | deadline {args.timeout:.0f}s | {args.channels} conexões")
+    print(f"{'modo':<7} {'streams':>8} {'pico ativos':>12} {'tempo (s)':>10} {'streams/s':>10} "
+          f"{'p50 (ms)':>9} {'p99 (ms)':>9} {'erros':>6} {'RSS (MiB)':>10}")
+    for streams in [int(s) for s in args.streams.split(",")]:
+        for mode in args.modes.split(","):
+            peak, wall, p50, p99, errors, rss = run(mode, streams, args.channels, args.delay, args.timeout)
+            print(f"{mode:<7} {streams:>8} {peak:>12} {wall:>10.2f} {streams / wall:>10.0f} "
+                  f"{p50 * 1e3:>9.0f} {p99 * 1e3:>9.0f} {errors:>6} {rss:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
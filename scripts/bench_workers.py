@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Benchmark de vazão por pod do modo multiprocesso (WORKERS) dos Services A/B.
+
+Para cada quantidade de workers (padrão 1, 2 e 4) sobe o server.py do serviço
+com WORKERS=N, dispara carga a partir de vários processos clientes (cada um
+com conexões próprias, para que o SO_REUSEPORT distribua entre os workers) e
+reporta requisições por segundo.
+
+Requer os stubs gerados em services/<svc>/proto (ver Dockerfile).
+
+Uso: python scripts/bench_workers.py [--service a|b] [--workers 1,2,4] [--duration 10]
+"""
+
+import argparse
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SERVICES_DIR = Path(__file__).resolve().parent.parent / "services"
+SERVICE_DIRS = {"a": SERVICES_DIR / "a_py", "b": SERVICES_DIR / "b_py"}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port, timeout=15.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"servidor não respondeu na porta {port}")
+
+
+def client_loop(service, port, duration, connections, threads, result_queue):
+    """Processo cliente: `connections` canais independentes, `threads` chamadas simultâneas"""
+    import grpc
+    from concurrent import futures
+
+    sys.path.insert(0, str(SERVICE_DIRS[service]))
+    from proto import services_pb2, services_pb2_grpc
+
+    # Subchannel pool local: cada canal abre sua própria conexão TCP
+    channels = [
+        grpc.insecure_channel(f"127.0.0.1:{port}", options=[("grpc.use_local_subchannel_pool", 1)])
+        for _ in range(connections)
+    ]
+    if service == "a":
+        stubs = [services_pb2_grpc.ServiceAStub(ch) for ch in channels]
+        call = lambda stub: stub.GetContent(services_pb2.ContentRequest(type="series", limit=10))
+    else:
+        stubs = [services_pb2_grpc.ServiceBStub(ch) for ch in channels]
+        call = lambda stub: list(stub.StreamMetadata(services_pb2.MetadataRequest(content_id="s1")))
+
+    deadline = time.time() + duration
+
+    def worker(i):
+        stub = stubs[i % len(stubs)]
+        done = 0
+        while time.time() < deadline:
+            call(stub)
+            done += 1
+        return done
+
+    with futures.ThreadPoolExecutor(max_workers=threads) as pool:
+        total = sum(pool.map(worker, range(threads)))
+    result_queue.put(total)
+
+
+def run(service, workers, duration, clients, threads):
+    port, metrics_port = free_port(), free_port()
+    env = dict(os.environ, WORKERS=str(workers), PORT=str(port), METRICS_PORT=str(metrics_port))
+    env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    server = subprocess.Popen(
+        [sys.executable, "server.py"], cwd=SERVICE_DIRS[service], env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_port(port)
+        time.sleep(1.0)  # todos os workers prontos
+        queue = multiprocessing.Queue()
+        procs = [
+            multiprocessing.Process(target=client_loop, args=(service, port, duration, 4, threads, queue))
+            for _ in range(clients)
+        ]
+        for p in procs:
+            p.start()
+        total = sum(queue.get() for _ in procs)
+        for p in procs:
+            p.join()
+        return total / duration
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--service", choices=["a", "b"], default="a")
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--clients", type=int, default=4, help="processos clientes")
+    parser.add_argument("--threads", type=int, default=16, help="chamadas simultâneas por cliente")
+    args = parser.parse_args()
+
+    print(f"Service {args.service.upper()} | {args.clients} clientes x {args.threads} chamadas simultâneas | {args.duration:.0f}s")
+    print(f"{'workers':>8} {'req/s':>10} {'speedup':>8}")
+    baseline = None
+    for workers in [int(w) for w in args.workers.split(",")]:
+        rps = run(args.service, workers, args.duration, args.clients, args.threads)
+        baseline = baseline or rps
+        print(f"{workers:>8} {rps:>10.0f} {rps / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
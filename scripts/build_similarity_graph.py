@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Gera o grafo de similaridade item a item lido pelo Service B (SIMILARITY_GRAPH_PATH).
+
+Lê o catálogo do Service A (o JSONL de CATALOG_PATH, ou o catálogo embutido
+sem --catalog) e grava, para cada item, os N itens mais similares (Jaccard
+ponderado dos gêneros + mesmo tipo + proximidade de ano) num arquivo CSR
+que o Service B mapeia na inicialização. O grafo guarda posições, então
+deve ser regerado sempre que o catálogo mudar; o Service B recusa um grafo
+gerado a partir de outro catálogo. A escrita é atômica (temporário +
+rename).
+
+Uso: python scripts/build_similarity_graph.py graph.bin [--catalog catalog.jsonl] [--neighbours 10]
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "services" / "b_py"))
+
+from recommender import CONTENT_CATALOG, load_catalog_file  # noqa: E402
+from similarity import build_similarity_graph, catalog_digest, write_similarity_graph  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    parser.add_argument("--catalog", help="catálogo JSONL (padrão: catálogo embutido)")
+    parser.add_argument("--neighbours", type=int, default=10, help="vizinhos por item")
+    args = parser.parse_args()
+
+    items = load_catalog_file(args.catalog) if args.catalog else CONTENT_CATALOG
+    start = time.perf_counter()
+    graph = build_similarity_graph(items, args.neighbours)
+    elapsed = time.perf_counter() - start
+    write_similarity_graph(args.path, graph, catalog_digest(items), args.neighbours)
+    size = os.path.getsize(args.path) / 2**20
+    print(f"{len(items)} itens, {len(graph[1])} arestas em {elapsed:.1f}s; {args.path} ({size:.1f} MiB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Gera um arquivo de catálogo JSONL para o Service A (CATALOG_PATH).
+
+Sem --size exporta o catálogo embutido do serviço; com --size gera um catálogo
+sintético com N itens. A escrita é atômica (temporário + rename), então pode
+ser usada para atualizar o arquivo de um servidor em execução, que recarrega
+o catálogo sozinho.
+
+Uso: python scripts/export_catalog.py catalog.jsonl [--size 1000000]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "services" / "a_py"))
+
+from catalog import CONTENT_CATALOG, write_catalog_file  # noqa: E402
+from bench_catalog_index import synthetic_catalog  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    parser.add_argument("--size", type=int, default=0, help="itens sintéticos (0 = catálogo embutido)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    items = synthetic_catalog(args.size, args.seed) if args.size else CONTENT_CATALOG
+    write_catalog_file(items, args.path)
+    print(f"{len(items)} itens gravados em {args.path}")
+
+
+if __name__ == "__main__":
+    main()
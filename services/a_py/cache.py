@@ -0,0 +1,42 @@
+"""Cache LRU limitado, seguro para uso entre threads"""
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Mapa com no máximo `maxsize` entradas; descarta a menos usada.
+
+    `maxsize <= 0` desabilita o cache (toda consulta é miss).
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        """Armazena `value` e retorna quantas entradas foram descartadas"""
+        if self.maxsize <= 0:
+            return 0
+        evicted = 0
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                evicted += 1
+        return evicted
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
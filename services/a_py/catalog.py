@@ -0,0 +1,447 @@
+"""Catálogo de conteúdo do Service A e seus índices em memória"""
+import base64
+import hashlib
+import heapq
+import json
+import mmap
+import os
+import threading
+import time
+from array import array
+from itertools import islice
+
+from collections import Counter
+
+from columnar import ColumnarCatalog
+from facets import FacetIndex
+from postings import intersect_postings, iter_intersection, to_bitmap
+from search import SearchIndex
+
+# Catálogo de conteúdo simulado
+CONTENT_CATALOG = [
+    {"id": "m1", "title": "A Jornada Infinita", "description": "Uma aventura épica através das galáxias",
+     "type": "movie", "genres": ["Ficção Científica", "Aventura"], "year": 2024, "rating": 8.7, "duration": "2h 15min"},
+    {"id": "m2", "title": "Segredos do Passado", "description": "Um thriller psicológico sobre memórias esquecidas",
+     "type": "movie", "genres": ["Thriller", "Drama"], "year": 2024, "rating": 8.2, "duration": "1h 55min"},
+    {"id": "m3", "title": "Risadas na Cidade", "description": "Uma comédia romântica em uma metrópole agitada",
+     "type": "movie", "genres": ["Comédia", "Romance"], "year": 2024, "rating": 7.5, "duration": "1h 45min"},
+    {"id": "m4", "title": "O Último Guardião", "description": "Um guerreiro protege a última esperança da humanidade",
+     "type": "movie", "genres": ["Ação", "Aventura"], "year": 2023, "rating": 8.9, "duration": "2h 30min"},
+    {"id": "s1", "title": "Dimensões Paralelas", "description": "Cientistas descobrem portal para realidades alternativas",
+     "type": "series", "genres": ["Ficção Científica", "Drama"], "year": 2024, "rating": 9.1, "duration": "3 temporadas"},
+    {"id": "s2", "title": "Cidade Sombria", "description": "Detetives investigam crimes sobrenaturais",
+     "type": "series", "genres": ["Suspense", "Sobrenatural"], "year": 2023, "rating": 8.8, "duration": "2 temporadas"},
+    {"id": "s3", "title": "Família Moderna", "description": "O dia a dia de uma família brasileira contemporânea",
+     "type": "series", "genres": ["Comédia", "Família"], "year": 2024, "rating": 7.9, "duration": "1 temporada"},
+    {"id": "s4", "title": "Império do Crime", "description": "A ascensão de um sindicato do crime organizado",
+     "type": "series", "genres": ["Drama", "Crime"], "year": 2023, "rating": 9.3, "duration": "4 temporadas"},
+    {"id": "ch1", "title": "Canal Premium", "description": "Entretenimento ao vivo 24/7",
+     "type": "live", "genres": ["Entretenimento"], "year": 2024, "rating": 8.5, "duration": "24/7"},
+    {"id": "ch2", "title": "Canal Notícias", "description": "Notícias em tempo real",
+     "type": "live", "genres": ["Notícias"], "year": 2024, "rating": 8.0, "duration": "24/7"},
+    {"id": "ch3", "title": "Canal Esportes", "description": "Transmissões esportivas ao vivo",
+     "type": "live", "genres": ["Esportes"], "year": 2024, "rating": 9.0, "duration": "24/7"},
+]
+
+
+class InvalidQuery(ValueError):
+    """Parâmetros de consulta inválidos (ordenação, cursor, ...)"""
+
+
+class InvalidPageToken(InvalidQuery):
+    """Cursor de paginação malformado ou que não existe mais no catálogo"""
+
+
+# Campos aceitos em sort_by
+SORT_KEYS = ("rating", "year")
+
+
+def parse_sort(sort_by, order):
+    """Normaliza (sort_by, order) para (chave, decrescente); chave "" = sem ordenação"""
+    sort_by = (sort_by or "").lower()
+    order = (order or "desc").lower()
+    if sort_by and sort_by not in SORT_KEYS:
+        raise InvalidQuery(f"sort_by must be one of {', '.join(SORT_KEYS)}")
+    if order not in ("asc", "desc"):
+        raise InvalidQuery("order must be 'asc' or 'desc'")
+    return sort_by, order == "desc"
+
+
+def encode_page_token(kind, version, cursor, content_id):
+    """Cursor opaco apontando para o item seguinte ao `cursor`.
+
+    `kind` "p" indica posição no catálogo; "r" indica posição (rank) numa
+    consulta ordenada.
+    """
+    raw = f"{kind}:{version}:{cursor}:{content_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+class MappedCatalogFile:
+    """Catálogo em arquivo JSONL (um item por linha) acessado via mmap.
+
+    Na abertura só as posições de início/fim de cada linha são guardadas
+    (dois inteiros de 8 bytes por item); cada item é decodificado sob demanda
+    a partir do mapeamento, quando vai ser devolvido.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._starts = array('Q')
+        self._ends = array('Q')
+        with open(path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            self.signature = (st.st_ino, st.st_size, st.st_mtime_ns)
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if st.st_size else b""
+        self.fingerprint = hashlib.blake2b(self._mm, digest_size=8).hexdigest()
+
+        mm, pos, size = self._mm, 0, len(self._mm)
+        while pos < size:
+            end = mm.find(b"\n", pos)
+            if end == -1:
+                end = size
+            if mm[pos:end].strip():
+                self._starts.append(pos)
+                self._ends.append(end)
+            pos = end + 1
+
+    def __len__(self):
+        return len(self._starts)
+
+    def __getitem__(self, pos):
+        return json.loads(self._mm[self._starts[pos]:self._ends[pos]])
+
+    def __iter__(self):
+        for pos in range(len(self._starts)):
+            yield self[pos]
+
+
+class CatalogFileReader:
+    """Leitura sequencial do catálogo JSONL, item a item, sem mapear o arquivo.
+
+    Usado para construir o ColumnarCatalog: o arquivo é percorrido uma vez e
+    nada dele fica em memória depois. `fingerprint` (mesmo hash do
+    MappedCatalogFile) fica disponível ao fim da leitura.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.signature = None
+        self.fingerprint = None
+
+    def __iter__(self):
+        hasher = hashlib.blake2b(digest_size=8)
+        with open(self.path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            self.signature = (st.st_ino, st.st_size, st.st_mtime_ns)
+            for line in f:
+                hasher.update(line)
+                if line.strip():
+                    yield json.loads(line)
+        self.fingerprint = hasher.hexdigest()
+
+
+def write_catalog_file(items, path):
+    """Grava o catálogo em JSONL de forma atômica (arquivo temporário + rename).
+
+    É assim que o arquivo deve ser atualizado em produção: o recarregamento
+    nunca enxerga um arquivo pela metade.
+    """
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for item in items:
+            f.write(json.dumps(item, ensure_ascii=False, separators=(",", ":")))
+            f.write("\n")
+    os.replace(tmp_path, path)
+
+
+def catalog_fingerprint(items):
+    """Hash (hex, 64 bits) do conteúdo do catálogo, independente da ordem das chaves"""
+    hasher = hashlib.blake2b(digest_size=8)
+    for item in items:
+        hasher.update(json.dumps(item, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    return hasher.hexdigest()
+
+
+class CatalogIndex:
+    """Índices invertidos (tipo, gênero) e mapa id -> posição sobre o catálogo.
+
+    `items` é qualquer sequência de itens (a lista embutida, um
+    MappedCatalogFile ou um ColumnarCatalog). Construído uma única vez quando o catálogo é
+    carregado; as consultas apenas combinam as listas de posições já prontas,
+    guardadas em arrays compactos.
+
+    Para cada chave de SORT_KEYS também guarda as posições pré-ordenadas
+    (global e por tipo), então um top-k sem filtro de gênero custa O(k); com
+    gênero, o top-k é selecionado com heap sobre o resultado filtrado.
+    O índice de busca textual (`text`) e as contagens por faceta (`facets`)
+    são construídos junto, então sempre correspondem ao mesmo catálogo.
+
+    `version` é um contador local, crescente a cada troca de catálogo, usado
+    por caches e cursores; `fingerprint` é um hash do conteúdo, igual em
+    todos os processos e pods que servem o mesmo catálogo, exposto aos
+    clientes como catalog_version.
+    """
+
+    def __init__(self, items, version=1):
+        self.items = items
+        self.version = version
+        self.fingerprint = getattr(items, "fingerprint", None) or catalog_fingerprint(items)
+        if isinstance(items, ColumnarCatalog):
+            # Colunas e códigos já prontos: nada a decodificar item a item
+            self.by_id = items.ids
+            self.by_type, self.by_genre = items.postings()
+            self.columns = items.columns
+            signatures = items.signatures()
+        else:
+            self.by_id = {}
+            self.by_type = {}
+            self.by_genre = {}
+            self.columns = {"rating": array('f'), "year": array('H')}
+            signatures = Counter()
+            for pos, item in enumerate(self.items):
+                signatures[item["type"], tuple(sorted(item["genres"])), item["year"]] += 1
+                self.by_id[item["id"]] = pos
+                self.by_type.setdefault(item["type"], array('I')).append(pos)
+                for genre in item["genres"]:
+                    self.by_genre.setdefault(genre, array('I')).append(pos)
+                self.columns["rating"].append(item["rating"])
+                self.columns["year"].append(item["year"])
+
+        # Ordem decrescente pelo valor; sorted é estável, então empates ficam
+        # na ordem do catálogo
+        self.sorted_by = {}
+        self.sorted_by_type = {}
+        for key, column in self.columns.items():
+            self.sorted_by[key] = array('I', sorted(range(len(column)), key=lambda p: -column[p]))
+            self.sorted_by_type[key] = {
+                content_type: array('I', sorted(postings, key=lambda p: -column[p]))
+                for content_type, postings in self.by_type.items()
+            }
+
+        self.text = SearchIndex(self.items)
+        # Filtro de tipo da busca também como bitmap (ver SearchIndex.search)
+        self.type_bitmaps = {
+            content_type: to_bitmap(postings, len(self.items)) for content_type, postings in self.by_type.items()
+        }
+        self.facets = FacetIndex(signatures)
+
+    def __len__(self):
+        return len(self.items)
+
+    def get(self, content_id):
+        pos = self.by_id.get(content_id)
+        return None if pos is None else self.items[pos]
+
+    def _postings(self, content_type, genre):
+        postings = []
+        if content_type and content_type != "all":
+            postings.append(self.by_type.get(content_type, ()))
+        if genre:
+            postings.append(self.by_genre.get(genre, ()))
+        return postings
+
+    def iter_positions(self, content_type="all", genre="", start=0):
+        """Gera sob demanda as posições que atendem aos filtros, a partir de `start`"""
+        postings = self._postings(content_type, genre)
+        if not postings:
+            return iter(range(start, len(self.items)))
+        return iter_intersection(postings, start)
+
+    def positions(self, content_type="all", genre="", limit=0, start=0):
+        """Posições dos itens que atendem aos filtros, na ordem do catálogo"""
+        postings = self._postings(content_type, genre)
+        if not postings:
+            end = min(start + limit, len(self.items)) if limit > 0 else len(self.items)
+            return range(start, end)
+        return intersect_postings(postings, limit, start)
+
+    def _sort_key(self, sort_by, descending):
+        column = self.columns[sort_by]
+        if descending:
+            return lambda p: (-column[p], p)
+        # Mesma ordem da lista pré-ordenada percorrida de trás para frente
+        return lambda p: (column[p], -p)
+
+    def iter_sorted(self, content_type="all", genre="", sort_by="rating", descending=True, limit=0, start=0):
+        """Gera as posições ordenadas por `sort_by`, do rank `start` em diante"""
+        if not genre:
+            if content_type and content_type != "all":
+                base = self.sorted_by_type[sort_by].get(content_type, ())
+            else:
+                base = self.sorted_by[sort_by]
+            size = len(base)
+            end = min(size, start + limit) if limit > 0 else size
+            if descending:
+                return (base[i] for i in range(start, end))
+            return (base[size - 1 - i] for i in range(start, end))
+
+        candidates = iter_intersection(self._postings(content_type, genre))
+        key = self._sort_key(sort_by, descending)
+        if limit > 0:
+            # Top-k com heap: O(n log k), sem ordenar o resultado inteiro
+            ranked = heapq.nsmallest(start + limit, candidates, key=key)
+        else:
+            ranked = sorted(candidates, key=key)
+        return iter(ranked[start:])
+
+    def select(self, content_type="all", genre="", limit=0, start=0, sort_by="", descending=True):
+        """Posições da consulta: na ordem do catálogo ou ordenadas por `sort_by`.
+
+        `start` é uma posição do catálogo sem ordenação e um rank com ela.
+        """
+        if sort_by:
+            return list(self.iter_sorted(content_type, genre, sort_by, descending, limit, start))
+        return self.positions(content_type, genre, limit, start)
+
+    def iter_select(self, content_type="all", genre="", limit=0, start=0, sort_by="", descending=True):
+        """Versão sob demanda de select()"""
+        if sort_by:
+            return self.iter_sorted(content_type, genre, sort_by, descending, limit, start)
+        positions = self.iter_positions(content_type, genre, start)
+        return islice(positions, limit) if limit > 0 else positions
+
+    def search(self, query, limit=10, prefix=False, content_type=""):
+        """Posições dos itens que casam com `query`, da mais relevante"""
+        allowed = allowed_bitmap = None
+        if content_type and content_type != "all":
+            allowed = self.by_type.get(content_type, ())
+            allowed_bitmap = self.type_bitmaps.get(content_type)
+        return self.text.search(query, limit, prefix, allowed, allowed_bitmap)
+
+    def query(self, content_type="all", genre="", limit=0, start=0):
+        """Itens que atendem aos filtros de tipo e gênero, até `limit`"""
+        items = self.items
+        return [items[pos] for pos in self.positions(content_type, genre, limit, start)]
+
+    def page_token(self, pos, rank=None):
+        """Cursor para continuar depois do item na posição `pos`.
+
+        Em consultas ordenadas, `rank` é a posição do item no resultado.
+        """
+        if rank is None:
+            return encode_page_token("p", self.version, pos, self.items[pos]["id"])
+        return encode_page_token("r", self.version, rank, self.items[pos]["id"])
+
+    def resolve_page_token(self, token, sort_by=""):
+        """Início indicado por um cursor ("" = começo do resultado).
+
+        O cursor guarda a versão do catálogo, a posição (ou rank) e o id do
+        último item entregue. Sem ordenação, se o catálogo foi recarregado
+        desde então, a paginação continua a partir do mesmo id no catálogo
+        novo; em consultas ordenadas os ranks mudam e o cursor expira.
+        """
+        if not token:
+            return 0
+        try:
+            raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode("utf-8")
+            kind, version, cursor, content_id = raw.split(":", 3)
+            version, cursor = int(version), int(cursor)
+        except (ValueError, UnicodeDecodeError):
+            raise InvalidPageToken("malformed page_token")
+        if kind != ("r" if sort_by else "p"):
+            raise InvalidPageToken("page_token does not match the query ordering")
+        if version != self.version:
+            # A posição gravada é do catálogo antigo: só o id vale aqui
+            if kind == "r":
+                raise InvalidPageToken("page_token expired: catalog changed")
+            cursor = self.by_id.get(content_id)
+            if cursor is None:
+                raise InvalidPageToken("page_token refers to an item no longer in the catalog")
+        elif cursor < 0 or (kind == "p" and cursor >= len(self.items)):
+            raise InvalidPageToken("page_token out of range")
+        return cursor + 1
+
+
+# Representações do catálogo em arquivo (CATALOG_BACKEND)
+CATALOG_BACKENDS = ("columnar", "mmap")
+
+
+def load_catalog_file(path, backend="columnar"):
+    """Carrega o arquivo de catálogo e constrói seus índices.
+
+    "columnar" copia os itens para um ColumnarCatalog (menor RSS e sem
+    decodificar JSON por requisição); "mmap" mantém o JSONL mapeado e
+    decodifica cada item sob demanda.
+    """
+    if backend == "columnar":
+        return CatalogIndex(ColumnarCatalog(CatalogFileReader(path)))
+    if backend == "mmap":
+        return CatalogIndex(MappedCatalogFile(path))
+    raise ValueError(f"catalog backend must be one of {', '.join(CATALOG_BACKENDS)}")
+
+
+_current = CatalogIndex(CONTENT_CATALOG)
+_listeners = []
+
+
+def current_catalog():
+    """Índice do catálogo atualmente em uso"""
+    return _current
+
+
+def swap_catalog(index):
+    """Troca o catálogo em uso e notifica quem mantém dados derivados dele.
+
+    A versão é sempre crescente, então caches chaveados por ela nunca
+    devolvem respostas de um catálogo anterior.
+    """
+    global _current
+    index.version = max(index.version, _current.version + 1)
+    _current = index
+    for callback in _listeners:
+        callback(index)
+
+
+def on_catalog_change(callback):
+    """Registra `callback(index)` para ser chamado a cada troca de catálogo"""
+    _listeners.append(callback)
+
+
+def _file_signature(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+class CatalogReloader(threading.Thread):
+    """Recarrega o catálogo quando o arquivo muda, sem reiniciar o servidor.
+
+    O novo índice é construído inteiro nesta thread, fora do caminho das
+    requisições, e só então trocado com swap_catalog (troca de uma
+    referência). Requisições em andamento terminam sobre o índice anterior,
+    cujo mmap é liberado quando deixa de ser referenciado. Se o arquivo
+    estiver inválido o catálogo atual é mantido e a leitura é refeita no
+    próximo ciclo.
+    """
+
+    def __init__(self, path, interval=5.0, backend="columnar"):
+        super().__init__(name="catalog-reloader", daemon=True)
+        self.path = path
+        self.interval = interval
+        self.backend = backend
+        self._signature = getattr(current_catalog().items, "signature", None)
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            signature = _file_signature(self.path)
+            if signature is None or signature == self._signature:
+                continue
+            try:
+                index = load_catalog_file(self.path, self.backend)
+            except Exception as e:
+                print(f"Catalog reload from {self.path} failed: {e}", flush=True)
+                continue
+            self._signature = index.items.signature
+            swap_catalog(index)
+            print(f"Catalog reloaded from {self.path}: {len(index)} items (version {index.version})", flush=True)
+
+
+def watch_catalog_file(path, interval=5.0, backend="columnar"):
+    """Inicia a thread que recarrega o catálogo a cada mudança do arquivo"""
+    reloader = CatalogReloader(path, interval, backend)
+    reloader.start()
+    return reloader
@@ -0,0 +1,158 @@
+"""Representação colunar e compacta do catálogo do Service A"""
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+# Campos de texto guardados no buffer contíguo, nesta ordem, para cada item
+TEXT_FIELDS = ("id", "title", "description", "duration")
+
+# Separador dos campos de texto de um item dentro do buffer
+FIELD_SEPARATOR = "\x1f"
+
+# Tipos de array dos códigos de `type` e de gênero; um catálogo com mais
+# valores distintos do que cabem nele é recusado com ValueError
+TYPE_CODE = 'H'
+GENRE_CODE = 'H'
+
+
+def intern_code(values, value, typecode, kind):
+    """Acrescenta `value` a `values` e devolve seu código, que precisa caber
+    num array de `typecode`"""
+    code = len(values)
+    if code >= 1 << (8 * array(typecode).itemsize):
+        raise ValueError(f"catalog has more than {code} distinct {kind}")
+    values.append(value)
+    return code
+
+
+class ColumnarCatalog:
+    """Catálogo guardado em colunas, sem um objeto Python por item.
+
+    - `year` e `rating` ficam em arrays (`columns`), os mesmos usados pelos
+      índices de ordenação;
+    - `type` e os gêneros são internados como códigos inteiros pequenos
+      (`types` / `genres` guardam o texto de cada código); os gêneros de
+      cada item são um intervalo de `genre_codes` delimitado por
+      `genre_offsets`;
+    - os campos de TEXT_FIELDS de cada item são gravados juntos (separados
+      por FIELD_SEPARATOR) num único buffer UTF-8, com um deslocamento de
+      fim por item em `text_offsets`; um item custa uma única decodificação.
+
+    Comporta-se como uma sequência de itens: `catalog[pos]` materializa o
+    dicionário só do item pedido, na hora de montar a resposta. Campos fora
+    do esquema de ContentItem não são guardados.
+    """
+
+    def __init__(self, items):
+        self.types = []
+        self.genres = []
+        self.type_codes = array(TYPE_CODE)
+        self.genre_offsets = array('I', [0])
+        self.genre_codes = array(GENRE_CODE)
+        self.columns = {"rating": array('d'), "year": array('H')}
+        self.text = bytearray()
+        self.text_offsets = array('Q', [0])
+
+        type_code, genre_code = {}, {}
+        for item in items:
+            code = type_code.get(item["type"])
+            if code is None:
+                code = type_code[item["type"]] = intern_code(self.types, item["type"], TYPE_CODE, "types")
+            self.type_codes.append(code)
+            for genre in item["genres"]:
+                code = genre_code.get(genre)
+                if code is None:
+                    code = genre_code[genre] = intern_code(self.genres, genre, GENRE_CODE, "genres")
+                self.genre_codes.append(code)
+            self.genre_offsets.append(len(self.genre_codes))
+            self.columns["rating"].append(item["rating"])
+            self.columns["year"].append(item["year"])
+            record = [item[field] for field in TEXT_FIELDS]
+            if any(FIELD_SEPARATOR in value for value in record):
+                raise ValueError(f"item {item['id']!r} contains the reserved character U+001F")
+            self.text += FIELD_SEPARATOR.join(record).encode("utf-8")
+            self.text_offsets.append(len(self.text))
+
+        # Lidos depois do laço: um leitor sequencial só os conhece ao fim do arquivo
+        self.fingerprint = getattr(items, "fingerprint", None)
+        self.signature = getattr(items, "signature", None)
+        self._rating, self._year = self.columns["rating"], self.columns["year"]
+        self.ids = IdIndex(self)
+
+    def __len__(self):
+        return len(self.type_codes)
+
+    def text_fields(self, pos):
+        """Valores de TEXT_FIELDS do item na posição `pos`, na mesma ordem"""
+        return self.text[self.text_offsets[pos]:self.text_offsets[pos + 1]].decode("utf-8").split(FIELD_SEPARATOR)
+
+    def __getitem__(self, pos):
+        if pos < 0:
+            pos += len(self)
+        # Acessa type_codes primeiro: posição inválida levanta IndexError
+        content_type = self.types[self.type_codes[pos]]
+        content_id, title, description, duration = self.text_fields(pos)
+        genres = self.genres
+        return {
+            "id": content_id,
+            "title": title,
+            "description": description,
+            "type": content_type,
+            "genres": [genres[code] for code in self.genre_codes[self.genre_offsets[pos]:self.genre_offsets[pos + 1]]],
+            "year": self._year[pos],
+            "rating": self._rating[pos],
+            "duration": duration,
+        }
+
+    def __iter__(self):
+        for pos in range(len(self)):
+            yield self[pos]
+
+    def postings(self):
+        """Listas de posições por tipo e por gênero, a partir dos códigos"""
+        by_type = [array('I') for _ in self.types]
+        by_genre = [array('I') for _ in self.genres]
+        offsets, codes = self.genre_offsets, self.genre_codes
+        for pos, code in enumerate(self.type_codes):
+            by_type[code].append(pos)
+            for genre in codes[offsets[pos]:offsets[pos + 1]]:
+                by_genre[genre].append(pos)
+        return dict(zip(self.types, by_type)), dict(zip(self.genres, by_genre))
+
+    def signatures(self):
+        """Quantidade de itens por assinatura (tipo, gêneros em ordem canônica, ano), para as facetas"""
+        offsets, codes = self.genre_offsets, self.genre_codes
+        genre_sets = (tuple(sorted(codes[offsets[pos]:offsets[pos + 1]])) for pos in range(len(self)))
+        counts = Counter(zip(self.type_codes, genre_sets, self._year))
+        types, genres = self.types, self.genres
+        return Counter({
+            (types[t], tuple(genres[g] for g in genre_set), year): count
+            for (t, genre_set, year), count in counts.items()
+        })
+
+
+class IdIndex:
+    """Mapa id -> posição sem guardar as strings dos ids.
+
+    Guarda o hash de cada id ordenado (array de 8 bytes) e a posição
+    correspondente (4 bytes); a busca é binária no hash e confirma o id no
+    buffer de texto, resolvendo colisões. Os hashes valem para o processo
+    que construiu o índice (e para os workers criados com fork depois dele).
+    """
+
+    def __init__(self, catalog):
+        self._catalog = catalog
+        hashes = array('q', (hash(catalog.text_fields(pos)[0]) for pos in range(len(catalog))))
+        order = sorted(range(len(hashes)), key=hashes.__getitem__)
+        self.hashes = array('q', (hashes[pos] for pos in order))
+        self.positions = array('I', order)
+
+    def get(self, content_id, default=None):
+        key = hash(content_id)
+        i = bisect_left(self.hashes, key)
+        while i < len(self.hashes) and self.hashes[i] == key:
+            pos = self.positions[i]
+            if self._catalog.text_fields(pos)[0] == content_id:
+                return pos
+            i += 1
+        return default
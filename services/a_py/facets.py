@@ -0,0 +1,57 @@
+"""Contagens por faceta (tipo, gênero, ano) do catálogo do Service A"""
+from collections import Counter
+
+
+class FacetIndex:
+    """Contagens por tipo, gênero e ano para cada filtro (tipo, gênero).
+
+    Construído junto com o CatalogIndex, a partir das assinaturas
+    (tipo, gêneros, ano) dos itens já agrupadas com suas quantidades: cada
+    combinação distinta de tipo e gêneros é somada uma única vez nas tabelas
+    de todos os filtros que a incluem ("all"/"", tipo, gênero e tipo +
+    gênero). Assim uma consulta de facetas é só uma busca num dicionário, e
+    as tabelas são refeitas a cada recarga do catálogo, fora do caminho das
+    requisições.
+    """
+
+    def __init__(self, signatures):
+        # Agrupa os anos por (tipo, gêneros): cada grupo entra nas tabelas de
+        # uma vez, com a distribuição de anos já somada
+        groups = {}
+        for (content_type, genres, year), count in signatures.items():
+            years = groups.get((content_type, genres))
+            if years is None:
+                years = groups[content_type, genres] = Counter()
+            years[year] += count
+
+        tables = {}
+        for (content_type, genres), group_years in groups.items():
+            count = sum(group_years.values())
+            keys = [("all", ""), (content_type, "")]
+            for genre in genres:
+                keys.append(("all", genre))
+                keys.append((content_type, genre))
+            for key in keys:
+                table = tables.get(key)
+                if table is None:
+                    table = tables[key] = (Counter(), Counter(), Counter())
+                types, genre_counts, years = table
+                types[content_type] += count
+                years.update(group_years)
+                for genre in genres:
+                    genre_counts[genre] += count
+
+        # Ordem de exibição: mais frequentes primeiro (empate por nome); anos
+        # do mais recente para o mais antigo
+        self.tables = {}
+        for key, (types, genre_counts, years) in tables.items():
+            self.tables[key] = (
+                sum(types.values()),
+                sorted(types.items(), key=lambda kv: (-kv[1], kv[0])),
+                sorted(genre_counts.items(), key=lambda kv: (-kv[1], kv[0])),
+                sorted(years.items(), reverse=True),
+            )
+
+    def get(self, content_type="all", genre=""):
+        """(total, tipos, gêneros, anos) dos itens que atendem ao filtro"""
+        return self.tables.get((content_type or "all", genre), (0, [], [], []))
@@ -0,0 +1,106 @@
+"""Operações sobre listas de posições ordenadas (posting lists) e bitmaps de posições"""
+from bisect import bisect_left, bisect_right
+from itertools import islice
+
+# Tamanho dos blocos da lista mais curta intersectados de uma vez
+MIN_BLOCK = 64
+MAX_BLOCK = 8192
+
+# Posições por bloco de um bitmap
+BITMAP_BLOCK = 8192
+
+# A partir de quantas vezes o número de candidatos o recorte de uma lista é
+# longo demais para ser percorrido: cada candidato é procurado com bisect
+PROBE_RATIO = 8
+
+
+def probe(candidates, other, lo, hi):
+    """Candidatos presentes em other[lo:hi], procurados um a um com bisect"""
+    found = set()
+    for pos in sorted(candidates):
+        lo = bisect_left(other, pos, lo, hi)
+        if lo == hi:
+            break
+        if other[lo] == pos:
+            found.add(pos)
+    return found
+
+
+def iter_intersection(postings, start=0):
+    """Gera, em ordem, as posições >= `start` presentes em todas as listas.
+
+    Percorre a lista mais curta em blocos e, para cada bloco, recorta as
+    demais listas com bisect e intersecta os recortes como conjuntos (em C),
+    então o custo depende do tamanho das listas envolvidas, não do catálogo.
+    As listas são intersectadas da mais curta para a mais longa; quando o
+    recorte de uma delas é muito maior que os candidatos restantes, eles são
+    procurados com bisect em vez de percorrer o recorte inteiro. Os blocos
+    começam pequenos e dobram de tamanho, para que consultas com limite
+    pequeno parem cedo.
+    """
+    if not postings:
+        return
+    postings = sorted(postings, key=len)
+    shortest, others = postings[0], postings[1:]
+    i = bisect_left(shortest, start)
+    if not others:
+        yield from islice(shortest, i, None)
+        return
+
+    cursors = [bisect_left(other, start) for other in others]
+    block = MIN_BLOCK
+    while i < len(shortest):
+        chunk = shortest[i:i + block]
+        last = chunk[-1]
+        common = set(chunk)
+        for k, other in enumerate(others):
+            j = bisect_right(other, last, cursors[k])
+            if j - cursors[k] > PROBE_RATIO * len(common):
+                common = probe(common, other, cursors[k], j)
+            else:
+                common.intersection_update(other[cursors[k]:j])
+            cursors[k] = j
+            if not common:
+                break
+        yield from sorted(common)
+        i += block
+        block = min(block * 2, MAX_BLOCK)
+
+
+def intersect_postings(postings, limit=0, start=0):
+    """Intersecta listas de posições ordenadas, preservando a ordem do catálogo"""
+    positions = iter_intersection(postings, start)
+    return list(islice(positions, limit) if limit > 0 else positions)
+
+
+def to_bitmap(positions, size):
+    """Bitmap das posições de um catálogo com `size` itens: uma lista de
+    inteiros, um por bloco de BITMAP_BLOCK posições.
+
+    Dentro do bloco, a menor posição é o bit mais alto, achado por
+    bit_length() em O(1); intersecções viram `&` entre inteiros, feitos em
+    C, e blocos zerados ficam de fora das operações seguintes.
+    """
+    step = BITMAP_BLOCK // 8
+    bits = bytearray(-(-size // BITMAP_BLOCK) * step)
+    for pos in positions:
+        bits[pos >> 3] |= 0x80 >> (pos & 7)
+    return [int.from_bytes(bits[i:i + step], "big") for i in range(0, len(bits), step)]
+
+
+def and_bitmaps(a, b):
+    return [x & y if x else 0 for x, y in zip(a, b)]
+
+
+def or_bitmaps(a, b):
+    return [x | y for x, y in zip(a, b)]
+
+
+def iter_bitmap(bitmap):
+    """Gera, em ordem, as posições de um bitmap de to_bitmap()"""
+    for block, bits in enumerate(bitmap):
+        base = (block + 1) * BITMAP_BLOCK - 1
+        while bits:
+            bit = bits.bit_length() - 1
+            yield base - bit
+            bits ^= 1 << bit
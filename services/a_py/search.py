@@ -0,0 +1,204 @@
+"""Busca textual (título e descrição) sobre o catálogo do Service A"""
+import heapq
+import math
+import re
+import unicodedata
+from array import array
+from collections import defaultdict
+from bisect import bisect_left
+from functools import lru_cache, partial
+from itertools import chain
+
+from postings import and_bitmaps, iter_bitmap, iter_intersection, or_bitmaps, to_bitmap
+
+# Peso de um termo no título; na descrição vale 1 (presente nos dois: soma)
+TITLE_WEIGHT = 3
+
+# Quantos termos do vocabulário um prefixo pode expandir (type-ahead)
+MAX_PREFIX_EXPANSIONS = 16
+PREFIX_SCAN_LIMIT = 1024
+
+# Termos presentes em ao menos 1/DENSE_RATIO dos itens também guardam cada
+# faixa como bitmap (size/8 bytes, no máximo o tamanho da lista de posições
+# do termo por faixa)
+DENSE_RATIO = 32
+
+STOPWORDS = frozenset(
+    "a o e as os de da do das dos em no na nos nas um uma uns umas ao aos "
+    "para por pela pelo com sem que se ou".split()
+)
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+def fold(text):
+    """Minúsculas sem acentos: "Ação" -> "acao", "Comédia" -> "comedia" """
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+@lru_cache(maxsize=65536)
+def fold_word(word):
+    """Termos de uma palavra (normalmente um só), fora as stopwords"""
+    return tuple(t for t in TOKEN_RE.findall(fold(word)) if t not in STOPWORDS)
+
+
+def tokenize(text):
+    # Normalizado por palavra: o vocabulário é pequeno perto do número de
+    # textos, e o cache evita decompor cada caractere de novo
+    if not text.isascii():
+        text = unicodedata.normalize("NFC", text)
+    return list(chain.from_iterable(map(fold_word, TOKEN_RE.findall(text))))
+
+
+class SearchIndex:
+    """Índice invertido termo -> posições, separadas por faixa de peso.
+
+    Cada termo guarda uma lista ordenada de posições por peso possível
+    (título + descrição, só título, só descrição). Como a relevância de um
+    item é a soma de peso x idf de cada termo, as combinações de faixas têm
+    pontuação fixa: percorrê-las da maior para a menor entrega os itens já
+    em ordem de relevância, e a busca para assim que junta `limit`
+    resultados, sem pontuar todos os itens que casam.
+
+    Termos frequentes (ver DENSE_RATIO) também têm as faixas como bitmaps:
+    combinações só de termos frequentes, as mais caras de intersectar como
+    listas, são intersectadas com `&` entre os bitmaps.
+
+    O vocabulário ordenado serve de estrutura de prefixo: os termos que
+    começam com `p` são um intervalo contíguo encontrado por busca binária.
+    """
+
+    def __init__(self, items):
+        self.size = len(items)
+        postings = defaultdict(partial(array, 'I'))
+        for pos, item in enumerate(items):
+            weights = dict.fromkeys(tokenize(item["description"]), 1)
+            for token in set(tokenize(item["title"])):
+                weights[token] = TITLE_WEIGHT + weights.get(token, 0)
+            for key in weights.items():
+                postings[key].append(pos)
+        self.tiers = {}
+        for (token, weight), positions in postings.items():
+            self.tiers.setdefault(token, {})[weight] = positions
+        self.df = {token: sum(map(len, tiers.values())) for token, tiers in self.tiers.items()}
+        self.bitmaps = {
+            token: {weight: to_bitmap(positions, self.size) for weight, positions in self.tiers[token].items()}
+            for token, df in self.df.items()
+            if df * DENSE_RATIO >= self.size
+        }
+        self.terms = sorted(self.tiers)
+
+    def idf(self, token):
+        return math.log(1 + self.size / self.df[token])
+
+    def expand_prefix(self, prefix):
+        """Termos do vocabulário que começam com `prefix` (os mais frequentes)"""
+        lo = bisect_left(self.terms, prefix)
+        hi = bisect_left(self.terms, prefix + "\uffff", lo)
+        candidates = self.terms[lo:min(hi, lo + PREFIX_SCAN_LIMIT)]
+        if len(candidates) <= MAX_PREFIX_EXPANSIONS:
+            return candidates
+        return heapq.nlargest(MAX_PREFIX_EXPANSIONS, candidates, key=self.df.__getitem__)
+
+    def search(self, query, limit=10, prefix=False, allowed=None, allowed_bitmap=None):
+        """Posições que contêm todos os termos de `query`, da mais relevante.
+
+        Relevância = soma, por termo, de peso (título/descrição) x idf; empates
+        seguem a ordem do catálogo. Com `prefix`, o último termo casa qualquer
+        palavra que comece com ele (vale a de maior pontuação). `allowed`
+        (lista ordenada de posições) restringe o resultado, ex.: os itens de
+        um tipo; `allowed_bitmap` é o mesmo filtro como bitmap (to_bitmap),
+        sem o qual a busca com filtro não usa os bitmaps dos termos.
+        """
+        terms = tokenize(query)
+        if not terms or limit <= 0:
+            return []
+
+        # Por termo da consulta: faixas (pontuação, posições, bitmap ou None)
+        # de todas as suas expansões, da maior pontuação para a menor
+        groups = []
+        for i, term in enumerate(terms):
+            if prefix and i == len(terms) - 1:
+                tokens = self.expand_prefix(term)
+            else:
+                tokens = [term] if term in self.tiers else []
+            if not tokens:
+                return []
+            lists = []
+            for token in tokens:
+                bitmaps = self.bitmaps.get(token)
+                for weight, positions in self.tiers[token].items():
+                    lists.append((weight * self.idf(token), positions, bitmaps[weight] if bitmaps else None))
+            lists.sort(key=lambda entry: -entry[0])
+            groups.append(lists)
+
+        # Enumera as combinações (uma faixa por termo) em ordem decrescente de
+        # pontuação; um item aparece primeiro na combinação com sua pontuação
+        # real, então basta ignorar os já vistos
+        first = tuple([0] * len(groups))
+        heap = [(-sum(group[0][0] for group in groups), first)]
+        queued = {first}
+        results, seen = [], set()
+        # Intersecções de bitmaps por prefixo de combinação: combinações
+        # vizinhas repetem as faixas dos primeiros termos
+        prefixes = {}
+
+        def combo_bitmap(combo):
+            """Intersecção dos bitmaps das faixas (e do filtro), ou None se
+            alguma faixa não tem bitmap"""
+            bitmap = None if allowed is None else allowed_bitmap
+            if allowed is not None and bitmap is None:
+                return None
+            for g in range(len(combo)):
+                key = combo[:g + 1]
+                prefix_bitmap = prefixes.get(key)
+                if prefix_bitmap is None:
+                    tier_bitmap = groups[g][combo[g]][2]
+                    if tier_bitmap is None:
+                        return None
+                    prefix_bitmap = prefixes[key] = tier_bitmap if bitmap is None else and_bitmaps(bitmap, tier_bitmap)
+                bitmap = prefix_bitmap
+            return bitmap
+
+        def push_successors(combo):
+            for g, j in enumerate(combo):
+                if j + 1 < len(groups[g]):
+                    nxt = combo[:g] + (j + 1,) + combo[g + 1:]
+                    if nxt not in queued:
+                        queued.add(nxt)
+                        score = sum(group[k][0] for group, k in zip(groups, nxt))
+                        heapq.heappush(heap, (-score, nxt))
+
+        while heap and len(results) < limit:
+            # Combinações de mesma pontuação são percorridas juntas, em ordem
+            # de posição, para que empates sigam a ordem do catálogo
+            score, combo = heapq.heappop(heap)
+            combos = [combo]
+            push_successors(combo)
+            while heap and heap[0][0] - score < 1e-9:
+                combos.append(heapq.heappop(heap)[1])
+                push_successors(combos[-1])
+
+            iterators = []
+            dense = None
+            for combo in combos:
+                # Só termos frequentes: intersecção em C com os bitmaps (uma
+                # lista só é percorrida direto)
+                bitmap = combo_bitmap(combo) if len(groups) + (allowed is not None) > 1 else None
+                if bitmap is not None:
+                    dense = bitmap if dense is None else or_bitmaps(dense, bitmap)
+                    continue
+                postings = [group[j][1] for group, j in zip(groups, combo)]
+                if allowed is not None:
+                    postings.append(allowed)
+                iterators.append(iter_intersection(postings))
+            if dense is not None:
+                iterators.append(iter_bitmap(dense))
+            for pos in heapq.merge(*iterators):
+                if pos not in seen:
+                    seen.add(pos)
+                    results.append(pos)
+                    if len(results) >= limit:
+                        break
+        return results
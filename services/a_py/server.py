@@ -1,9 +1,28 @@
 import grpc
 from concurrent import futures
+import asyncio
+import tempfile
+import sys
 import time, os
-from prometheus_client import start_http_server, Counter, Histogram
+
+# Módulos compartilhados pelos serviços gRPC (services/common); na imagem
+# ficam junto do server.py (ver Dockerfile)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "common"))
+
+# WORKERS > 1: cada processo grava suas métricas em arquivos num diretório
+# compartilhado, agregados no scrape. Precisa ser definido antes de importar
+# prometheus_client.
+if int(os.environ.get("WORKERS", "1")) > 1 and "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="service-a-metrics-")
+
+from prometheus_client import start_http_server, Counter, Gauge, Histogram
 
 from proto import services_pb2, services_pb2_grpc
+from catalog import InvalidQuery, current_catalog, parse_sort, load_catalog_file, on_catalog_change, swap_catalog, watch_catalog_file
+from cache import LRUCache
+from admission import CONCURRENCY_LIMIT, AsyncAdmissionControl, ThreadAdmissionControl, admission_limiter
+from deadlines import Abandoned, check_deadline, expired
+from workers import serve_workers
 
 # Prometheus metrics
 REQUEST_COUNT = Counter(
@@ -12,6 +31,31 @@ REQUEST_COUNT = Counter(
     ['method', 'status']
 )
 
+RESPONSE_CACHE_HITS = Counter(
+    'grpc_server_response_cache_hits_total',
+    'Responses served from the pre-serialized response cache',
+    ['method']
+)
+
+RESPONSE_CACHE_MISSES = Counter(
+    'grpc_server_response_cache_misses_total',
+    'Responses built because they were not in the response cache',
+    ['method']
+)
+
+RESPONSE_CACHE_EVICTIONS = Counter(
+    'grpc_server_response_cache_evictions_total',
+    'Entries evicted from the response cache (LRU)',
+    ['method']
+)
+
+RESPONSE_CACHE_SIZE = Gauge(
+    'grpc_server_response_cache_entries',
+    'Entries currently held in the response cache',
+    ['method'],
+    multiprocess_mode='livesum'
+)
+
 REQUEST_LATENCY = Histogram(
     'grpc_server_request_duration_seconds',
     'gRPC request latency for Service A',
@@ -19,103 +63,654 @@ REQUEST_LATENCY = Histogram(
     buckets=[0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 5]
 )
 
+CATALOG_ITEMS = Gauge(
+    'catalog_items',
+    'Items in the catalog currently served',
+    multiprocess_mode='livemax'
+)
+
+NOT_MODIFIED_RESPONSES = Counter(
+    'grpc_server_not_modified_total',
+    'Requests answered as not modified because if_version matched the catalog',
+    ['method']
+)
+
+ABANDONED_REQUESTS = Counter(
+    'grpc_server_abandoned_requests_total',
+    'Requests dropped because the client cancelled or the deadline could not be met',
+    ['method', 'reason']
+)
+
+RESPONSE_BYTES = Counter(
+    'grpc_server_response_bytes_total',
+    'Serialized response bytes before compression, by whether the message was eligible for negotiated compression',
+    ['method', 'compression']
+)
+
 CONTENT_ITEMS_RETURNED = Counter(
     'content_items_returned_total',
     'Total content items returned',
     ['content_type']
 )
 
-# Catálogo de conteúdo simulado
-CONTENT_CATALOG = [
-    {"id": "m1", "title": "A Jornada Infinita", "description": "Uma aventura épica através das galáxias",
-     "type": "movie", "genres": ["Ficção Científica", "Aventura"], "year": 2024, "rating": 8.7, "duration": "2h 15min"},
-    {"id": "m2", "title": "Segredos do Passado", "description": "Um thriller psicológico sobre memórias esquecidas",
-     "type": "movie", "genres": ["Thriller", "Drama"], "year": 2024, "rating": 8.2, "duration": "1h 55min"},
-    {"id": "m3", "title": "Risadas na Cidade", "description": "Uma comédia romântica em uma metrópole agitada",
-     "type": "movie", "genres": ["Comédia", "Romance"], "year": 2024, "rating": 7.5, "duration": "1h 45min"},
-    {"id": "m4", "title": "O Último Guardião", "description": "Um guerreiro protege a última esperança da humanidade",
-     "type": "movie", "genres": ["Ação", "Aventura"], "year": 2023, "rating": 8.9, "duration": "2h 30min"},
-    {"id": "s1", "title": "Dimensões Paralelas", "description": "Cientistas descobrem portal para realidades alternativas",
-     "type": "series", "genres": ["Ficção Científica", "Drama"], "year": 2024, "rating": 9.1, "duration": "3 temporadas"},
-    {"id": "s2", "title": "Cidade Sombria", "description": "Detetives investigam crimes sobrenaturais",
-     "type": "series", "genres": ["Suspense", "Sobrenatural"], "year": 2023, "rating": 8.8, "duration": "2 temporadas"},
-    {"id": "s3", "title": "Família Moderna", "description": "O dia a dia de uma família brasileira contemporânea",
-     "type": "series", "genres": ["Comédia", "Família"], "year": 2024, "rating": 7.9, "duration": "1 temporada"},
-    {"id": "s4", "title": "Império do Crime", "description": "A ascensão de um sindicato do crime organizado",
-     "type": "series", "genres": ["Drama", "Crime"], "year": 2023, "rating": 9.3, "duration": "4 temporadas"},
-    {"id": "ch1", "title": "Canal Premium", "description": "Entretenimento ao vivo 24/7",
-     "type": "live", "genres": ["Entretenimento"], "year": 2024, "rating": 8.5, "duration": "24/7"},
-    {"id": "ch2", "title": "Canal Notícias", "description": "Notícias em tempo real",
-     "type": "live", "genres": ["Notícias"], "year": 2024, "rating": 8.0, "duration": "24/7"},
-    {"id": "ch3", "title": "Canal Esportes", "description": "Transmissões esportivas ao vivo",
-     "type": "live", "genres": ["Esportes"], "year": 2024, "rating": 9.0, "duration": "24/7"},
-]
+# Cache LRU de respostas já serializadas: (versão do catálogo, tipo, gênero, limite,
+# início, ordenação, projeção)
+# -> (bytes do ContentResponse, quantidade de itens). RESPONSE_CACHE_SIZE=0 desabilita.
+RESPONSE_CACHE = LRUCache(int(os.environ.get("RESPONSE_CACHE_SIZE", "256")))
+
+# Itens por mensagem no StreamContent
+STREAM_CHUNK_SIZE = max(1, int(os.environ.get("STREAM_CHUNK_SIZE", "100")))
+
+# Itens construídos entre uma verificação de cancelamento/prazo e outra
+ABANDON_CHECK_INTERVAL = 256
+
+# Compressão das respostas, negociada pelo gRPC em cada chamada com o
+# grpc-accept-encoding do cliente: RESPONSE_COMPRESSION é o algoritmo
+# preferido (o outro é usado se o cliente só aceitar ele; "none" desativa).
+# O gRPC escolhe o algoritmo pelo nível de compressão do servidor: LOW
+# prefere gzip e HIGH, deflate.
+COMPRESSION_LEVELS = {"gzip": 1, "deflate": 3}
+RESPONSE_COMPRESSION = os.environ.get("RESPONSE_COMPRESSION", "gzip")
+if RESPONSE_COMPRESSION not in COMPRESSION_LEVELS and RESPONSE_COMPRESSION != "none":
+    raise RuntimeError(f"RESPONSE_COMPRESSION={RESPONSE_COMPRESSION} unknown (options: gzip, deflate, none)")
+
+# Mensagens menores que isso vão sem compressão: o ganho não paga a CPU
+COMPRESSION_MIN_BYTES = int(os.environ.get("COMPRESSION_MIN_BYTES", "1024"))
+
+
+class LatencyEstimate:
+    """Média móvel exponencial da duração das requisições bem-sucedidas"""
+
+    def __init__(self, alpha=0.1):
+        self.alpha = alpha
+        self.value = 0.0
+
+    def observe(self, seconds):
+        self.value += self.alpha * (seconds - self.value)
+
+
+# Duração das respostas do GetContent construídas num miss do cache; hits
+# custam microssegundos e não passam por essa estimativa
+GET_CONTENT_LATENCY = LatencyEstimate()
+
+
+def abandon(context, method, reason):
+    """Contabiliza uma requisição abandonada e define o status devolvido"""
+    ABANDONED_REQUESTS.labels(method=method, reason=reason).inc()
+    REQUEST_COUNT.labels(method=method, status='error').inc()
+    if reason == "deadline":
+        context.set_code(grpc.StatusCode.DEADLINE_EXCEEDED)
+        context.set_details("Deadline too short to complete the request")
+    else:
+        context.set_code(grpc.StatusCode.CANCELLED)
+        context.set_details("Cancelled by the client")
+
+
+def _invalidate_response_cache(index):
+    RESPONSE_CACHE.clear()
+    RESPONSE_CACHE_SIZE.labels(method='GetContent').set(0)
+    CATALOG_ITEMS.set(len(index))
+
+
+on_catalog_change(_invalidate_response_cache)
+
+
+# Como obter cada campo de ContentItem a partir de um item do catálogo
+CONTENT_FIELDS = {
+    "id": lambda c: c["id"],
+    "title": lambda c: c["title"],
+    "description": lambda c: c["description"],
+    "thumbnail": lambda c: f"/api/thumbnails/{c['id']}.jpg",
+    "type": lambda c: c["type"],
+    "genres": lambda c: c["genres"],
+    "year": lambda c: c["year"],
+    "rating": lambda c: c["rating"],
+    "duration": lambda c: c["duration"],
+}
+
+
+def compression_options():
+    """Opções do servidor para a compressão negociada das respostas"""
+    if RESPONSE_COMPRESSION == "none":
+        return []
+    return [("grpc.default_compression_level", COMPRESSION_LEVELS[RESPONSE_COMPRESSION])]
+
+
+def compress_if_large(context, method, payload):
+    """Devolve a mensagem serializada `payload`, desligando a compressão dela
+    se for menor que COMPRESSION_MIN_BYTES (vale só para a próxima mensagem
+    enviada, então serve também para streams)"""
+    eligible = RESPONSE_COMPRESSION != "none" and len(payload) >= COMPRESSION_MIN_BYTES
+    if not eligible:
+        context.disable_next_message_compression()
+    RESPONSE_BYTES.labels(method=method, compression="eligible" if eligible else "skipped").inc(len(payload))
+    return payload
+
+
+def parse_fields(fields):
+    """Normaliza a projeção pedida para uma tupla ordenada; () = todos os campos"""
+    unknown = [f for f in fields if f not in CONTENT_FIELDS]
+    if unknown:
+        raise InvalidQuery(f"unknown fields: {', '.join(unknown)}")
+    return tuple(sorted(set(fields)))
+
+
+def build_content_item(c, fields=()):
+    """ContentItem com todos os campos ou só os de `fields` (projeção)"""
+    if fields:
+        return services_pb2.ContentItem(**{f: CONTENT_FIELDS[f](c) for f in fields})
+    return services_pb2.ContentItem(
+        id=c["id"],
+        title=c["title"],
+        description=c["description"],
+        thumbnail=f"/api/thumbnails/{c['id']}.jpg",
+        type=c["type"],
+        genres=c["genres"],
+        year=c["year"],
+        rating=c["rating"],
+        duration=c["duration"]
+    )
+
+
+class BatchMemo:
+    """Resultados compartilhados entre as consultas de um GetContentBatch.
+
+    `selections` guarda, por (tipo, gênero, início, ordenação), a maior lista
+    de posições já calculada, que atende qualquer limite menor; `items`
+    guarda o ContentItem de cada (posição, projeção) já construído, para que itens
+    presentes em várias prateleiras sejam construídos uma vez só.
+    """
+
+    def __init__(self):
+        self.selections = {}
+        self.items = {}
+
+
+def not_modified_payload(catalog):
+    """ContentResponse serializado indicando que a cópia do cliente está em dia"""
+    return services_pb2.ContentResponse(
+        catalog_version=catalog.fingerprint, not_modified=True
+    ).SerializeToString()
+
+
+def content_payload(catalog, request, memo=None, context=None, latency=None):
+    """ContentResponse serializado para uma consulta: (bytes, qtd. de itens, tipo).
+
+    Se if_version confere com o catálogo atual, responde só not_modified,
+    sem consultar índice nem cache. Caso contrário reaproveita o cache de
+    respostas; em caso de miss, filtra via índice, constrói e serializa a
+    resposta uma única vez e a guarda no cache. Com `context`, a construção
+    para (Abandoned) assim que o cliente desiste ou o prazo acaba; com
+    `latency` (LatencyEstimate dos misses), nem começa se o prazo restante
+    não cobre a duração recente de uma construção, e a duração desta é
+    observada.
+    """
+    content_type = request.type.lower() if request.type else "all"
+    if request.if_version and request.if_version == catalog.fingerprint:
+        NOT_MODIFIED_RESPONSES.labels(method='GetContent').inc()
+        return not_modified_payload(catalog), 0, content_type
+    
+    sort_by, descending = parse_sort(request.sort_by, request.order)
+    start_pos = catalog.resolve_page_token(request.page_token, sort_by)
+    limit = max(request.limit, 0)
+    fields = parse_fields(request.fields)
+    cache_key = (catalog.version, content_type, request.genre, limit, start_pos, sort_by, descending, fields)
+    
+    cached = RESPONSE_CACHE.get(cache_key)
+    if cached is not None:
+        RESPONSE_CACHE_HITS.labels(method='GetContent').inc()
+        payload, count = cached
+        return payload, count, content_type
+    RESPONSE_CACHE_MISSES.labels(method='GetContent').inc()
+    build_start = time.time()
+    if context is not None:
+        check_deadline(context, latency.value if latency is not None else 0.0)
+    
+    # Filtrar por tipo e gênero via índice invertido, já aplicando o limite;
+    # um item a mais indica se existe próxima página
+    wanted = limit + 1 if limit else 0
+    selection_key = (content_type, request.genre, start_pos, sort_by, descending)
+    shared = memo.selections.get(selection_key) if memo is not None else None
+    if shared is not None and (shared[1] or (wanted and len(shared[0]) >= wanted)):
+        positions = shared[0][:wanted] if wanted else shared[0]
+    else:
+        positions = catalog.select(content_type, request.genre, wanted, start_pos, sort_by, descending)
+        if memo is not None:
+            complete = not wanted or len(positions) < wanted
+            memo.selections[selection_key] = (positions, complete)
+    has_more = limit > 0 and len(positions) > limit
+    if has_more:
+        positions = positions[:limit]
+    
+    # Construir e serializar a resposta uma única vez, conferindo entre um
+    # bloco de itens e outro se alguém ainda espera por ela
+    items = []
+    for chunk_start in range(0, len(positions), ABANDON_CHECK_INTERVAL):
+        if context is not None and chunk_start:
+            check_deadline(context)
+        chunk = positions[chunk_start:chunk_start + ABANDON_CHECK_INTERVAL]
+        if memo is None:
+            items.extend(build_content_item(catalog.items[pos], fields) for pos in chunk)
+            continue
+        for pos in chunk:
+            item = memo.items.get((pos, fields))
+            if item is None:
+                item = memo.items[pos, fields] = build_content_item(catalog.items[pos], fields)
+            items.append(item)
+    next_page_token = ""
+    if has_more:
+        next_page_token = catalog.page_token(positions[-1], start_pos + limit - 1 if sort_by else None)
+    payload = services_pb2.ContentResponse(
+        items=items, total=len(items), next_page_token=next_page_token,
+        catalog_version=catalog.fingerprint,
+    ).SerializeToString()
+    count = len(items)
+    
+    if latency is not None:
+        latency.observe(time.time() - build_start)
+    evicted = RESPONSE_CACHE.put(cache_key, (payload, count))
+    if evicted:
+        RESPONSE_CACHE_EVICTIONS.labels(method='GetContent').inc(evicted)
+    RESPONSE_CACHE_SIZE.labels(method='GetContent').set(len(RESPONSE_CACHE))
+    return payload, count, content_type
+
+
+def get_content(request, context):
+    """Retorna catálogo de conteúdo filtrado por tipo e gênero.
+
+    A resposta é devolvida já serializada (bytes) e reaproveitada do cache
+    quando a mesma consulta se repete sobre a mesma versão do catálogo.
+    Com `limit` > 0 e mais itens disponíveis, `next_page_token` aponta para
+    a página seguinte. `sort_by`/`order` devolvem o top-k por nota ou ano e
+    `fields` restringe os campos construídos e serializados de cada item.
+    Num miss do cache, requisições cujo prazo restante é menor que a
+    latência recente de uma construção são recusadas sem trabalho
+    (DEADLINE_EXCEEDED); hits são servidos com qualquer prazo não vencido.
+    """
+    start = time.time()
+    try:
+        check_deadline(context)
+        payload, count, content_type = content_payload(
+            current_catalog(), request, context=context, latency=GET_CONTENT_LATENCY
+        )
+        
+        CONTENT_ITEMS_RETURNED.labels(content_type=content_type).inc(count)
+        REQUEST_COUNT.labels(method='GetContent', status='success').inc()
+        
+        return compress_if_large(context, 'GetContent', payload)
+        
+    except Abandoned as e:
+        abandon(context, 'GetContent', e.reason)
+        return services_pb2.ContentResponse()
+    except InvalidQuery as e:
+        REQUEST_COUNT.labels(method='GetContent', status='error').inc()
+        context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+        context.set_details(str(e))
+        return services_pb2.ContentResponse()
+    except Exception as e:
+        REQUEST_COUNT.labels(method='GetContent', status='error').inc()
+        context.set_code(grpc.StatusCode.INTERNAL)
+        context.set_details(f"Error: {str(e)}")
+        return services_pb2.ContentResponse()
+    finally:
+        REQUEST_LATENCY.labels(method='GetContent').observe(time.time() - start)
+
+
+def encode_varint(value):
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+# Tag do campo 1 (`responses`, length-delimited) de ContentBatchResponse
+BATCH_RESPONSES_TAG = b"\x0a"
+
+
+def get_content_batch(request, context):
+    """Executa várias consultas de GetContent numa única chamada.
+
+    As consultas são avaliadas juntas sobre a mesma versão do catálogo: as
+    de maior limite primeiro, para que as demais reaproveitem suas seleções
+    (BatchMemo). Cada resposta individual é a mesma do GetContent (inclusive
+    do cache), e o ContentBatchResponse é montado concatenando os bytes já
+    serializados, sem reconstruir mensagens.
+    """
+    start = time.time()
+    try:
+        check_deadline(context)
+        catalog = current_catalog()
+        memo = BatchMemo()
+        queries = list(request.queries)
+        order = sorted(range(len(queries)), key=lambda i: queries[i].limit if queries[i].limit > 0 else float("inf"), reverse=True)
+        payloads = [None] * len(queries)
+        for i in order:
+            try:
+                payload, count, content_type = content_payload(catalog, queries[i], memo, context)
+            except InvalidQuery as e:
+                raise InvalidQuery(f"queries[{i}]: {e}")
+            CONTENT_ITEMS_RETURNED.labels(content_type=content_type).inc(count)
+            payloads[i] = payload
+        
+        REQUEST_COUNT.labels(method='GetContentBatch', status='success').inc()
+        return compress_if_large(
+            context, 'GetContentBatch',
+            b"".join(BATCH_RESPONSES_TAG + encode_varint(len(p)) + p for p in payloads),
+        )
+        
+    except Abandoned as e:
+        abandon(context, 'GetContentBatch', e.reason)
+        return services_pb2.ContentBatchResponse()
+    except InvalidQuery as e:
+        REQUEST_COUNT.labels(method='GetContentBatch', status='error').inc()
+        context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+        context.set_details(str(e))
+        return services_pb2.ContentBatchResponse()
+    except Exception as e:
+        REQUEST_COUNT.labels(method='GetContentBatch', status='error').inc()
+        context.set_code(grpc.StatusCode.INTERNAL)
+        context.set_details(f"Error: {str(e)}")
+        return services_pb2.ContentBatchResponse()
+    finally:
+        REQUEST_LATENCY.labels(method='GetContentBatch').observe(time.time() - start)
+
+
+def stream_content(request, context):
+    """Envia os itens filtrados em blocos de STREAM_CHUNK_SIZE.
+
+    As posições são percorridas sob demanda e cada bloco é construído só
+    quando vai ser enviado, então a memória por chamada não depende de
+    quantos itens atendem ao filtro. Todo bloco, exceto o último, traz o
+    cursor para retomar a partir dele. Antes de cada bloco confere se o
+    cliente ainda espera pelo stream.
+    """
+    start = time.time()
+    try:
+        check_deadline(context)
+        catalog = current_catalog()
+        content_type = request.type.lower() if request.type else "all"
+        sort_by, descending = parse_sort(request.sort_by, request.order)
+        start_pos = catalog.resolve_page_token(request.page_token, sort_by)
+        fields = parse_fields(request.fields)
+        if request.if_version and request.if_version == catalog.fingerprint:
+            NOT_MODIFIED_RESPONSES.labels(method='StreamContent').inc()
+            yield compress_if_large(context, 'StreamContent', not_modified_payload(catalog))
+            REQUEST_COUNT.labels(method='StreamContent', status='success').inc()
+            return
+        positions = catalog.iter_select(
+            content_type, request.genre, max(request.limit, 0), start_pos, sort_by, descending
+        )
+        
+        chunk, last_pos = [], None
+        for rank, pos in enumerate(positions, start_pos):
+            # Só envia um bloco cheio quando há certeza de que vem outro depois
+            if len(chunk) == STREAM_CHUNK_SIZE:
+                yield compress_if_large(context, 'StreamContent', services_pb2.ContentResponse(
+                    items=chunk, total=len(chunk),
+                    next_page_token=catalog.page_token(last_pos, rank - 1 if sort_by else None),
+                    catalog_version=catalog.fingerprint,
+                ).SerializeToString())
+                CONTENT_ITEMS_RETURNED.labels(content_type=content_type).inc(len(chunk))
+                chunk = []
+                check_deadline(context)
+            chunk.append(build_content_item(catalog.items[pos], fields))
+            last_pos = pos
+        if chunk:
+            yield compress_if_large(context, 'StreamContent', services_pb2.ContentResponse(
+                items=chunk, total=len(chunk), catalog_version=catalog.fingerprint
+            ).SerializeToString())
+            CONTENT_ITEMS_RETURNED.labels(content_type=content_type).inc(len(chunk))
+        
+        REQUEST_COUNT.labels(method='StreamContent', status='success').inc()
+        
+    except Abandoned as e:
+        abandon(context, 'StreamContent', e.reason)
+    except GeneratorExit:
+        # O gerador é descartado sem ser retomado quando o cliente cancela ou
+        # o prazo acaba entre um bloco e outro
+        ABANDONED_REQUESTS.labels(method='StreamContent', reason="deadline" if expired(context) else "cancelled").inc()
+        REQUEST_COUNT.labels(method='StreamContent', status='error').inc()
+        raise
+    except InvalidQuery as e:
+        REQUEST_COUNT.labels(method='StreamContent', status='error').inc()
+        context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+        context.set_details(str(e))
+    except Exception as e:
+        REQUEST_COUNT.labels(method='StreamContent', status='error').inc()
+        context.set_code(grpc.StatusCode.INTERNAL)
+        context.set_details(f"Error: {str(e)}")
+    finally:
+        REQUEST_LATENCY.labels(method='StreamContent').observe(time.time() - start)
+
+
+def search_content(request, context):
+    """Busca por texto em título e descrição, ordenada por relevância"""
+    start = time.time()
+    try:
+        catalog = current_catalog()
+        limit = request.limit if request.limit > 0 else 10
+        fields = parse_fields(request.fields)
+        positions = catalog.search(request.query, limit, request.prefix, request.type.lower())
+        items = [build_content_item(catalog.items[pos], fields) for pos in positions]
+        
+        REQUEST_COUNT.labels(method='SearchContent', status='success').inc()
+        return compress_if_large(context, 'SearchContent', services_pb2.ContentResponse(
+            items=items, total=len(items), catalog_version=catalog.fingerprint
+        ).SerializeToString())
+        
+    except InvalidQuery as e:
+        REQUEST_COUNT.labels(method='SearchContent', status='error').inc()
+        context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+        context.set_details(str(e))
+        return services_pb2.ContentResponse()
+    except Exception as e:
+        REQUEST_COUNT.labels(method='SearchContent', status='error').inc()
+        context.set_code(grpc.StatusCode.INTERNAL)
+        context.set_details(f"Error: {str(e)}")
+        return services_pb2.ContentResponse()
+    finally:
+        REQUEST_LATENCY.labels(method='SearchContent').observe(time.time() - start)
+
+
+def get_facets(request, context):
+    """Contagens por tipo, gênero e ano, já calculadas na carga do catálogo"""
+    start = time.time()
+    try:
+        catalog = current_catalog()
+        content_type = request.type.lower() if request.type else "all"
+        total, types, genres, years = catalog.facets.get(content_type, request.genre)
+        
+        REQUEST_COUNT.labels(method='GetFacets', status='success').inc()
+        return compress_if_large(context, 'GetFacets', services_pb2.FacetResponse(
+            total=total,
+            types=[services_pb2.FacetCount(value=value, count=count) for value, count in types],
+            genres=[services_pb2.FacetCount(value=value, count=count) for value, count in genres],
+            years=[services_pb2.FacetCount(value=str(value), count=count) for value, count in years],
+            catalog_version=catalog.fingerprint,
+        ).SerializeToString())
+        
+    except Exception as e:
+        REQUEST_COUNT.labels(method='GetFacets', status='error').inc()
+        context.set_code(grpc.StatusCode.INTERNAL)
+        context.set_details(f"Error: {str(e)}")
+        return services_pb2.FacetResponse()
+    finally:
+        REQUEST_LATENCY.labels(method='GetFacets').observe(time.time() - start)
+
 
 class ServiceAImpl(services_pb2_grpc.ServiceAServicer):
     def GetContent(self, request, context):
-        """Retorna catálogo de conteúdo filtrado por tipo e gênero"""
-        start = time.time()
-        try:
-            # Filtrar por tipo
-            content_type = request.type.lower() if request.type else "all"
-            filtered = CONTENT_CATALOG if content_type == "all" else [
-                c for c in CONTENT_CATALOG if c["type"] == content_type
-            ]
-            
-            # Filtrar por gênero
-            if request.genre:
-                filtered = [c for c in filtered if request.genre in c["genres"]]
-            
-            # Aplicar limite
-            limit = request.limit if request.limit > 0 else len(filtered)
-            filtered = filtered[:limit]
-            
-            # Construir resposta
-            items = [
-                services_pb2.ContentItem(
-                    id=c["id"],
-                    title=c["title"],
-                    description=c["description"],
-                    thumbnail=f"/api/thumbnails/{c['id']}.jpg",
-                    type=c["type"],
-                    genres=c["genres"],
-                    year=c["year"],
-                    rating=c["rating"],
-                    duration=c["duration"]
-                )
-                for c in filtered
-            ]
-            
-            CONTENT_ITEMS_RETURNED.labels(content_type=content_type).inc(len(items))
-            REQUEST_COUNT.labels(method='GetContent', status='success').inc()
-            
-            return services_pb2.ContentResponse(items=items, total=len(items))
-            
-        except Exception as e:
-            REQUEST_COUNT.labels(method='GetContent', status='error').inc()
-            context.set_code(grpc.StatusCode.INTERNAL)
-            context.set_details(f"Error: {str(e)}")
-            return services_pb2.ContentResponse()
-        finally:
-            REQUEST_LATENCY.labels(method='GetContent').observe(time.time() - start)
+        return get_content(request, context)
 
-def serve():
-    # Start Prometheus metrics server
-    metrics_port = int(os.environ.get("METRICS_PORT", "9101"))
-    start_http_server(metrics_port)
-    print(f"Metrics server started on :{metrics_port}", flush=True)
+    def StreamContent(self, request, context):
+        return stream_content(request, context)
+
+    def SearchContent(self, request, context):
+        return search_content(request, context)
+
+    def GetContentBatch(self, request, context):
+        return get_content_batch(request, context)
+
+    def GetFacets(self, request, context):
+        return get_facets(request, context)
+
+
+class AsyncServiceAImpl(services_pb2_grpc.ServiceAServicer):
+    """Versão asyncio (grpc.aio) do Service A; as métricas são as mesmas"""
+
+    async def GetContent(self, request, context):
+        # A consulta é só CPU sobre índices em memória, sem pontos de espera
+        return get_content(request, context)
+
+    async def StreamContent(self, request, context):
+        # Cada yield devolve o controle ao event loop entre um bloco e outro
+        for chunk in stream_content(request, context):
+            yield chunk
+
+    async def SearchContent(self, request, context):
+        return search_content(request, context)
+
+    async def GetContentBatch(self, request, context):
+        return get_content_batch(request, context)
+
+    async def GetFacets(self, request, context):
+        return get_facets(request, context)
+
+
+def serialize_response(response):
+    """Serializador que aceita tanto mensagens quanto bytes pré-serializados"""
+    if isinstance(response, bytes):
+        return response
+    return response.SerializeToString()
+
+
+def add_service_a_to_server(servicer, server):
+    """Equivalente a add_ServiceAServicer_to_server, mas permitindo que os
+    handlers devolvam respostas já serializadas"""
+    rpc_method_handlers = {
+        'GetContent': grpc.unary_unary_rpc_method_handler(
+            servicer.GetContent,
+            request_deserializer=services_pb2.ContentRequest.FromString,
+            response_serializer=serialize_response,
+        ),
+        'StreamContent': grpc.unary_stream_rpc_method_handler(
+            servicer.StreamContent,
+            request_deserializer=services_pb2.ContentRequest.FromString,
+            response_serializer=serialize_response,
+        ),
+        'SearchContent': grpc.unary_unary_rpc_method_handler(
+            servicer.SearchContent,
+            request_deserializer=services_pb2.SearchRequest.FromString,
+            response_serializer=serialize_response,
+        ),
+        'GetContentBatch': grpc.unary_unary_rpc_method_handler(
+            servicer.GetContentBatch,
+            request_deserializer=services_pb2.ContentBatchRequest.FromString,
+            response_serializer=serialize_response,
+        ),
+        'GetFacets': grpc.unary_unary_rpc_method_handler(
+            servicer.GetFacets,
+            request_deserializer=services_pb2.FacetRequest.FromString,
+            response_serializer=serialize_response,
+        ),
+    }
+    generic_handler = grpc.method_handlers_generic_handler('pspd.ServiceA', rpc_method_handlers)
+    server.add_generic_rpc_handlers((generic_handler,))
+
+
+async def serve_aio(port, max_concurrent_rpcs):
+    """Servidor grpc.aio; `max_concurrent_rpcs` limita as RPCs em andamento"""
+    # Controle de admissão pelo atraso do event loop, ligado por qualquer
+    # CONCURRENCY_LIMIT > 0; o limite de concorrência AIMD é só do modo thread,
+    # aqui o limite em vigor é o max_concurrent_rpcs (0 = sem limite)
+    CONCURRENCY_LIMIT.set(max_concurrent_rpcs or 0)
+    admission = None
+    if int(os.environ.get("CONCURRENCY_LIMIT", "0")) > 0:
+        admission = AsyncAdmissionControl(REQUEST_COUNT, float(os.environ.get("CONCURRENCY_TARGET_DELAY", "0.01")))
+    server = grpc.aio.server(
+        interceptors=[admission] if admission else None,
+        maximum_concurrent_rpcs=max_concurrent_rpcs,
+        options=[("grpc.so_reuseport", 1)] + compression_options(),
+    )
+    add_service_a_to_server(AsyncServiceAImpl(), server)
+    server.add_insecure_port(f"[::]:{port}")
+    await server.start()
+    lag_watcher = asyncio.create_task(admission.watch_loop_lag()) if admission else None
+    print(f"Service A (aio, max_concurrent_rpcs={max_concurrent_rpcs}, pid={os.getpid()}) listening on :{port}", flush=True)
+    try:
+        await server.wait_for_termination()
+    finally:
+        if lag_watcher:
+            lag_watcher.cancel()
+        await server.stop(0)
+
+
+def run_server(port):
+    """Executa o servidor gRPC no processo atual até ser interrompido"""
+    # CATALOG_PATH: recarrega o catálogo quando o arquivo muda (threads não
+    # sobrevivem ao fork, então cada worker observa o arquivo)
+    catalog_path = os.environ.get("CATALOG_PATH")
+    if catalog_path:
+        watch_catalog_file(
+            catalog_path, float(os.environ.get("CATALOG_RELOAD_INTERVAL", "5")),
+            os.environ.get("CATALOG_BACKEND", "columnar"),
+        )
     
-    port = int(os.environ.get("PORT", "50051"))
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
-    services_pb2_grpc.add_ServiceAServicer_to_server(ServiceAImpl(), server)
+    # SERVER_MODE=aio usa grpc.aio (asyncio); o padrão continua sendo o pool de threads
+    if os.environ.get("SERVER_MODE", "thread") == "aio":
+        max_concurrent_rpcs = int(os.environ.get("MAX_CONCURRENT_RPCS", "1000")) or None
+        try:
+            asyncio.run(serve_aio(port, max_concurrent_rpcs))
+        except KeyboardInterrupt:
+            pass
+        return
+    
+    # CONCURRENCY_LIMIT: controle de admissão adaptativo (0, o padrão, desabilita)
+    limiter = admission_limiter()
+    # SO_REUSEPORT permite que vários processos escutem na mesma porta
+    server = grpc.server(
+        futures.ThreadPoolExecutor(max_workers=10),
+        interceptors=[ThreadAdmissionControl(REQUEST_COUNT, limiter)] if limiter else None,
+        options=[("grpc.so_reuseport", 1)] + compression_options(),
+    )
+    add_service_a_to_server(ServiceAImpl(), server)
     server.add_insecure_port(f"[::]:{port}")
     server.start()
-    print(f"Service A listening on :{port}", flush=True)
+    print(f"Service A listening on :{port} (pid={os.getpid()})", flush=True)
     try:
         while True:
             time.sleep(86400)
     except KeyboardInterrupt:
         server.stop(0)
 
+
+def serve():
+    metrics_port = int(os.environ.get("METRICS_PORT", "9101"))
+    port = int(os.environ.get("PORT", "50051"))
+    
+    # CATALOG_PATH: catálogo em arquivo JSONL, em colunas compactas
+    # (CATALOG_BACKEND=columnar, padrão) ou mapeado em memória (mmap); sem
+    # ele, usa o catálogo embutido. Carregado antes do fork dos workers, que
+    # compartilham as páginas do catálogo por copy-on-write.
+    catalog_path = os.environ.get("CATALOG_PATH")
+    if catalog_path:
+        swap_catalog(load_catalog_file(catalog_path, os.environ.get("CATALOG_BACKEND", "columnar")))
+        print(f"Catalog loaded from {catalog_path}: {len(current_catalog())} items", flush=True)
+    CATALOG_ITEMS.set(len(current_catalog()))
+    
+    # WORKERS > 1: vários processos por pod para usar todos os núcleos (sem GIL compartilhado)
+    workers = int(os.environ.get("WORKERS", "1"))
+    if workers > 1:
+        serve_workers(run_server, port, metrics_port, workers)
+        return
+    
+    # Start Prometheus metrics server
+    start_http_server(metrics_port)
+    print(f"Metrics server started on :{metrics_port}", flush=True)
+    
+    run_server(port)
+
 if __name__ == "__main__":
     serve()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Os testes importam os módulos do Service A como o server.py os importa
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
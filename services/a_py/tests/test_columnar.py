@@ -0,0 +1,94 @@
+"""Catálogo colunar: mesmos itens e índices do catálogo em dicts, limites
+dos códigos e recarregamento do arquivo sem reiniciar"""
+import time
+
+import pytest
+
+import catalog
+from catalog import CONTENT_CATALOG, CatalogIndex, load_catalog_file, swap_catalog, watch_catalog_file, write_catalog_file
+from columnar import ColumnarCatalog
+
+
+def item(pos, content_type="movie", genres=("Drama",)):
+    return {"id": f"i{pos}", "title": f"Título {pos}", "description": "Descrição", "type": content_type,
+            "genres": list(genres), "year": 2000 + pos % 25, "rating": pos % 10 + 0.5, "duration": "1h"}
+
+
+def test_items_round_trip():
+    columnar = ColumnarCatalog(CONTENT_CATALOG)
+    assert len(columnar) == len(CONTENT_CATALOG)
+    assert list(columnar) == CONTENT_CATALOG
+    assert columnar[-1] == CONTENT_CATALOG[-1]
+    with pytest.raises(IndexError):
+        columnar[len(CONTENT_CATALOG)]
+
+
+def test_id_index():
+    columnar = ColumnarCatalog(CONTENT_CATALOG)
+    for pos, entry in enumerate(CONTENT_CATALOG):
+        assert columnar.ids.get(entry["id"]) == pos
+    assert columnar.ids.get("inexistente") is None
+
+
+def test_indexes_match_dict_catalog():
+    columnar, plain = CatalogIndex(ColumnarCatalog(CONTENT_CATALOG)), CatalogIndex(CONTENT_CATALOG)
+    assert columnar.by_type == plain.by_type
+    assert columnar.by_genre == plain.by_genre
+    assert columnar.sorted_by == plain.sorted_by
+    assert columnar.search("cidade") == plain.search("cidade")
+
+
+def test_many_distinct_types_fit():
+    items = [item(pos, content_type=f"tipo{pos}") for pos in range(300)]
+    columnar = ColumnarCatalog(items)
+    assert [entry["type"] for entry in columnar] == [entry["type"] for entry in items]
+
+
+def test_too_many_distinct_genres_is_rejected():
+    items = [item(pos, genres=[f"g{pos}"]) for pos in range(1 << 16)] + [item(0, genres=["mais um"])]
+    with pytest.raises(ValueError, match="distinct genres"):
+        ColumnarCatalog(items)
+
+
+def test_reserved_separator_is_rejected():
+    entry = dict(item(0), title="a\x1fb")
+    with pytest.raises(ValueError, match="U\\+001F"):
+        ColumnarCatalog([entry])
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.01)
+
+
+def test_hot_reload(tmp_path, monkeypatch):
+    # Restaura o catálogo do módulo ao fim do teste
+    monkeypatch.setattr(catalog, "_current", catalog.current_catalog())
+    monkeypatch.setattr(catalog, "_listeners", [])
+    path = tmp_path / "catalog.jsonl"
+    write_catalog_file([item(pos) for pos in range(10)], path)
+    swap_catalog(load_catalog_file(path))
+    first = catalog.current_catalog()
+    assert isinstance(first.items, ColumnarCatalog)
+    swapped = []
+    catalog.on_catalog_change(swapped.append)
+
+    watch_catalog_file(path, interval=0.01)
+    write_catalog_file([item(pos, content_type="series") for pos in range(20)], path)
+    wait_for(lambda: catalog.current_catalog() is not first)
+    second = catalog.current_catalog()
+    assert swapped == [second]
+    assert len(second) == 20 and second.version > first.version
+    assert second.get("i19")["type"] == "series"
+    assert first.get("i9")["type"] == "movie"  # quem ainda o usa segue com o índice anterior
+
+    # Arquivo inválido: o catálogo atual é mantido
+    path.write_text("{nao e json\n")
+    time.sleep(0.1)
+    assert catalog.current_catalog() is second
+    write_catalog_file([item(99)], path)
+    wait_for(lambda: catalog.current_catalog() is not second)
+    assert catalog.current_catalog().get("i99") is not None
@@ -0,0 +1,96 @@
+"""Busca textual: mesma resposta que pontuar todos os itens, em qualquer caminho
+(listas de posições, bitmaps de termos frequentes, filtro de tipo)"""
+import random
+
+import pytest
+
+from postings import to_bitmap
+from search import TITLE_WEIGHT, SearchIndex, tokenize
+
+WORDS = ["dragão", "cidade", "sombria", "noite", "jornada", "guardião", "memória",
+         "ação", "drama", "dramático", "drone", "oceano", "estrela", "estrelado"]
+TYPES = ["movie", "series", "live"]
+
+
+def synthetic_items(size, seed=7):
+    rng = random.Random(seed)
+    return [{
+        "id": f"i{pos}",
+        "title": " ".join(rng.choices(WORDS[:6], k=rng.randint(1, 3)) + rng.choices(WORDS, k=1)),
+        "description": " ".join(rng.choices(WORDS, k=rng.randint(0, 5))),
+        "type": rng.choice(TYPES),
+    } for pos in range(size)]
+
+
+def brute_force(index, items, query, limit, prefix=False, content_type=""):
+    """Pontua todos os itens: soma, por termo, do maior peso x idf entre as
+    palavras do item que casam com ele"""
+    terms = tokenize(query)
+    if not terms:
+        return []
+    ranked = []
+    for pos, item in enumerate(items):
+        if content_type and item["type"] != content_type:
+            continue
+        title, description = set(tokenize(item["title"])), set(tokenize(item["description"]))
+        score = 0.0
+        for i, term in enumerate(terms):
+            last = prefix and i == len(terms) - 1
+            best = 0.0
+            for token in title | description:
+                if token == term or (last and token.startswith(term)):
+                    weight = TITLE_WEIGHT * (token in title) + (token in description)
+                    best = max(best, weight * index.idf(token))
+            if not best:
+                break
+            score += best
+        else:
+            ranked.append((-round(score, 9), pos))
+    return [pos for _, pos in sorted(ranked)[:limit]]
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    items = synthetic_items(3000)
+    return items, SearchIndex(items)
+
+
+QUERIES = [
+    ("dragão", False), ("cidade sombria", False), ("cidade sombria noite", False),
+    ("Ação drama", False), ("dra", True), ("cidade est", True), ("oceano estrelado", False),
+    ("inexistente", False), ("de da do", False),
+]
+
+
+@pytest.mark.parametrize("query, prefix", QUERIES)
+@pytest.mark.parametrize("limit", [1, 10, 500])
+def test_search_matches_brute_force(catalog, query, prefix, limit):
+    items, index = catalog
+    assert index.search(query, limit, prefix) == brute_force(index, items, query, limit, prefix)
+
+
+@pytest.mark.parametrize("query, prefix", QUERIES)
+def test_type_filter_with_and_without_bitmap(catalog, query, prefix):
+    items, index = catalog
+    allowed = [pos for pos, item in enumerate(items) if item["type"] == "series"]
+    expected = brute_force(index, items, query, 50, prefix, "series")
+    assert index.search(query, 50, prefix, allowed, to_bitmap(allowed, len(items))) == expected
+    # Sem o bitmap do filtro a busca cai nas listas de posições
+    assert index.search(query, 50, prefix, allowed) == expected
+
+
+def test_frequent_terms_have_bitmaps(catalog):
+    _, index = catalog
+    assert "cidade" in index.bitmaps and "sombria" in index.bitmaps
+
+
+def test_empty_filter_returns_nothing(catalog):
+    _, index = catalog
+    assert index.search("cidade sombria", 10, allowed=[], allowed_bitmap=None) == []
+
+
+def test_accents_and_case_are_folded():
+    index = SearchIndex([{"title": "Ação na Cidade", "description": "Um DRAGÃO"}])
+    assert index.search("acao cidade") == [0]
+    assert index.search("dragao") == [0]
+    assert index.search("DRAG", prefix=True) == [0]
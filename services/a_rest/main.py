@@ -1,9 +1,114 @@
-from fastapi import FastAPI
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Header, Response
+from typing import Optional
 import time
+import gzip
+import hashlib
+import json
+import heapq
+import os
+import sys
+import zlib
+from collections import Counter
+from functools import lru_cache
+from itertools import islice
+
+# Índices de busca, facetas e listas de posições do Service A
+# (services/a_py); na imagem ficam junto do main.py (ver Dockerfile)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "a_py"))
+from facets import FacetIndex  # noqa: E402
+from postings import iter_intersection, to_bitmap  # noqa: E402
+from search import SearchIndex  # noqa: E402
+
+try:
+    import orjson
+except ImportError:  # backend opcional; sem ele fica o json da stdlib
+    orjson = None
 
 app = FastAPI(title="A-REST-Streaming")
 
+
+def dumps_stdlib(content) -> bytes:
+    """Mesma saída do JSONResponse: compacta, UTF-8 sem escapes"""
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+# JSON_BACKEND: "orjson" (padrão quando instalado) ou "json" (stdlib); os
+# dois produzem os mesmos bytes para o catálogo
+JSON_ENCODERS = {"json": dumps_stdlib}
+if orjson is not None:
+    JSON_ENCODERS["orjson"] = orjson.dumps
+JSON_BACKEND = os.environ.get("JSON_BACKEND", "orjson" if orjson is not None else "json")
+if JSON_BACKEND not in JSON_ENCODERS:
+    raise RuntimeError(f"JSON_BACKEND={JSON_BACKEND} unavailable (options: {', '.join(JSON_ENCODERS)})")
+dumps = JSON_ENCODERS[JSON_BACKEND]
+
+
+# Compressão negociada pelo Accept-Encoding: RESPONSE_COMPRESSION é o
+# algoritmo preferido (o outro é usado se o cliente só aceitar ele; "none"
+# desativa), como no Service A. Corpos menores que COMPRESSION_MIN_BYTES vão
+# sem compressão.
+COMPRESSION_LEVEL = 6
+COMPRESSORS = {
+    "gzip": lambda body: gzip.compress(body, COMPRESSION_LEVEL, mtime=0),
+    "deflate": lambda body: zlib.compress(body, COMPRESSION_LEVEL),
+}
+RESPONSE_COMPRESSION = os.environ.get("RESPONSE_COMPRESSION", "gzip")
+if RESPONSE_COMPRESSION not in COMPRESSORS and RESPONSE_COMPRESSION != "none":
+    raise RuntimeError(f"RESPONSE_COMPRESSION={RESPONSE_COMPRESSION} unknown (options: gzip, deflate, none)")
+ENCODINGS = sorted(COMPRESSORS, key=lambda e: e != RESPONSE_COMPRESSION) if RESPONSE_COMPRESSION != "none" else []
+COMPRESSION_MIN_BYTES = int(os.environ.get("COMPRESSION_MIN_BYTES", "1024"))
+
+
+@lru_cache(maxsize=256)
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Algoritmo de maior `q` no Accept-Encoding entre os oferecidos (empate
+    fica com o preferido), ou None para enviar sem compressão"""
+    if not accept_encoding or not ENCODINGS:
+        return None
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name.strip().lower()] = q
+    best, best_q = None, 0.0
+    for encoding in ENCODINGS:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def json_response(content, status_code: int = 200, headers: Optional[dict] = None,
+                  accept_encoding: Optional[str] = None) -> Response:
+    """JSONResponse com o codificador de JSON_BACKEND"""
+    return raw_json_response(dumps(content), headers, accept_encoding, status_code=status_code)
+
+
+def raw_json_response(body: bytes, headers: Optional[dict] = None, accept_encoding: Optional[str] = None,
+                      compressed=None, status_code: int = 200) -> Response:
+    """Resposta com um corpo JSON já codificado, comprimido conforme o
+    `accept_encoding` do cliente. `compressed(encoding)`, se informado,
+    devolve o corpo já comprimido (de um cache) em vez de comprimir de novo.
+    """
+    if not ENCODINGS or len(body) < COMPRESSION_MIN_BYTES:
+        return Response(body, status_code=status_code, headers=headers, media_type="application/json")
+    headers = {**(headers or {}), "Vary": "Accept-Encoding"}
+    encoding = negotiate_encoding(accept_encoding)
+    if encoding:
+        body = compressed(encoding) if compressed else COMPRESSORS[encoding](body)
+        headers["Content-Encoding"] = encoding
+        # Os bytes mudam com a codificação: o ETag da versão vale como fraco
+        if "ETag" in headers:
+            headers["ETag"] = "W/" + headers["ETag"]
+    return Response(body, status_code=status_code, headers=headers, media_type="application/json")
+
 # Catálogo de conteúdo
 CONTENT_CATALOG = [
     {"id": "m1", "title": "A Jornada Infinita", "description": "Uma aventura épica através das galáxias",
@@ -20,32 +125,196 @@ CONTENT_CATALOG = [
      "type": "series", "genres": ["Suspense", "Sobrenatural"], "year": 2023, "rating": 8.8, "duration": "2 temporadas"},
 ]
 
-@app.get("/api/content")
-def get_content(type: str = "all", limit: int = 20, genre: str = ""):
-    """Retorna catálogo de conteúdo filtrado"""
-    # Filtrar por tipo
-    filtered = CONTENT_CATALOG if type == "all" else [
-        c for c in CONTENT_CATALOG if c["type"] == type
-    ]
-    
-    # Filtrar por gênero
+# Campos aceitos em sort_by
+SORT_KEYS = ("rating", "year")
+
+# Campos de cada item que podem ser pedidos em `fields`
+CONTENT_FIELDS = ("id", "title", "description", "type", "genres", "year", "rating", "duration")
+
+# Índices construídos uma única vez sobre o catálogo: posições por tipo e por
+# gênero (listas ordenadas) e mapa id -> posição
+CONTENT_BY_ID = {c["id"]: pos for pos, c in enumerate(CONTENT_CATALOG)}
+TYPE_INDEX = {}
+GENRE_INDEX = {}
+for _pos, _item in enumerate(CONTENT_CATALOG):
+    TYPE_INDEX.setdefault(_item["type"], []).append(_pos)
+    for _genre in _item["genres"]:
+        GENRE_INDEX.setdefault(_genre, []).append(_pos)
+
+# Versão do catálogo: hash do conteúdo (mesmo esquema do catalog_version do
+# Service A), usado como ETag das respostas de conteúdo
+CATALOG_VERSION = hashlib.blake2b(digest_size=8)
+for _item in CONTENT_CATALOG:
+    CATALOG_VERSION.update(json.dumps(_item, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+CATALOG_VERSION = CATALOG_VERSION.hexdigest()
+ETAG = f'"{CATALOG_VERSION}"'
+
+# Cada item já codificado em JSON: as respostas de listagem, busca e
+# detalhe juntam esses bytes em vez de recodificar os mesmos itens
+ITEM_JSON = [dumps(item) for item in CONTENT_CATALOG]
+
+# Corpos de /api/content por consulta (tipo, gênero, limite, ordenação,
+# projeção); RESPONSE_CACHE_SIZE=0 desabilita
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", "256"))
+
+
+def etag_matches(if_none_match: Optional[str]) -> bool:
+    """Indica se o If-None-Match do cliente já cobre a versão atual do catálogo"""
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or any(t.removeprefix("W/") == ETAG for t in tags)
+
+
+def iter_positions(type: str, genre: str):
+    """Intersecta as listas de posições de tipo e gênero, na ordem do catálogo"""
+    postings = []
+    if type != "all":
+        postings.append(TYPE_INDEX.get(type, []))
     if genre:
-        filtered = [c for c in filtered if genre in c["genres"]]
+        postings.append(GENRE_INDEX.get(genre, []))
+    if not postings:
+        return iter(range(len(CONTENT_CATALOG)))
+    return iter_intersection(postings)
+
+
+def query_catalog(type: str, genre: str, limit: int, sort_by: str = "", order: str = "desc"):
+    """Posições dos itens filtrados por tipo e gênero, até `limit`.
+
+    Com `sort_by` ("rating" ou "year"), devolve o top-k selecionado com heap,
+    sem ordenar o resultado inteiro. Empates seguem a ordem do catálogo em
+    "desc" e a inversa em "asc" (mesma semântica do Service A gRPC).
+    `limit <= 0` é fatiado como na lista completa (`[:limit]`): 0 não
+    devolve nenhum item e um negativo descarta os últimos.
+    """
+    positions = iter_positions(type, genre)
+    if sort_by:
+        sign = -1 if order == "desc" else 1
+        key = lambda p: (sign * CONTENT_CATALOG[p][sort_by], -sign * p)
+        if limit > 0:
+            return heapq.nsmallest(limit, positions, key=key)
+        positions = sorted(positions, key=key)
+    elif limit > 0:
+        return list(islice(positions, limit))
+    return list(positions)[:limit]
+
+
+@lru_cache(maxsize=4096)
+def projected_item_json(pos: int, projection: tuple) -> bytes:
+    """Item já codificado com só os campos de `projection`, na ordem pedida"""
+    item = CONTENT_CATALOG[pos]
+    return dumps({f: item[f] for f in projection})
+
+
+def items_json(positions, projection: tuple = ()) -> bytes:
+    """Array JSON dos itens, montado a partir dos itens já codificados"""
+    if projection:
+        return b"[" + b",".join(projected_item_json(p, projection) for p in positions) + b"]"
+    return b"[" + b",".join(ITEM_JSON[p] for p in positions) + b"]"
+
+
+@lru_cache(maxsize=RESPONSE_CACHE_SIZE)
+def content_body(type: str, genre: str, limit: int, sort_by: str, order: str, projection: tuple) -> bytes:
+    """Corpo de /api/content: os mesmos bytes que o JSONResponse geraria, sem
+    codificar os itens de novo"""
+    positions = query_catalog(type, genre, limit, sort_by, order)
+    return (b'{"items":' + items_json(positions, projection)
+            + b',"total":' + str(len(positions)).encode()
+            + b',"catalogVersion":' + dumps(CATALOG_VERSION)
+            + b',"source":"A-REST"}')
+
+
+@lru_cache(maxsize=RESPONSE_CACHE_SIZE)
+def compressed_content_body(encoding: str, *query) -> bytes:
+    """Corpo de /api/content já comprimido com `encoding`: respostas
+    frequentes são comprimidas uma vez, não a cada requisição"""
+    return COMPRESSORS[encoding](content_body(*query))
+
+
+@app.get("/api/content")
+def get_content(type: str = "all", limit: int = 20, genre: str = "", sort_by: str = "", order: str = "desc",
+                fields: str = "", if_none_match: Optional[str] = Header(None),
+                accept_encoding: Optional[str] = Header(None)):
+    """Retorna catálogo de conteúdo filtrado, opcionalmente ordenado por nota ou ano.
+
+    `fields` (ex.: "id,title,rating") devolve só esses campos de cada item.
+    Com If-None-Match igual ao ETag (versão do catálogo), responde 304 sem corpo.
+    Respostas a partir de COMPRESSION_MIN_BYTES vão comprimidas (gzip ou
+    deflate) se o Accept-Encoding permitir.
+    """
+    if sort_by and sort_by not in SORT_KEYS:
+        return json_response({"error": f"sort_by must be one of {', '.join(SORT_KEYS)}"}, status_code=400)
+    if order not in ("asc", "desc"):
+        return json_response({"error": "order must be 'asc' or 'desc'"}, status_code=400)
+    projection = [f for f in fields.split(",") if f]
+    unknown = [f for f in projection if f not in CONTENT_FIELDS]
+    if unknown:
+        return json_response({"error": f"unknown fields: {', '.join(unknown)}"}, status_code=400)
     
-    # Aplicar limite
-    filtered = filtered[:limit]
+    if etag_matches(if_none_match):
+        return Response(status_code=304, headers={"ETag": ETAG})
     
-    return JSONResponse({
-        "items": filtered,
-        "total": len(filtered),
+    # Filtrar por tipo e gênero via índice, já aplicando o limite; o corpo
+    # sai do cache ou é montado com os itens já codificados
+    query = (type, genre, limit, sort_by, order, tuple(projection))
+    return raw_json_response(content_body(*query), {"ETag": ETAG}, accept_encoding,
+                             lambda encoding: compressed_content_body(encoding, *query))
+
+# Facetas: contagens por tipo, gênero e ano para cada filtro (tipo, gênero),
+# calculadas uma única vez sobre o catálogo (o mesmo FacetIndex do GetFacets)
+FACETS = FacetIndex(Counter(
+    (item["type"], tuple(sorted(item["genres"])), item["year"]) for item in CONTENT_CATALOG
+))
+
+
+def facet_counts(counts):
+    """Lista [{"value", "count"}] na ordem do FacetIndex"""
+    return [{"value": str(value), "count": count} for value, count in counts]
+
+
+@app.get("/api/facets")
+def get_facets(type: str = "all", genre: str = "", accept_encoding: Optional[str] = Header(None)):
+    """Quantidade de itens por tipo, gênero e ano, dentro do filtro informado"""
+    total, types, genres, years = FACETS.get(type, genre)
+    return json_response({
+        "total": total,
+        "types": facet_counts(types),
+        "genres": facet_counts(genres),
+        "years": facet_counts(years),
+        "catalogVersion": CATALOG_VERSION,
         "source": "A-REST"
-    })
+    }, headers={"ETag": ETAG}, accept_encoding=accept_encoding)
+
+
+# Busca textual: o mesmo SearchIndex do SearchContent do Service A, com o
+# filtro de tipo também como bitmap
+SEARCH_INDEX = SearchIndex(CONTENT_CATALOG)
+TYPE_BITMAPS = {
+    content_type: to_bitmap(positions, len(CONTENT_CATALOG)) for content_type, positions in TYPE_INDEX.items()
+}
+
+
+def search_catalog(q: str, limit: int, prefix: bool, type: str):
+    """Posições dos itens que contêm todos os termos de `q`, do mais relevante"""
+    if type and type != "all":
+        return SEARCH_INDEX.search(q, limit, prefix, TYPE_INDEX.get(type, []), TYPE_BITMAPS.get(type))
+    return SEARCH_INDEX.search(q, limit, prefix)
+
+
+@app.get("/api/search")
+def search(q: str = "", limit: int = 10, prefix: bool = False, type: str = "all",
+           accept_encoding: Optional[str] = Header(None)):
+    """Busca por texto em título e descrição, ordenada por relevância"""
+    positions = search_catalog(q, limit, prefix, type)
+    return raw_json_response(
+        b'{"items":' + items_json(positions) + b',"total":' + str(len(positions)).encode() + b',"source":"A-REST"}',
+        accept_encoding=accept_encoding,
+    )
 
 @app.get("/api/content/{content_id}")
 def get_content_by_id(content_id: str):
     """Retorna detalhes de um conteúdo específico"""
-    for item in CONTENT_CATALOG:
-        if item["id"] == content_id:
-            return JSONResponse(item)
-    return JSONResponse({"error": "Content not found"}, status_code=404)
-
+    pos = CONTENT_BY_ID.get(content_id)
+    if pos is not None:
+        return raw_json_response(ITEM_JSON[pos])
+    return json_response({"error": "Content not found"}, status_code=404)
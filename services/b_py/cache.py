@@ -0,0 +1,53 @@
+"""Cache LRU com TTL por entrada, seguro para uso entre threads"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Mapa com no máximo `maxsize` entradas, cada uma válida por `ttl` segundos.
+
+    Descarta a menos usada quando cheio; entradas vencidas são removidas ao
+    serem consultadas. `maxsize <= 0` desabilita o cache (toda consulta é
+    miss); `ttl <= 0` mantém as entradas até serem descartadas pelo LRU.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        """(valor, vencida): valor None em miss; vencida indica que a entrada
+        existia mas passou do TTL e foi removida"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None, False
+            value, expires_at = entry
+            if self.ttl > 0 and time.monotonic() >= expires_at:
+                del self._data[key]
+                return None, True
+            self._data.move_to_end(key)
+            return value, False
+
+    def put(self, key, value):
+        """Armazena `value` e retorna quantas entradas foram descartadas"""
+        if self.maxsize <= 0:
+            return 0
+        evicted = 0
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                evicted += 1
+        return evicted
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
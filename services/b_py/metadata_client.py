@@ -0,0 +1,125 @@
+"""Cliente do MultiplexMetadata: muitas consultas de metadados sobre poucas chamadas"""
+import asyncio
+import itertools
+
+import grpc
+
+from proto import services_pb2, services_pb2_grpc
+
+
+class MetadataLookupError(Exception):
+    """Consulta que o Service B respondeu com error"""
+
+
+class _MultiplexedCall:
+    """Uma chamada MultiplexMetadata aberta e as consultas pendentes nela"""
+
+    def __init__(self, stub):
+        self.closed = False
+        self.pending = {}  # correlation_id -> fila dos resultados da consulta
+        self._outgoing = asyncio.Queue()
+        self._call = stub.MultiplexMetadata(self._lookups())
+        self._reader = asyncio.create_task(self._read())
+
+    async def _lookups(self):
+        while (lookup := await self._outgoing.get()) is not None:
+            yield lookup
+
+    async def _read(self):
+        try:
+            async for result in self._call:
+                results = self.pending.get(result.correlation_id)
+                if results is not None:  # consulta abandonada pelo chamador
+                    results.put_nowait(result)
+        except grpc.aio.AioRpcError as e:
+            self._fail(e)
+        except BaseException as e:
+            # Leitura cancelada ou erro inesperado: as consultas pendentes
+            # recebem o erro em vez de esperar para sempre
+            self._call.cancel()
+            error = ConnectionError("Leitura da MultiplexMetadata interrompida")
+            error.__cause__ = e
+            self._fail(error)
+            raise
+        else:
+            self._fail(ConnectionError("MultiplexMetadata encerrada com consultas pendentes"))
+
+    def _fail(self, error):
+        self.closed = True
+        for results in self.pending.values():
+            results.put_nowait(error)
+
+    def send(self, correlation_id, request):
+        """Envia a consulta e retorna a fila onde chegam seus resultados"""
+        results = self.pending[correlation_id] = asyncio.Queue()
+        self._outgoing.put_nowait(services_pb2.MetadataLookup(correlation_id=correlation_id, request=request))
+        return results
+
+    async def close(self):
+        """Encerra o envio e espera as consultas pendentes terminarem"""
+        self._outgoing.put_nowait(None)
+        await self._reader
+
+
+class MultiplexedMetadataClient:
+    """Consultas de metadados multiplexadas sobre `streams` chamadas MultiplexMetadata.
+
+    As chamadas são abertas na primeira consulta e reaproveitadas por todas
+    as seguintes, sem o custo de abrir uma chamada por consulta. Cada
+    consulta vai para a chamada com menos consultas pendentes; os
+    resultados voltam pelo correlation_id, fora de ordem. Uma chamada que
+    falha entrega o erro às suas consultas pendentes e é reaberta na
+    próxima consulta.
+
+    Uso, dentro de um event loop:
+
+        async with MultiplexedMetadataClient(channel) as client:
+            items = await client.lookup("m1", "user-1")
+    """
+
+    def __init__(self, channel, streams=4):
+        self._stub = services_pb2_grpc.ServiceBStub(channel)
+        self._calls = [None] * streams
+        self._ids = itertools.count(1)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def _least_loaded_call(self):
+        for i, call in enumerate(self._calls):
+            if call is None or call.closed:
+                self._calls[i] = _MultiplexedCall(self._stub)
+        return min(self._calls, key=lambda call: len(call.pending))
+
+    async def stream(self, content_id, user_id="", batch_size=0):
+        """Itens de uma consulta (MetadataItem), à medida que os lotes chegam"""
+        correlation_id = next(self._ids)
+        call = self._least_loaded_call()
+        request = services_pb2.MetadataRequest(content_id=content_id, user_id=user_id, batch_size=batch_size)
+        results = call.send(correlation_id, request)
+        try:
+            while True:
+                result = await results.get()
+                if isinstance(result, Exception):
+                    raise result
+                for item in result.items:
+                    yield item
+                if result.done:
+                    if result.error:
+                        raise MetadataLookupError(result.error)
+                    return
+        finally:
+            call.pending.pop(correlation_id, None)
+
+    async def lookup(self, content_id, user_id="", batch_size=0):
+        """Todos os itens de uma consulta"""
+        return [item async for item in self.stream(content_id, user_id, batch_size)]
+
+    async def close(self):
+        for call in self._calls:
+            if call is not None and not call.closed:
+                await call.close()
+        self._calls = [None] * len(self._calls)
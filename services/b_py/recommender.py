@@ -0,0 +1,240 @@
+"""Recomendações do Service B: embeddings de itens e perfis de usuário em NumPy"""
+import json
+import math
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+
+import numpy as np
+
+# Catálogo embutido (mesmos itens do Service A), usado quando não há CATALOG_PATH
+CONTENT_CATALOG = [
+    {"id": "m1", "title": "A Jornada Infinita", "type": "movie", "genres": ["Ficção Científica", "Aventura"], "year": 2024, "rating": 8.7},
+    {"id": "m2", "title": "Segredos do Passado", "type": "movie", "genres": ["Thriller", "Drama"], "year": 2024, "rating": 8.2},
+    {"id": "m3", "title": "Risadas na Cidade", "type": "movie", "genres": ["Comédia", "Romance"], "year": 2024, "rating": 7.5},
+    {"id": "m4", "title": "O Último Guardião", "type": "movie", "genres": ["Ação", "Aventura"], "year": 2023, "rating": 8.9},
+    {"id": "s1", "title": "Dimensões Paralelas", "type": "series", "genres": ["Ficção Científica", "Drama"], "year": 2024, "rating": 9.1},
+    {"id": "s2", "title": "Cidade Sombria", "type": "series", "genres": ["Suspense", "Sobrenatural"], "year": 2023, "rating": 8.8},
+    {"id": "s3", "title": "Família Moderna", "type": "series", "genres": ["Comédia", "Família"], "year": 2024, "rating": 7.9},
+    {"id": "s4", "title": "Império do Crime", "type": "series", "genres": ["Drama", "Crime"], "year": 2023, "rating": 9.3},
+    {"id": "ch1", "title": "Canal Premium", "type": "live", "genres": ["Entretenimento"], "year": 2024, "rating": 8.5},
+    {"id": "ch2", "title": "Canal Notícias", "type": "live", "genres": ["Notícias"], "year": 2024, "rating": 8.0},
+    {"id": "ch3", "title": "Canal Esportes", "type": "live", "genres": ["Esportes"], "year": 2024, "rating": 9.0},
+]
+
+# Décadas usadas no embedding: antes de 1980, anos 80, 90, 2000, 2010 e 2020+
+ERA_BOUNDS = (1980, 1990, 2000, 2010, 2020)
+
+# Peso de cada bloco do embedding (gêneros, tipo, década) antes da normalização
+GENRE_WEIGHT = 1.0
+TYPE_WEIGHT = 0.5
+ERA_WEIGHT = 0.5
+
+# Peso do item consultado frente ao perfil do usuário no vetor de consulta
+ITEM_WEIGHT = 0.6
+
+# Fração de cada visualização incorporada ao perfil (média móvel exponencial)
+PROFILE_LEARNING_RATE = 0.2
+
+# Usuários sem perfil (o gateway envia "guest" quando não há userId)
+ANONYMOUS_USERS = ("", "guest")
+
+
+def load_catalog_file(path):
+    """Itens do catálogo em JSONL (mesmo formato exportado para o Service A)"""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class UserProfiles:
+    """Vetores de perfil dos usuários numa matriz NumPy, com descarte LRU.
+
+    Cada usuário ocupa uma linha; a matriz cresce dobrando até `capacity`
+    linhas e, cheia, a linha do usuário menos recente é reaproveitada.
+    `capacity` 0 desativa os perfis.
+    """
+
+    def __init__(self, dim, capacity):
+        self.capacity = capacity
+        self.vectors = np.zeros((min(capacity, 1024), dim), dtype=np.float32)
+        self._rows = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def get(self, user_id):
+        """Cópia do vetor do usuário, ou None se ele ainda não tem perfil"""
+        with self._lock:
+            row = self._rows.get(user_id)
+            if row is None:
+                return None
+            self._rows.move_to_end(user_id)
+            return self.vectors[row].copy()
+
+    def update(self, user_id, vector):
+        """Incorpora `vector` (um item visto) ao perfil do usuário"""
+        if self.capacity <= 0:
+            return
+        with self._lock:
+            row = self._rows.get(user_id)
+            if row is not None:
+                self._rows.move_to_end(user_id)
+                profile = self.vectors[row]
+                profile *= 1 - PROFILE_LEARNING_RATE
+                profile += PROFILE_LEARNING_RATE * vector
+                return
+            if len(self._rows) < self.capacity:
+                row = len(self._rows)
+                if row == len(self.vectors):
+                    grown = np.zeros((min(2 * row, self.capacity), self.vectors.shape[1]), dtype=np.float32)
+                    grown[:row] = self.vectors
+                    self.vectors = grown
+            else:
+                _, row = self._rows.popitem(last=False)
+            self.vectors[row] = vector
+            self._rows[user_id] = row
+
+
+class Recommender:
+    """Recomendações por similaridade de conteúdo, personalizadas pelo perfil.
+
+    O embedding de um item só depende de tipo, gêneros e década, então itens
+    com a mesma combinação compartilham um vetor: a matriz guarda um vetor
+    normalizado por combinação distinta ("assinatura"), e cada assinatura
+    aponta para seus itens já ordenados por nota. Uma consulta é um produto
+    matriz-vetor sobre as assinaturas, argpartition para as k + 1 melhores
+    (suficientes para k itens, mesmo descartando o próprio item consultado)
+    e a leitura dos primeiros itens de cada uma. O relevance_score é a
+    similaridade de cosseno entre a consulta e o item.
+
+    Várias consultas podem ser pontuadas num único produto de matrizes com
+    recommend_batch().
+    """
+
+    def __init__(self, items, max_profiles=100000):
+        type_codes, genre_codes, signatures = {}, {}, {}
+        item_signature, ratings, ids, titles = [], [], [], []
+        for item in items:
+            content_type = type_codes.setdefault(item["type"], len(type_codes))
+            genres = tuple(sorted({genre_codes.setdefault(g, len(genre_codes)) for g in item["genres"]}))
+            era = bisect_right(ERA_BOUNDS, item["year"])
+            item_signature.append(signatures.setdefault((content_type, genres, era), len(signatures)))
+            ratings.append(item["rating"])
+            ids.append(item["id"].encode("utf-8"))
+            titles.append(item["title"].encode("utf-8"))
+
+        # Vetor de cada assinatura: gêneros (multi-hot), tipo (one-hot) e
+        # década, com metade do peso nas décadas vizinhas
+        genre_base, type_base = 0, len(genre_codes)
+        era_base = type_base + len(type_codes)
+        self.dim = era_base + len(ERA_BOUNDS) + 1
+        vectors = np.zeros((len(signatures), self.dim), dtype=np.float32)
+        for (content_type, genres, era), sig in signatures.items():
+            if genres:
+                vectors[sig, [genre_base + g for g in genres]] = GENRE_WEIGHT / math.sqrt(len(genres))
+            vectors[sig, type_base + content_type] = TYPE_WEIGHT
+            vectors[sig, era_base + era] = ERA_WEIGHT
+            for neighbor in (era - 1, era + 1):
+                if 0 <= neighbor <= len(ERA_BOUNDS):
+                    vectors[sig, era_base + neighbor] = ERA_WEIGHT / 2
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        self.signature_vectors = vectors
+
+        # Itens agrupados por assinatura, da maior para a menor nota
+        self.item_signature = np.array(item_signature, dtype=np.int32)
+        self.ratings = np.array(ratings, dtype=np.float32)
+        positions = np.arange(len(ids), dtype=np.int32)
+        self.signature_items = positions[np.lexsort((positions, -self.ratings, self.item_signature))]
+        self.signature_offsets = np.zeros(len(signatures) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.item_signature, minlength=len(signatures)), out=self.signature_offsets[1:])
+        self.top_rated = np.argsort(-self.ratings, kind="stable")[:1024]
+
+        # ids ordenados para busca binária e títulos num buffer contíguo
+        id_array = np.array(ids) if ids else np.array([], dtype="S1")
+        self.id_order = np.argsort(id_array, kind="stable").astype(np.int32)
+        self.sorted_ids = id_array[self.id_order]
+        self.id_rank = np.empty_like(self.id_order)
+        self.id_rank[self.id_order] = np.arange(len(ids), dtype=np.int32)
+        self.title_offsets = np.zeros(len(titles) + 1, dtype=np.int64)
+        np.cumsum([len(t) for t in titles], out=self.title_offsets[1:])
+        self.title_buffer = b"".join(titles)
+
+        self.profiles = UserProfiles(self.dim, max_profiles)
+
+    def __len__(self):
+        return len(self.item_signature)
+
+    def position(self, content_id):
+        """Posição do item com esse id, ou None"""
+        key = content_id.encode("utf-8")
+        i = int(np.searchsorted(self.sorted_ids, key))
+        if i < len(self.sorted_ids) and self.sorted_ids[i] == key:
+            return int(self.id_order[i])
+        return None
+
+    def content_id(self, pos):
+        return self.sorted_ids[self.id_rank[pos]].decode("utf-8")
+
+    def title(self, pos):
+        return self.title_buffer[self.title_offsets[pos]:self.title_offsets[pos + 1]].decode("utf-8")
+
+    def query_vector(self, pos, user_id):
+        """Combinação normalizada do item consultado e do perfil do usuário"""
+        query = None
+        if pos is not None:
+            query = ITEM_WEIGHT * self.signature_vectors[self.item_signature[pos]]
+        profile = None if user_id in ANONYMOUS_USERS else self.profiles.get(user_id)
+        if profile is not None:
+            profile *= 1 - ITEM_WEIGHT
+            query = profile if query is None else query + profile
+        if query is None:
+            return None
+        return query / np.linalg.norm(query)
+
+    def recommend(self, content_id, user_id="", k=5):
+        """Lista de (posição, relevance_score) para um item e um usuário"""
+        return self.recommend_batch([(content_id, user_id)], k)[0]
+
+    def recommend_batch(self, queries, k=5):
+        """recommend() para várias consultas (content_id, user_id) de uma vez"""
+        positions = [self.position(content_id) for content_id, _ in queries]
+        vectors = [self.query_vector(pos, user_id) for pos, (_, user_id) in zip(positions, queries)]
+        scored = [i for i, vector in enumerate(vectors) if vector is not None]
+        results = [self._top_rated(k, pos) for pos in positions]
+        if scored:
+            scores = np.stack([vectors[i] for i in scored]) @ self.signature_vectors.T
+            for row, i in enumerate(scored):
+                results[i] = self._top_items(scores[row], k, positions[i])
+        return results
+
+    def _top_items(self, scores, k, exclude):
+        want = k + 1
+        if want < len(scores):
+            candidates = np.argpartition(-scores, want - 1)[:want]
+        else:
+            candidates = np.arange(len(scores))
+        # Maior similaridade primeiro; empates pela ordem das assinaturas
+        candidates = candidates[np.lexsort((candidates, -scores[candidates]))]
+        results = []
+        for sig in candidates:
+            start = self.signature_offsets[sig]
+            end = min(self.signature_offsets[sig + 1], start + want)
+            for pos in self.signature_items[start:end]:
+                if pos != exclude:
+                    results.append((int(pos), float(scores[sig])))
+                    if len(results) == k:
+                        return results
+        return results
+
+    def _top_rated(self, k, exclude):
+        """Sem item conhecido nem perfil: os mais bem avaliados (nota / 10)"""
+        return [(int(pos), float(self.ratings[pos]) / 10) for pos in self.top_rated[:k + 1] if pos != exclude][:k]
+
+    def observe(self, content_id, user_id):
+        """Registra que o usuário abriu o item, atualizando seu perfil"""
+        if user_id in ANONYMOUS_USERS:
+            return
+        pos = self.position(content_id)
+        if pos is not None:
+            self.profiles.update(user_id, self.signature_vectors[self.item_signature[pos]])
@@ -1,9 +1,32 @@
 import grpc
 from concurrent import futures
+import asyncio
+import queue
+import tempfile
+import threading
+import sys
 import time, os
-from prometheus_client import start_http_server, Counter, Histogram
+
+# Módulos compartilhados pelos serviços gRPC (services/common); na imagem
+# ficam junto do server.py (ver Dockerfile)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "common"))
+
+# WORKERS > 1: cada processo grava suas métricas em arquivos num diretório
+# compartilhado, agregados no scrape. Precisa ser definido antes de importar
+# prometheus_client.
+if int(os.environ.get("WORKERS", "1")) > 1 and "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="service-b-metrics-")
+
+from prometheus_client import start_http_server, Counter, Gauge, Histogram
 
 from proto import services_pb2, services_pb2_grpc
+from cache import TTLCache
+from admission import CONCURRENCY_LIMIT, AsyncAdmissionControl, ThreadAdmissionControl, admission_limiter
+from deadlines import Abandoned, check_deadline, expired
+from workers import serve_workers
+from recommender import ANONYMOUS_USERS, CONTENT_CATALOG, Recommender, load_catalog_file
+from similarity import SimilarityGraph, catalog_digest
+from singleflight import AsyncFlight, FlightGroup
 
 # Prometheus metrics
 REQUEST_COUNT = Counter(
@@ -25,81 +48,801 @@ STREAM_ITEMS = Counter(
     ['method']
 )
 
-# Base de metadados e recomendações
+STREAM_MESSAGES = Counter(
+    'grpc_server_stream_messages_total',
+    'Total stream messages sent by Service B (one MetadataBatch can carry many items)',
+    ['method']
+)
+
+ABANDONED_REQUESTS = Counter(
+    'grpc_server_abandoned_requests_total',
+    'Requests dropped because the client cancelled or the deadline could not be met',
+    ['method', 'reason']
+)
+
+COALESCED_REQUESTS = Counter(
+    'grpc_server_coalesced_requests_total',
+    'Cache misses by single-flight role: leader started the processing, coalesced joined one already in progress',
+    ['method', 'role']
+)
+
+ACTIVE_STREAMS = Gauge(
+    'grpc_server_active_streams',
+    'Streams currently open on Service B',
+    ['method'],
+    multiprocess_mode='livesum'
+)
+
+RESPONSE_CACHE_HITS = Counter(
+    'grpc_server_response_cache_hits_total',
+    'Streams served from the metadata result cache',
+    ['method']
+)
+
+RESPONSE_CACHE_MISSES = Counter(
+    'grpc_server_response_cache_misses_total',
+    'Streams processed because their result was not cached',
+    ['method']
+)
+
+RESPONSE_CACHE_EVICTIONS = Counter(
+    'grpc_server_response_cache_evictions_total',
+    'Entries evicted from the metadata result cache (LRU or TTL)',
+    ['method']
+)
+
+RESPONSE_CACHE_SIZE = Gauge(
+    'grpc_server_response_cache_entries',
+    'Entries currently held in the metadata result cache (shared by all methods)',
+    multiprocess_mode='livesum'
+)
+
+# Metadados fixos por conteúdo; as recomendações vêm do Recommender
 METADATA_DB = {
-    "m1": [("director", "James Cameron", 0.95), ("cast", "Chris Evans, Zoe Saldana", 0.90), 
-           ("similar", "Interestelar", 0.85), ("similar", "Gravidade", 0.80)],
-    "m2": [("director", "Christopher Nolan", 0.95), ("cast", "Leonardo DiCaprio", 0.90),
-           ("similar", "Amnésia", 0.88), ("similar", "Ilha do Medo", 0.82)],
-    "m3": [("director", "Nancy Meyers", 0.92), ("cast", "Julia Roberts, Tom Hanks", 0.88),
-           ("similar", "Amor à Segunda Vista", 0.85), ("similar", "Você Tem Um Email", 0.80)],
-    "m4": [("director", "Ridley Scott", 0.94), ("cast", "Tom Hardy, Charlize Theron", 0.91),
-           ("similar", "Mad Max", 0.90), ("similar", "John Wick", 0.85)],
-    "s1": [("creator", "J.J. Abrams", 0.96), ("cast", "Millie Bobby Brown", 0.92),
-           ("similar", "Dark", 0.90), ("similar", "Stranger Things", 0.88)],
-    "s2": [("creator", "Vince Gilligan", 0.95), ("cast", "Bryan Cranston", 0.93),
-           ("similar", "True Detective", 0.89), ("similar", "Mindhunter", 0.84)],
-    "s3": [("creator", "Greg Garcia", 0.90), ("cast", "Amy Poehler", 0.87),
-           ("similar", "Modern Family", 0.88), ("similar", "Brooklyn Nine-Nine", 0.83)],
-    "s4": [("creator", "David Chase", 0.97), ("cast", "James Gandolfini", 0.95),
-           ("similar", "The Wire", 0.92), ("similar", "Breaking Bad", 0.90)],
+    "m1": [("director", "James Cameron", 0.95), ("cast", "Chris Evans, Zoe Saldana", 0.90)],
+    "m2": [("director", "Christopher Nolan", 0.95), ("cast", "Leonardo DiCaprio", 0.90)],
+    "m3": [("director", "Nancy Meyers", 0.92), ("cast", "Julia Roberts, Tom Hanks", 0.88)],
+    "m4": [("director", "Ridley Scott", 0.94), ("cast", "Tom Hardy, Charlize Theron", 0.91)],
+    "s1": [("creator", "J.J. Abrams", 0.96), ("cast", "Millie Bobby Brown", 0.92)],
+    "s2": [("creator", "Vince Gilligan", 0.95), ("cast", "Bryan Cranston", 0.93)],
+    "s3": [("creator", "Greg Garcia", 0.90), ("cast", "Amy Poehler", 0.87)],
+    "s4": [("creator", "David Chase", 0.97), ("cast", "James Gandolfini", 0.95)],
 }
 
+# Recomendações enviadas por stream e perfis de usuário mantidos em memória
+RECOMMENDATIONS = int(os.environ.get("RECOMMENDATIONS", "5"))
+MAX_USER_PROFILES = int(os.environ.get("MAX_USER_PROFILES", "100000"))
+
+# Catálogo embutido até serve() carregar o CATALOG_PATH, se houver
+RECOMMENDER = Recommender(CONTENT_CATALOG, MAX_USER_PROFILES)
+
+# Itens similares ("similar") enviados por stream, do grafo mapeado em serve()
+# quando há SIMILARITY_GRAPH_PATH
+SIMILAR_ITEMS = int(os.environ.get("SIMILAR_ITEMS", "5"))
+SIMILARITY_GRAPH = None
+
+# Latência simulada de processamento por item do stream
+PROCESSING_DELAY = float(os.environ.get("PROCESSING_DELAY", "0.01"))
+
+# StreamMetadataBatched: itens por lote e tempo máximo (s) que um lote
+# aberto espera por mais itens; o cliente pode pedir outro tamanho em
+# batch_size, até MAX_METADATA_BATCH_SIZE
+METADATA_BATCH_SIZE = int(os.environ.get("METADATA_BATCH_SIZE", "64"))
+METADATA_BATCH_WINDOW = float(os.environ.get("METADATA_BATCH_WINDOW", "0.05"))
+MAX_METADATA_BATCH_SIZE = 1024
+
+# MultiplexMetadata: consultas por chamada com resultados ainda não enviados
+MULTIPLEX_MAX_INFLIGHT = int(os.environ.get("MULTIPLEX_MAX_INFLIGHT", "64"))
+
+# Chamadas recebidas que o servidor aio aceita enfileirar enquanto o event
+# loop não as assume; acima do padrão do gRPC (1000, com limite rígido de
+# 3000) rajadas de streams são canceladas antes mesmo de começar
+MAX_PENDING_REQUESTS = 100000
+
+# Cache LRU com TTL dos itens já processados de um stream:
+# (content_id, user_id) -> lista de MetadataItem. METADATA_CACHE_SIZE=0 desabilita;
+# o TTL limita por quanto tempo as recomendações podem ignorar o perfil atualizado.
+METADATA_CACHE = TTLCache(
+    int(os.environ.get("METADATA_CACHE_SIZE", "1024")),
+    float(os.environ.get("METADATA_CACHE_TTL", "30")),
+)
+
+# Processamentos em andamento por chave do cache: streams concorrentes com a
+# mesma chave acompanham um único processamento (um por modo de servidor)
+METADATA_FLIGHTS = FlightGroup()
+ASYNC_METADATA_FLIGHTS = FlightGroup(AsyncFlight)
+
+# Threads que executam os processamentos do modo thread, compartilhadas e
+# reaproveitadas entre as chaves; com todas ocupadas, um processamento novo
+# espera na fila (seus streams continuam conferindo o prazo)
+FLIGHT_EXECUTOR = futures.ThreadPoolExecutor(
+    max_workers=int(os.environ.get("FLIGHT_WORKERS", "16")), thread_name_prefix="flight"
+)
+
+# Threads que executam as consultas do MultiplexMetadata no modo thread,
+# compartilhadas entre as chamadas (separadas do FLIGHT_EXECUTOR: uma
+# consulta espera por um processamento que roda nele)
+MULTIPLEX_EXECUTOR = futures.ThreadPoolExecutor(
+    max_workers=int(os.environ.get("MULTIPLEX_WORKERS", "32")), thread_name_prefix="multiplex"
+)
+
+# Intervalo em que um stream à espera do próximo item confere se o cliente
+# ainda está lá (modo thread)
+FLIGHT_POLL_INTERVAL = 0.05
+
+
+def count_abandoned(method, reason):
+    ABANDONED_REQUESTS.labels(method=method, reason=reason).inc()
+    REQUEST_COUNT.labels(method=method, status='error').inc()
+
+
+def abandon(context, method, reason):
+    """Contabiliza um stream abandonado e define o status devolvido"""
+    count_abandoned(method, reason)
+    if reason == "deadline":
+        context.set_code(grpc.StatusCode.DEADLINE_EXCEEDED)
+        context.set_details("Deadline too short to complete the stream")
+    else:
+        context.set_code(grpc.StatusCode.CANCELLED)
+        context.set_details("Cancelled by the client")
+
+
+def processing_estimate(content_id):
+    """Duração esperada da etapa de processamento de um stream fora do cache"""
+    entries = len(METADATA_DB.get(content_id, ())) + min(RECOMMENDATIONS, len(RECOMMENDER) - 1)
+    if SIMILARITY_GRAPH is not None:
+        entries += SIMILAR_ITEMS
+    return entries * PROCESSING_DELAY
+
+
+def cache_key(request):
+    # Usuários anônimos recebem as mesmas recomendações e compartilham a entrada
+    user_id = "" if request.user_id in ANONYMOUS_USERS else request.user_id
+    return (request.content_id, user_id)
+
+
+def cached_items(request, method):
+    """Itens já processados desse stream, ou None (contabiliza hit/miss)"""
+    items, expired = METADATA_CACHE.get(cache_key(request))
+    if expired:
+        RESPONSE_CACHE_EVICTIONS.labels(method=method).inc()
+        RESPONSE_CACHE_SIZE.set(len(METADATA_CACHE))
+    if items is None:
+        RESPONSE_CACHE_MISSES.labels(method=method).inc()
+        return None
+    RESPONSE_CACHE_HITS.labels(method=method).inc()
+    # A visualização continua entrando no perfil mesmo sem recalcular
+    RECOMMENDER.observe(request.content_id, request.user_id)
+    return items
+
+
+def cache_items(request, items, method):
+    """Guarda o resultado de um stream concluído"""
+    evicted = METADATA_CACHE.put(cache_key(request), items)
+    if evicted:
+        RESPONSE_CACHE_EVICTIONS.labels(method=method).inc(evicted)
+    RESPONSE_CACHE_SIZE.set(len(METADATA_CACHE))
+
+
+def metadata_entries(content_id, user_id=""):
+    """Metadados fixos do conteúdo, ids dos itens similares (grafo) e as
+    recomendações para o usuário.
+
+    A visualização entra no perfil do usuário depois de calculadas as
+    recomendações, então ela influencia as próximas consultas.
+    """
+    recommender = RECOMMENDER
+    entries = list(METADATA_DB.get(content_id, []))
+    graph = SIMILARITY_GRAPH
+    if graph is not None:
+        pos = recommender.position(content_id)
+        if pos is not None:
+            for neighbour, score in graph.neighbours(pos, SIMILAR_ITEMS):
+                entries.append(("similar", recommender.content_id(neighbour), round(score, 4)))
+    for pos, score in recommender.recommend(content_id, user_id, RECOMMENDATIONS):
+        entries.append(("recommendation", recommender.title(pos), round(score, 4)))
+    recommender.observe(content_id, user_id)
+    return entries
+
+
+def coalesce(flights, request, method, context=None):
+    """Entra no processamento em andamento da chave do pedido ou, se não
+    houver, cria um: (flight, líder). Só o líder precisa caber no prazo
+    inteiro; quem chega depois aproveita os itens já prontos."""
+    key = cache_key(request)
+    if context is not None and key not in flights:
+        check_deadline(context, processing_estimate(request.content_id))
+    flight, leader = flights.join(key)
+    COALESCED_REQUESTS.labels(method=method, role='leader' if leader else 'coalesced').inc()
+    if not leader:
+        # A visualização entra no perfil, como num hit do cache
+        RECOMMENDER.observe(request.content_id, request.user_id)
+    return flight, leader
+
+
+def process_flight(flight, request, method):
+    """Processa os itens de uma chave para todos os streams que a acompanham
+    (no FLIGHT_EXECUTOR: não depende de o stream do líder continuar aberto).
+
+    Para assim que ninguém mais acompanha; concluído, o resultado vai para
+    o cache antes de o processamento ser esquecido, então uma requisição
+    nova sempre encontra um dos dois.
+    """
+    try:
+        # Simula processamento incremental (análise de dados)
+        for key, value, score in metadata_entries(request.content_id, request.user_id):
+            if METADATA_FLIGHTS.abandon_unwatched(flight):
+                return
+            time.sleep(PROCESSING_DELAY)  # Simula latência de processamento
+            flight.publish(services_pb2.MetadataItem(
+                key=key,
+                value=value,
+                relevance_score=score
+            ))
+        cache_items(request, flight.items, method)
+        flight.finish()
+    except Exception as e:
+        flight.finish(e)
+    finally:
+        if not flight.done:
+            flight.finish(Abandoned("cancelled"))
+        METADATA_FLIGHTS.forget(flight)
+
+
+def flight_items(flight, context=None):
+    """Itens de um processamento compartilhado, à medida que ficam prontos"""
+    timeout = FLIGHT_POLL_INTERVAL if context is not None else None
+    sent = 0
+    while True:
+        while not flight.wait(sent, timeout):
+            check_deadline(context)
+        if sent < len(flight.items):
+            yield flight.items[sent]
+            sent += 1
+        elif flight.error is not None:
+            raise flight.error
+        else:
+            return
+
+
+def metadata_items(request, method, context=None):
+    """Itens do stream, do cache ou do processamento da chave (bloqueia a thread).
+
+    Requisições concorrentes com a mesma chave acompanham um único
+    processamento (single-flight), cada uma recebendo os itens à medida que
+    ficam prontos. Com `context`, um stream que não caberia no prazo é
+    recusado antes de começar um processamento, e a espera para (Abandoned)
+    assim que o cliente desiste ou o prazo acaba.
+    """
+    items = cached_items(request, method)
+    if items is not None:
+        yield from items
+        return
+    flight, leader = coalesce(METADATA_FLIGHTS, request, method, context)
+    if leader:
+        FLIGHT_EXECUTOR.submit(process_flight, flight, request, method)
+    try:
+        yield from flight_items(flight, context)
+    finally:
+        METADATA_FLIGHTS.leave(flight)
+
+
+def batch_size(request):
+    """Itens por MetadataBatch: o pedido do cliente, limitado a MAX_METADATA_BATCH_SIZE"""
+    if request.batch_size > 0:
+        return min(request.batch_size, MAX_METADATA_BATCH_SIZE)
+    return METADATA_BATCH_SIZE
+
+
+def metadata_batch(items):
+    STREAM_ITEMS.labels(method='StreamMetadataBatched').inc(len(items))
+    STREAM_MESSAGES.labels(method='StreamMetadataBatched').inc()
+    return services_pb2.MetadataBatch(items=items)
+
+
+def metadata_batches(request, method, context=None):
+    """Itens do stream em listas de até batch_size itens.
+
+    Um lote sai ao completar batch_size itens ou quando o primeiro item
+    dele já espera há METADATA_BATCH_WINDOW segundos: com um lote aberto, o
+    item seguinte só é esperado até o fim da janela, como em
+    metadata_batches_async(). Itens vindos do cache saem em lotes cheios.
+    """
+    size = batch_size(request)
+    items = cached_items(request, method)
+    if items is not None:
+        for i in range(0, len(items), size):
+            yield items[i:i + size]
+        return
+    flight, leader = coalesce(METADATA_FLIGHTS, request, method, context)
+    if leader:
+        FLIGHT_EXECUTOR.submit(process_flight, flight, request, method)
+    try:
+        sent, batch, deadline = 0, [], 0.0
+        while True:
+            timeout = FLIGHT_POLL_INTERVAL if context is not None else None
+            if batch:
+                remaining = max(0.0, deadline - time.monotonic())
+                timeout = remaining if timeout is None else min(timeout, remaining)
+            if not flight.wait(sent, timeout):
+                if context is not None:
+                    check_deadline(context)
+                if batch and time.monotonic() >= deadline:
+                    yield batch
+                    batch = []
+                continue
+            ready = flight.items[sent:]
+            if not ready:
+                break
+            sent += len(ready)
+            for item in ready:
+                if not batch:
+                    deadline = time.monotonic() + METADATA_BATCH_WINDOW
+                batch.append(item)
+                if len(batch) >= size:
+                    yield batch
+                    batch = []
+            if batch and time.monotonic() >= deadline:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+        if flight.error is not None:
+            raise flight.error
+    finally:
+        METADATA_FLIGHTS.leave(flight)
+
+
+def lookup_results(lookup):
+    """Mensagens de resposta de uma consulta multiplexada: os lotes de itens
+    e, por último, uma com done (e error, se a consulta falhou)"""
+    start = time.time()
+    correlation_id = lookup.correlation_id
+    try:
+        for items in metadata_batches(lookup.request, 'MultiplexMetadata'):
+            STREAM_ITEMS.labels(method='MultiplexMetadata').inc(len(items))
+            STREAM_MESSAGES.labels(method='MultiplexMetadata').inc()
+            yield services_pb2.MetadataLookupResult(correlation_id=correlation_id, items=items)
+        REQUEST_COUNT.labels(method='MultiplexMetadata', status='success').inc()
+        done = services_pb2.MetadataLookupResult(correlation_id=correlation_id, done=True)
+    except Exception as e:
+        REQUEST_COUNT.labels(method='MultiplexMetadata', status='error').inc()
+        done = services_pb2.MetadataLookupResult(correlation_id=correlation_id, done=True, error=f"Error: {str(e)}")
+    REQUEST_LATENCY.labels(method='MultiplexMetadata').observe(time.time() - start)
+    STREAM_MESSAGES.labels(method='MultiplexMetadata').inc()
+    yield done
+
+
 class ServiceBImpl(services_pb2_grpc.ServiceBServicer):
     def StreamMetadata(self, request, context):
         """Retorna stream de metadados e recomendações para um conteúdo"""
         start = time.time()
+        ACTIVE_STREAMS.labels(method='StreamMetadata').inc()
         try:
-            content_id = request.content_id
-            metadata_list = METADATA_DB.get(content_id, [])
-            
-            # Simula processamento incremental (análise de dados)
-            for key, value, score in metadata_list:
-                time.sleep(0.01)  # Simula latência de processamento
-                yield services_pb2.MetadataItem(
-                    key=key,
-                    value=value,
-                    relevance_score=score
-                )
+            for item in metadata_items(request, 'StreamMetadata', context):
+                yield item
                 STREAM_ITEMS.labels(method='StreamMetadata').inc()
+                STREAM_MESSAGES.labels(method='StreamMetadata').inc()
             
-            # Adiciona recomendações genéricas se não houver metadados
-            if not metadata_list:
-                for i in range(3):
-                    time.sleep(0.01)
-                    yield services_pb2.MetadataItem(
-                        key="recommendation",
-                        value=f"Conteúdo recomendado #{i+1}",
-                        relevance_score=0.7 - (i * 0.1)
-                    )
+            REQUEST_COUNT.labels(method='StreamMetadata', status='success').inc()
+            
+        except Abandoned as e:
+            abandon(context, 'StreamMetadata', e.reason)
+        except GeneratorExit:
+            # O servidor descarta o gerador, sem retomá-lo, quando o cliente
+            # cancela ou o prazo acaba entre um item e outro
+            count_abandoned('StreamMetadata', "deadline" if expired(context) else "cancelled")
+            raise
+        except Exception as e:
+            REQUEST_COUNT.labels(method='StreamMetadata', status='error').inc()
+            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_details(f"Error: {str(e)}")
+        finally:
+            ACTIVE_STREAMS.labels(method='StreamMetadata').dec()
+            REQUEST_LATENCY.labels(method='StreamMetadata').observe(time.time() - start)
+
+    def StreamMetadataBatched(self, request, context):
+        """Mesmos itens do StreamMetadata agrupados em MetadataBatch"""
+        start = time.time()
+        ACTIVE_STREAMS.labels(method='StreamMetadataBatched').inc()
+        try:
+            for items in metadata_batches(request, 'StreamMetadataBatched', context):
+                yield metadata_batch(items)
+            
+            REQUEST_COUNT.labels(method='StreamMetadataBatched', status='success').inc()
+            
+        except Abandoned as e:
+            abandon(context, 'StreamMetadataBatched', e.reason)
+        except GeneratorExit:
+            # O servidor descarta o gerador, sem retomá-lo, quando o cliente
+            # cancela ou o prazo acaba entre um item e outro
+            count_abandoned('StreamMetadataBatched', "deadline" if expired(context) else "cancelled")
+            raise
+        except Exception as e:
+            REQUEST_COUNT.labels(method='StreamMetadataBatched', status='error').inc()
+            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_details(f"Error: {str(e)}")
+        finally:
+            ACTIVE_STREAMS.labels(method='StreamMetadataBatched').dec()
+            REQUEST_LATENCY.labels(method='StreamMetadataBatched').observe(time.time() - start)
+
+    def MultiplexMetadata(self, request_iterator, context):
+        """Consultas de várias origens numa única chamada bidirecional.
+
+        Uma thread lê os pedidos e entrega cada consulta ao MULTIPLEX_EXECUTOR,
+        compartilhado entre as chamadas; os resultados saem pela ordem em que
+        ficam prontos. No máximo MULTIPLEX_MAX_INFLIGHT consultas por chamada
+        têm resultados ainda não enviados: acima disso a leitura de pedidos
+        para e o controle de fluxo do HTTP/2 segura o cliente.
+        """
+        ACTIVE_STREAMS.labels(method='MultiplexMetadata').inc()
+        results = queue.Queue()
+        slots = threading.BoundedSemaphore(MULTIPLEX_MAX_INFLIGHT)
+        running = set()
+
+        def run(lookup):
+            for result in lookup_results(lookup):
+                results.put(result)
+
+        def read():
+            try:
+                for lookup in request_iterator:
+                    # Se o cliente sumir com todas as vagas ocupadas,
+                    # ninguém mais as libera
+                    while not slots.acquire(timeout=1):
+                        if not context.is_active():
+                            return
+                    future = MULTIPLEX_EXECUTOR.submit(run, lookup)
+                    running.add(future)
+                    future.add_done_callback(running.discard)
+            except grpc.RpcError:
+                pass  # chamada cancelada pelo cliente
+            finally:
+                # O fim da chamada só é sinalizado depois dos resultados
+                # das consultas já aceitas
+                futures.wait(list(running))
+                results.put(None)
+
+        threading.Thread(target=read, daemon=True).start()
+        try:
+            while (result := results.get()) is not None:
+                yield result
+                if result.done:
+                    slots.release()
+        finally:
+            ACTIVE_STREAMS.labels(method='MultiplexMetadata').dec()
+
+
+async def process_entry(key, value, score):
+    """Etapa de processamento de um item do stream, sem bloquear o event loop"""
+    await asyncio.sleep(PROCESSING_DELAY)  # Simula latência de processamento
+    return services_pb2.MetadataItem(key=key, value=value, relevance_score=score)
+
+
+async def process_flight_async(flight, request, method):
+    """process_flight() sem bloquear o event loop (task própria)"""
+    try:
+        for key, value, score in metadata_entries(request.content_id, request.user_id):
+            if ASYNC_METADATA_FLIGHTS.abandon_unwatched(flight):
+                return
+            flight.publish(await process_entry(key, value, score))
+        cache_items(request, flight.items, method)
+        flight.finish()
+    except Exception as e:
+        flight.finish(e)
+    finally:
+        if not flight.done:
+            flight.finish(Abandoned("cancelled"))
+        ASYNC_METADATA_FLIGHTS.forget(flight)
+
+
+def coalesce_async(request, method, context=None):
+    """coalesce() no event loop; o líder inicia o processamento numa task"""
+    flight, leader = coalesce(ASYNC_METADATA_FLIGHTS, request, method, context)
+    if leader:
+        flight.task = asyncio.create_task(process_flight_async(flight, request, method))
+    return flight
+
+
+async def flight_items_async(flight):
+    """flight_items() no event loop"""
+    sent = 0
+    while True:
+        await flight.wait(sent)
+        if sent < len(flight.items):
+            yield flight.items[sent]
+            sent += 1
+        elif flight.error is not None:
+            raise flight.error
+        else:
+            return
+
+
+async def metadata_batches_async(request, method, context=None):
+    """metadata_batches() sem bloquear o event loop.
+
+    Com um lote aberto, o item seguinte só é esperado até o fim da janela:
+    o lote sai mesmo que ele ainda esteja em processamento. Itens vindos do
+    cache já estão prontos e saem em lotes cheios; num processamento
+    compartilhado, os itens já prontos entram de uma vez.
+    """
+    size = batch_size(request)
+    items = cached_items(request, method)
+    if items is not None:
+        for i in range(0, len(items), size):
+            yield items[i:i + size]
+        return
+    flight = coalesce_async(request, method, context)
+    try:
+        loop = asyncio.get_running_loop()
+        sent, batch, deadline = 0, [], 0.0
+        while True:
+            timeout = max(0.0, deadline - loop.time()) if batch else None
+            if not await flight.wait(sent, timeout):
+                yield batch
+                batch = []
+                continue
+            ready = flight.items[sent:]
+            if not ready:
+                break
+            sent += len(ready)
+            for item in ready:
+                if not batch:
+                    deadline = loop.time() + METADATA_BATCH_WINDOW
+                batch.append(item)
+                if len(batch) >= size:
+                    yield batch
+                    batch = []
+            if batch and loop.time() >= deadline:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+        if flight.error is not None:
+            raise flight.error
+    finally:
+        ASYNC_METADATA_FLIGHTS.leave(flight)
+
+
+async def lookup_results_async(lookup):
+    """lookup_results() com os lotes de metadata_batches_async()"""
+    start = time.time()
+    correlation_id = lookup.correlation_id
+    try:
+        async for items in metadata_batches_async(lookup.request, 'MultiplexMetadata'):
+            STREAM_ITEMS.labels(method='MultiplexMetadata').inc(len(items))
+            STREAM_MESSAGES.labels(method='MultiplexMetadata').inc()
+            yield services_pb2.MetadataLookupResult(correlation_id=correlation_id, items=items)
+        REQUEST_COUNT.labels(method='MultiplexMetadata', status='success').inc()
+        done = services_pb2.MetadataLookupResult(correlation_id=correlation_id, done=True)
+    except Exception as e:
+        REQUEST_COUNT.labels(method='MultiplexMetadata', status='error').inc()
+        done = services_pb2.MetadataLookupResult(correlation_id=correlation_id, done=True, error=f"Error: {str(e)}")
+    REQUEST_LATENCY.labels(method='MultiplexMetadata').observe(time.time() - start)
+    STREAM_MESSAGES.labels(method='MultiplexMetadata').inc()
+    yield done
+
+
+class AsyncServiceBImpl(services_pb2_grpc.ServiceBServicer):
+    """Versão asyncio (grpc.aio): cada stream é uma corrotina, não uma thread.
+
+    Enquanto espera a etapa de processamento, um stream não ocupa nada além
+    da própria corrotina, então o número de streams simultâneos por processo
+    é limitado por MAX_CONCURRENT_RPCS e memória, não por um pool de threads.
+    """
+
+    async def StreamMetadata(self, request, context):
+        """Retorna stream de metadados e recomendações para um conteúdo.
+
+        Cada item é enviado com `await context.write`, que só retorna quando
+        o transporte aceita a mensagem: se o cliente lê devagar e a janela de
+        controle de fluxo do HTTP/2 se esgota, a corrotina fica suspensa ali
+        em vez de produzir itens que se acumulariam no servidor.
+        """
+        start = time.time()
+        ACTIVE_STREAMS.labels(method='StreamMetadata').inc()
+        try:
+            items = cached_items(request, 'StreamMetadata')
+            if items is not None:
+                for item in items:
+                    await context.write(item)
                     STREAM_ITEMS.labels(method='StreamMetadata').inc()
+                    STREAM_MESSAGES.labels(method='StreamMetadata').inc()
+            else:
+                flight = coalesce_async(request, 'StreamMetadata', context)
+                try:
+                    async for item in flight_items_async(flight):
+                        await context.write(item)
+                        STREAM_ITEMS.labels(method='StreamMetadata').inc()
+                        STREAM_MESSAGES.labels(method='StreamMetadata').inc()
+                finally:
+                    ASYNC_METADATA_FLIGHTS.leave(flight)
             
             REQUEST_COUNT.labels(method='StreamMetadata', status='success').inc()
             
+        except Abandoned as e:
+            abandon(context, 'StreamMetadata', e.reason)
+        except asyncio.CancelledError:
+            # grpc.aio: cancelamento ou fim do prazo durante um await
+            count_abandoned('StreamMetadata', "deadline" if expired(context) else "cancelled")
+            raise
         except Exception as e:
             REQUEST_COUNT.labels(method='StreamMetadata', status='error').inc()
             context.set_code(grpc.StatusCode.INTERNAL)
             context.set_details(f"Error: {str(e)}")
         finally:
+            ACTIVE_STREAMS.labels(method='StreamMetadata').dec()
             REQUEST_LATENCY.labels(method='StreamMetadata').observe(time.time() - start)
 
-def serve():
-    # Start Prometheus metrics server
-    metrics_port = int(os.environ.get("METRICS_PORT", "9102"))
-    start_http_server(metrics_port)
-    print(f"Metrics server started on :{metrics_port}", flush=True)
+    async def StreamMetadataBatched(self, request, context):
+        """Mesmos itens do StreamMetadata agrupados em MetadataBatch"""
+        start = time.time()
+        ACTIVE_STREAMS.labels(method='StreamMetadataBatched').inc()
+        try:
+            async for items in metadata_batches_async(request, 'StreamMetadataBatched', context):
+                await context.write(metadata_batch(items))
+            
+            REQUEST_COUNT.labels(method='StreamMetadataBatched', status='success').inc()
+            
+        except Abandoned as e:
+            abandon(context, 'StreamMetadataBatched', e.reason)
+        except asyncio.CancelledError:
+            # grpc.aio: cancelamento ou fim do prazo durante um await
+            count_abandoned('StreamMetadataBatched', "deadline" if expired(context) else "cancelled")
+            raise
+        except Exception as e:
+            REQUEST_COUNT.labels(method='StreamMetadataBatched', status='error').inc()
+            context.set_code(grpc.StatusCode.INTERNAL)
+            context.set_details(f"Error: {str(e)}")
+        finally:
+            ACTIVE_STREAMS.labels(method='StreamMetadataBatched').dec()
+            REQUEST_LATENCY.labels(method='StreamMetadataBatched').observe(time.time() - start)
+
+    async def MultiplexMetadata(self, request_iterator, context):
+        """Consultas de várias origens numa única chamada bidirecional.
+
+        Cada consulta recebida vira uma task; os resultados passam por uma
+        fila e são escritos pela ordem em que ficam prontos. No máximo
+        MULTIPLEX_MAX_INFLIGHT consultas por chamada têm resultados ainda não
+        enviados: acima disso a leitura de pedidos para e o controle de fluxo
+        do HTTP/2 segura o cliente.
+        """
+        ACTIVE_STREAMS.labels(method='MultiplexMetadata').inc()
+        results = asyncio.Queue()
+        slots = asyncio.Semaphore(MULTIPLEX_MAX_INFLIGHT)
+        tasks = set()
+
+        async def run(lookup):
+            async for result in lookup_results_async(lookup):
+                results.put_nowait(result)
+
+        async def read():
+            try:
+                async for lookup in request_iterator:
+                    await slots.acquire()
+                    task = asyncio.create_task(run(lookup))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                while tasks:
+                    await asyncio.wait(set(tasks))
+            finally:
+                results.put_nowait(None)
+
+        reader = asyncio.create_task(read())
+        try:
+            while (result := await results.get()) is not None:
+                await context.write(result)
+                if result.done:
+                    slots.release()
+        finally:
+            reader.cancel()
+            for task in list(tasks):
+                task.cancel()
+            ACTIVE_STREAMS.labels(method='MultiplexMetadata').dec()
+
+
+async def serve_aio(port, max_concurrent_rpcs):
+    """Servidor grpc.aio; `max_concurrent_rpcs` limita as RPCs em andamento"""
+    # Controle de admissão pelo atraso do event loop, ligado por qualquer
+    # CONCURRENCY_LIMIT > 0; o limite de concorrência AIMD é só do modo thread,
+    # aqui o limite em vigor é o max_concurrent_rpcs (0 = sem limite)
+    CONCURRENCY_LIMIT.set(max_concurrent_rpcs or 0)
+    admission = None
+    if int(os.environ.get("CONCURRENCY_LIMIT", "0")) > 0:
+        admission = AsyncAdmissionControl(REQUEST_COUNT, float(os.environ.get("CONCURRENCY_TARGET_DELAY", "0.01")))
+    server = grpc.aio.server(
+        interceptors=[admission] if admission else None,
+        maximum_concurrent_rpcs=max_concurrent_rpcs,
+        options=[
+            ("grpc.so_reuseport", 1),
+            ("grpc.server.max_pending_requests", MAX_PENDING_REQUESTS),
+            ("grpc.server.max_pending_requests_hard_limit", MAX_PENDING_REQUESTS),
+        ],
+    )
+    services_pb2_grpc.add_ServiceBServicer_to_server(AsyncServiceBImpl(), server)
+    server.add_insecure_port(f"[::]:{port}")
+    await server.start()
+    lag_watcher = asyncio.create_task(admission.watch_loop_lag()) if admission else None
+    print(f"Service B (aio, max_concurrent_rpcs={max_concurrent_rpcs}, pid={os.getpid()}) listening on :{port}", flush=True)
+    try:
+        await server.wait_for_termination()
+    finally:
+        if lag_watcher:
+            lag_watcher.cancel()
+        await server.stop(0)
+
+
+def run_server(port):
+    """Executa o servidor gRPC no processo atual até ser interrompido"""
+    # SERVER_MODE=aio usa grpc.aio (asyncio); o padrão continua sendo o pool de threads
+    if os.environ.get("SERVER_MODE", "thread") == "aio":
+        max_concurrent_rpcs = int(os.environ.get("MAX_CONCURRENT_RPCS", "1000")) or None
+        try:
+            asyncio.run(serve_aio(port, max_concurrent_rpcs))
+        except KeyboardInterrupt:
+            pass
+        return
     
-    port = int(os.environ.get("PORT", "50052"))
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    # CONCURRENCY_LIMIT: controle de admissão adaptativo (0, o padrão, desabilita)
+    limiter = admission_limiter()
+    # SO_REUSEPORT permite que vários processos escutem na mesma porta
+    server = grpc.server(
+        futures.ThreadPoolExecutor(max_workers=10),
+        interceptors=[ThreadAdmissionControl(REQUEST_COUNT, limiter)] if limiter else None,
+        options=[("grpc.so_reuseport", 1)],
+    )
     services_pb2_grpc.add_ServiceBServicer_to_server(ServiceBImpl(), server)
     server.add_insecure_port(f"[::]:{port}")
     server.start()
-    print(f"Service B listening on :{port}", flush=True)
+    print(f"Service B listening on :{port} (pid={os.getpid()})", flush=True)
     try:
         while True:
             time.sleep(86400)
     except KeyboardInterrupt:
         server.stop(0)
 
+
+def serve():
+    global RECOMMENDER, SIMILARITY_GRAPH
+    metrics_port = int(os.environ.get("METRICS_PORT", "9102"))
+    port = int(os.environ.get("PORT", "50052"))
+    
+    # CATALOG_PATH: mesmo catálogo JSONL do Service A, base das recomendações;
+    # carregado antes do fork dos workers
+    catalog_path = os.environ.get("CATALOG_PATH")
+    graph_path = os.environ.get("SIMILARITY_GRAPH_PATH")
+    catalog = CONTENT_CATALOG
+    if catalog_path:
+        catalog = load_catalog_file(catalog_path)
+        RECOMMENDER = Recommender(catalog, MAX_USER_PROFILES)
+        print(f"Recommender loaded from {catalog_path}: {len(RECOMMENDER)} items", flush=True)
+    # Daqui em diante só o digest dos ids é usado: a lista de dicts do
+    # catálogo ocupa várias vezes a memória do Recommender e serve() nunca
+    # retorna, então ela é liberada antes de o servidor subir
+    digest = catalog_digest(catalog) if graph_path else None
+    del catalog
+    
+    # SIMILARITY_GRAPH_PATH: grafo gerado por scripts/build_similarity_graph.py
+    # a partir do mesmo catálogo; mapeado antes do fork, as páginas são
+    # compartilhadas pelos workers
+    if graph_path:
+        graph = SimilarityGraph(graph_path)
+        if graph.catalog_digest != digest:
+            raise ValueError(f"{graph_path} was built from a different catalog")
+        SIMILARITY_GRAPH = graph
+        print(f"Similarity graph mapped from {graph_path}: {len(graph)} items", flush=True)
+    
+    # WORKERS > 1: vários processos por pod para usar todos os núcleos (sem GIL compartilhado)
+    workers = int(os.environ.get("WORKERS", "1"))
+    if workers > 1:
+        serve_workers(run_server, port, metrics_port, workers)
+        return
+    
+    # Start Prometheus metrics server
+    start_http_server(metrics_port)
+    print(f"Metrics server started on :{metrics_port}", flush=True)
+    
+    run_server(port)
+
 if __name__ == "__main__":
     serve()
@@ -0,0 +1,213 @@
+"""Grafo de similaridade item a item, gerado offline e lido via mmap pelo Service B"""
+import hashlib
+import math
+import mmap
+import os
+import struct
+from collections import Counter
+
+import numpy as np
+
+# Peso de cada componente da similaridade; somam 1, então ela fica em [0, 1]
+GENRE_WEIGHT = 0.6
+TYPE_WEIGHT = 0.2
+YEAR_WEIGHT = 0.2
+
+# Diferença de anos a partir da qual a proximidade de ano vale zero
+YEAR_WINDOW = 10
+
+# Cabeçalho do arquivo: magic, versão, vizinhos por item (máximo), itens,
+# arestas e digest dos ids do catálogo de origem. Seguem os arrays
+# offsets (uint64, itens + 1), vizinhos (uint32) e scores (float32).
+MAGIC = b"PSPDSIMG"
+VERSION = 1
+HEADER = struct.Struct("<8sIIQQ16s")
+
+
+def catalog_digest(items):
+    """Digest dos ids, na ordem do catálogo: o grafo guarda posições, então só
+    vale para o catálogo que o gerou"""
+    hasher = hashlib.blake2b(digest_size=16)
+    for item in items:
+        hasher.update(item["id"].encode("utf-8"))
+        hasher.update(b"\n")
+    return hasher.digest()
+
+
+def year_proximity(delta):
+    return max(0.0, 1.0 - abs(delta) / YEAR_WINDOW)
+
+
+def similarity(a, b, genre_weights):
+    """Similaridade entre dois itens: Jaccard ponderado (IDF) dos gêneros,
+    mesmo tipo e proximidade de ano. Referência para build_similarity_graph()"""
+    genres_a, genres_b = set(a["genres"]), set(b["genres"])
+    union = sum(genre_weights[g] for g in genres_a | genres_b)
+    jaccard = sum(genre_weights[g] for g in genres_a & genres_b) / union if union else 1.0
+    return (GENRE_WEIGHT * jaccard + TYPE_WEIGHT * (a["type"] == b["type"])
+            + YEAR_WEIGHT * year_proximity(a["year"] - b["year"]))
+
+
+def genre_idf(items):
+    """Peso de cada gênero no Jaccard: gêneros raros pesam mais"""
+    counts = Counter(g for item in items for g in set(item["genres"]))
+    return {g: math.log(1 + len(items) / count) for g, count in counts.items()}
+
+
+def build_similarity_graph(items, neighbours=10):
+    """Os `neighbours` itens mais similares a cada item, em CSR.
+
+    Retorna (offsets, vizinhos, scores): os vizinhos do item na posição i
+    são vizinhos[offsets[i]:offsets[i + 1]], do mais para o menos similar
+    (empates pela maior nota e depois pela posição); pares com
+    similaridade 0 ficam de fora.
+
+    A similaridade só depende de tipo, gêneros e ano, então os itens são
+    agrupados em assinaturas (classe = tipo + gêneros, e ano) e a busca é
+    feita uma vez por assinatura, não por item. Para cada classe, as demais
+    são percorridas da maior para a menor similaridade de classe; como o ano
+    soma no máximo YEAR_WEIGHT, a busca para assim que nenhuma classe
+    restante pode alcançar o score do último vizinho necessário. Na prática
+    os vizinhos saem da própria classe e de poucas outras, e o custo cresce
+    com o número de assinaturas, não com o quadrado do número de itens.
+    """
+    items = list(items)
+    weights = genre_idf(items)
+    type_codes, genre_codes, classes, signatures = {}, {}, {}, {}
+    class_keys, class_signatures = [], []
+    signature_years, item_signature, ratings = [], [], []
+    for item in items:
+        content_type = type_codes.setdefault(item["type"], len(type_codes))
+        genres = tuple(sorted({genre_codes.setdefault(g, len(genre_codes)) for g in item["genres"]}))
+        cls = classes.get((content_type, genres))
+        if cls is None:
+            cls = classes[content_type, genres] = len(class_keys)
+            class_keys.append((content_type, genres))
+            class_signatures.append([])
+        sig = signatures.get((cls, item["year"]))
+        if sig is None:
+            sig = signatures[cls, item["year"]] = len(signature_years)
+            signature_years.append(item["year"])
+            class_signatures[cls].append(sig)
+        item_signature.append(sig)
+        ratings.append(item["rating"])
+
+    # Itens de cada assinatura da maior para a menor nota
+    item_signature = np.array(item_signature, dtype=np.int64)
+    ratings = np.array(ratings, dtype=np.float64)
+    positions = np.arange(len(items))
+    signature_items = positions[np.lexsort((positions, -ratings, item_signature))]
+    signature_offsets = np.zeros(len(signature_years) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(item_signature, minlength=len(signature_years)), out=signature_offsets[1:])
+
+    # Gêneros de cada classe (multi-hot) para o Jaccard ponderado
+    genre_weight = np.zeros(len(genre_codes))
+    for genre, code in genre_codes.items():
+        genre_weight[code] = weights[genre]
+    class_genres = np.zeros((len(class_keys), len(genre_codes)))
+    class_types = np.array([content_type for content_type, _ in class_keys])
+    for cls, (_, genres) in enumerate(class_keys):
+        class_genres[cls, list(genres)] = 1.0
+    class_weight = class_genres @ genre_weight
+
+    need = neighbours + 1  # o próprio item sai da lista depois
+    count = len(items)
+    dense_neighbours = np.zeros((count, neighbours), dtype=np.uint32)
+    dense_scores = np.zeros((count, neighbours), dtype=np.float32)
+    degree = np.zeros(count, dtype=np.int64)
+
+    for cls, (content_type, genres) in enumerate(class_keys):
+        # Similaridade de classe (gêneros + tipo) contra todas as classes
+        intersection = class_genres @ (class_genres[cls] * genre_weight)
+        union = class_weight + class_weight[cls] - intersection
+        jaccard = np.divide(intersection, union, out=np.ones_like(union), where=union > 0)
+        base = GENRE_WEIGHT * jaccard + TYPE_WEIGHT * (class_types == content_type)
+        order = np.argsort(-base, kind="stable")
+        ordered_base = base[order].tolist()
+
+        for sig in class_signatures[cls]:
+            year = signature_years[sig]
+            candidates, threshold = [], -1.0
+            for other, other_base in zip(order.tolist(), ordered_base):
+                if other_base + YEAR_WEIGHT < threshold:
+                    break
+                for other_sig in class_signatures[other]:
+                    # Arredondado para que empates não dependam da ordem das somas
+                    score = round(other_base + YEAR_WEIGHT * year_proximity(signature_years[other_sig] - year), 9)
+                    if score >= threshold:
+                        candidates.append((score, other_sig))
+                candidates.sort(reverse=True)
+                covered = 0
+                for score, other_sig in candidates:
+                    covered += signature_offsets[other_sig + 1] - signature_offsets[other_sig]
+                    if covered >= need:
+                        threshold = score
+                        break
+                candidates = [c for c in candidates if c[0] >= threshold]
+
+            pool = []
+            for score, other_sig in candidates:
+                start = signature_offsets[other_sig]
+                end = min(signature_offsets[other_sig + 1], start + need)
+                for pos in signature_items[start:end].tolist():
+                    pool.append((-score, -ratings[pos], pos))
+            pool.sort()
+            ranked = [(pos, -score) for score, _, pos in pool[:need] if score < 0]
+
+            for pos in signature_items[signature_offsets[sig]:signature_offsets[sig + 1]].tolist():
+                row = [entry for entry in ranked if entry[0] != pos][:neighbours]
+                degree[pos] = len(row)
+                if row:
+                    row_positions, row_scores = zip(*row)
+                    dense_neighbours[pos, :len(row)] = row_positions
+                    dense_scores[pos, :len(row)] = row_scores
+
+    offsets = np.zeros(count + 1, dtype=np.uint64)
+    np.cumsum(degree, out=offsets[1:])
+    mask = np.arange(neighbours) < degree[:, None]
+    return offsets, dense_neighbours[mask], dense_scores[mask]
+
+
+def write_similarity_graph(path, graph, digest, neighbours):
+    """Grava o grafo de forma atômica (arquivo temporário + rename)"""
+    offsets, positions, scores = graph
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, neighbours, len(offsets) - 1, len(positions), digest))
+        f.write(offsets.astype("<u8").tobytes())
+        f.write(positions.astype("<u4").tobytes())
+        f.write(scores.astype("<f4").tobytes())
+    os.replace(tmp_path, path)
+
+
+class SimilarityGraph:
+    """Grafo gravado por write_similarity_graph(), acessado via mmap.
+
+    Os arrays são vistas NumPy sobre o mapeamento: nada é copiado na
+    abertura, e com WORKERS > 1 os processos compartilham as mesmas páginas.
+    Os vizinhos de um item são uma fatia contígua, O(vizinhos).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.max_neighbours, count, edges, self.catalog_digest = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path}: not a similarity graph file (version {VERSION})")
+        offset = HEADER.size
+        self.offsets = np.frombuffer(self._mm, dtype="<u8", count=count + 1, offset=offset)
+        offset += 8 * (count + 1)
+        self.positions = np.frombuffer(self._mm, dtype="<u4", count=edges, offset=offset)
+        offset += 4 * edges
+        self.scores = np.frombuffer(self._mm, dtype="<f4", count=edges, offset=offset)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def neighbours(self, pos, limit=None):
+        """Lista de (posição, score) dos itens mais similares ao da posição `pos`"""
+        start, end = int(self.offsets[pos]), int(self.offsets[pos + 1])
+        if limit is not None:
+            end = min(end, start + limit)
+        return list(zip(self.positions[start:end].tolist(), self.scores[start:end].tolist()))
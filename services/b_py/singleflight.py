@@ -0,0 +1,127 @@
+"""Coalescência de computações concorrentes por chave (single-flight)"""
+import asyncio
+import threading
+
+
+class Flight:
+    """Computação em andamento de uma chave, publicada item a item.
+
+    Cada acompanhante lê `items` a partir de onde parou; `wait()` bloqueia
+    até chegar item novo ou a computação terminar (`done`, com `error` se
+    falhou).
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self.items = []
+        self.done = False
+        self.error = None
+        self.watchers = 0
+        self._changed = threading.Condition()
+
+    def publish(self, item):
+        with self._changed:
+            self.items.append(item)
+            self._changed.notify_all()
+
+    def finish(self, error=None):
+        with self._changed:
+            self.done = True
+            self.error = error
+            self._changed.notify_all()
+
+    def wait(self, count, timeout=None):
+        """True quando há mais de `count` itens ou a computação terminou;
+        False se `timeout` segundos passaram antes disso"""
+        with self._changed:
+            return self._changed.wait_for(lambda: len(self.items) > count or self.done, timeout)
+
+
+class AsyncFlight(Flight):
+    """Flight para acompanhantes dentro de um event loop"""
+
+    def __init__(self, key):
+        super().__init__(key)
+        self._changed = asyncio.Event()
+
+    def publish(self, item):
+        self.items.append(item)
+        self._wake()
+
+    def finish(self, error=None):
+        self.done = True
+        self.error = error
+        self._wake()
+
+    def _wake(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait(self, count, timeout=None):
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while len(self.items) <= count and not self.done:
+            if deadline is None:
+                await self._changed.wait()
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return False
+            try:
+                await asyncio.wait_for(self._changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                return False
+        return True
+
+
+class FlightGroup:
+    """No máximo uma computação em andamento por chave.
+
+    `join()` devolve a computação da chave e se quem chamou é o líder (a
+    criou e deve executá-la) ou só a acompanha; todo `join()` termina em
+    `leave()`. A computação confere `abandon_unwatched()` entre uma etapa e
+    outra, para não continuar quando ninguém mais a acompanha, e chama
+    `forget()` ao terminar, depois de guardar o resultado onde as próximas
+    requisições vão encontrá-lo.
+    """
+
+    def __init__(self, flight_class=Flight):
+        self.flight_class = flight_class
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        return key in self._flights
+
+    def __len__(self):
+        return len(self._flights)
+
+    def join(self, key):
+        """(flight, líder)"""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = self.flight_class(key)
+            flight.watchers += 1
+            return flight, leader
+
+    def leave(self, flight):
+        with self._lock:
+            flight.watchers -= 1
+
+    def abandon_unwatched(self, flight):
+        """Esquece a computação e retorna True se ninguém mais a acompanha"""
+        with self._lock:
+            if flight.watchers > 0:
+                return False
+            self._forget(flight)
+            return True
+
+    def forget(self, flight):
+        with self._lock:
+            self._forget(flight)
+
+    def _forget(self, flight):
+        if self._flights.get(flight.key) is flight:
+            del self._flights[flight.key]
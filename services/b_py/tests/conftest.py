@@ -0,0 +1,25 @@
+import os
+import sys
+
+import pytest
+
+# Os testes importam os módulos do Service B como o server.py os importa
+# (na frente: o Service A tem módulos com os mesmos nomes)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import server  # noqa: E402
+from cache import TTLCache  # noqa: E402
+from singleflight import FlightGroup, AsyncFlight  # noqa: E402
+
+
+@pytest.fixture
+def service(monkeypatch):
+    """O módulo server com cache, processamentos e perfis zerados e um
+    PROCESSING_DELAY curto"""
+    monkeypatch.setattr(server, "METADATA_CACHE", TTLCache(1024, 30))
+    monkeypatch.setattr(server, "METADATA_FLIGHTS", FlightGroup())
+    monkeypatch.setattr(server, "ASYNC_METADATA_FLIGHTS", FlightGroup(AsyncFlight))
+    monkeypatch.setattr(server, "RECOMMENDER", server.Recommender(server.CONTENT_CATALOG))
+    monkeypatch.setattr(server, "PROCESSING_DELAY", 0.001)
+    return server
+
@@ -0,0 +1,52 @@
+"""StreamMetadataBatched: lotes cheios, janela de espera de um lote aberto e
+itens do cache, nos modos thread e aio"""
+import asyncio
+
+import pytest
+
+from server import services_pb2
+
+
+def request(content_id="m1", batch_size=0):
+    return services_pb2.MetadataRequest(content_id=content_id, batch_size=batch_size)
+
+
+def thread_batches(service, req):
+    return [len(batch) for batch in service.metadata_batches(req, "StreamMetadataBatched")]
+
+
+def aio_batches(service, req):
+    async def collect():
+        return [len(batch) async for batch in service.metadata_batches_async(req, "StreamMetadataBatched")]
+    return asyncio.run(collect())
+
+
+MODES = pytest.mark.parametrize("batches", [thread_batches, aio_batches], ids=["thread", "aio"])
+
+
+@MODES
+def test_full_batches(service, monkeypatch, batches):
+    monkeypatch.setattr(service, "METADATA_BATCH_WINDOW", 10.0)
+    assert batches(service, request(batch_size=3)) == [3, 3, 1]
+
+
+@MODES
+def test_open_batch_is_sent_when_the_window_closes(service, monkeypatch, batches):
+    # Itens a cada 50 ms e janela de 10 ms: cada lote sai antes do item
+    # seguinte ficar pronto
+    monkeypatch.setattr(service, "PROCESSING_DELAY", 0.05)
+    monkeypatch.setattr(service, "METADATA_BATCH_WINDOW", 0.01)
+    assert batches(service, request(batch_size=64)) == [1] * 7
+
+
+@MODES
+def test_cached_items_are_sent_in_full_batches(service, monkeypatch, batches):
+    monkeypatch.setattr(service, "METADATA_BATCH_WINDOW", 0.0)
+    list(service.metadata_items(request(), "StreamMetadata"))
+    assert batches(service, request(batch_size=64)) == [7]
+    assert batches(service, request(batch_size=4)) == [4, 3]
+
+
+def test_batch_size_is_capped(service):
+    assert service.batch_size(request(batch_size=0)) == service.METADATA_BATCH_SIZE
+    assert service.batch_size(request(batch_size=10 ** 6)) == service.MAX_METADATA_BATCH_SIZE
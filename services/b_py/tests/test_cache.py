@@ -0,0 +1,106 @@
+"""Cache de resultados do StreamMetadata (TTL + LRU) e o processamento
+compartilhado por requisições simultâneas da mesma chave"""
+import threading
+import time
+
+import cache
+from cache import TTLCache
+from server import services_pb2
+
+
+def request(content_id, user_id=""):
+    return services_pb2.MetadataRequest(content_id=content_id, user_id=user_id)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    entries = TTLCache(10, ttl=5)
+    entries.put("k", [1])
+    clock.now += 4.9
+    assert entries.get("k") == ([1], False)
+    clock.now += 0.1
+    assert entries.get("k") == (None, True)
+    assert len(entries) == 0
+    assert entries.get("k") == (None, False)
+
+
+def test_zero_ttl_keeps_entries(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    entries = TTLCache(10, ttl=0)
+    entries.put("k", [1])
+    clock.now += 1e6
+    assert entries.get("k") == ([1], False)
+
+
+def test_least_recently_used_is_evicted():
+    entries = TTLCache(2, ttl=30)
+    assert entries.put("a", 1) == 0
+    entries.put("b", 2)
+    entries.get("a")
+    assert entries.put("c", 3) == 1
+    assert entries.get("b") == (None, False)
+    assert entries.get("a") == (1, False)
+    assert entries.get("c") == (3, False)
+
+
+def test_zero_size_disables_cache():
+    entries = TTLCache(0, ttl=30)
+    assert entries.put("k", 1) == 0
+    assert entries.get("k") == (None, False)
+
+
+def test_stream_result_is_cached(service, monkeypatch):
+    calls = []
+    entries = service.metadata_entries
+    monkeypatch.setattr(service, "metadata_entries", lambda *args: calls.append(args) or entries(*args))
+    first = list(service.metadata_items(request("m1"), "StreamMetadata"))
+    assert len(first) == 7  # director, cast e 5 recomendações
+    assert list(service.metadata_items(request("m1"), "StreamMetadata")) == first
+    # Anônimos ("" e "guest") compartilham a entrada
+    assert list(service.metadata_items(request("m1", "guest"), "StreamMetadata")) == first
+    assert len(calls) == 1
+    list(service.metadata_items(request("m1", "u1"), "StreamMetadata"))
+    assert len(calls) == 2
+
+
+def test_expired_result_is_recomputed(service, monkeypatch):
+    monkeypatch.setattr(service, "METADATA_CACHE", TTLCache(1024, ttl=0.05))
+    calls = []
+    entries = service.metadata_entries
+    monkeypatch.setattr(service, "metadata_entries", lambda *args: calls.append(args) or entries(*args))
+    list(service.metadata_items(request("s1"), "StreamMetadata"))
+    time.sleep(0.06)
+    list(service.metadata_items(request("s1"), "StreamMetadata"))
+    assert len(calls) == 2
+
+
+def test_concurrent_requests_share_one_processing(service, monkeypatch):
+    monkeypatch.setattr(service, "PROCESSING_DELAY", 0.02)
+    calls = []
+    entries = service.metadata_entries
+    monkeypatch.setattr(service, "metadata_entries", lambda *args: calls.append(args) or entries(*args))
+    results = [None] * 8
+    start = threading.Barrier(len(results))
+
+    def stream(i):
+        start.wait()
+        results[i] = list(service.metadata_items(request("m2"), "StreamMetadata"))
+
+    threads = [threading.Thread(target=stream, args=(i,)) for i in range(len(results))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert all(result == results[0] and len(result) == 7 for result in results)
+    assert len(service.METADATA_FLIGHTS) == 0
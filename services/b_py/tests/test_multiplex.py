@@ -0,0 +1,192 @@
+"""MultiplexMetadata: consultas independentes numa chamada, nos dois modos do
+servidor, pelo stub e pelo MultiplexedMetadataClient"""
+import asyncio
+import threading
+from concurrent import futures
+
+import grpc
+import pytest
+
+from metadata_client import MetadataLookupError, MultiplexedMetadataClient, _MultiplexedCall
+from server import AsyncServiceBImpl, ServiceBImpl, services_pb2, services_pb2_grpc
+
+CONTENT_IDS = ["m1", "m2", "s1", "s4", "ch1", "desconhecido"]
+
+
+def lookup(correlation_id, content_id):
+    return services_pb2.MetadataLookup(
+        correlation_id=correlation_id, request=services_pb2.MetadataRequest(content_id=content_id))
+
+
+def expected_items(service, content_id):
+    """Itens do StreamMetadata para a mesma chave (anônima: não altera perfis)"""
+    items = service.metadata_items(services_pb2.MetadataRequest(content_id=content_id), "StreamMetadata")
+    return [(item.key, item.value) for item in items]
+
+
+@pytest.fixture
+def thread_server(service):
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=8))
+    services_pb2_grpc.add_ServiceBServicer_to_server(ServiceBImpl(), server)
+    port = server.add_insecure_port("localhost:0")
+    server.start()
+    yield f"localhost:{port}"
+    server.stop(None)
+
+
+@pytest.fixture
+def thread_stub(thread_server):
+    with grpc.insecure_channel(thread_server) as channel:
+        yield services_pb2_grpc.ServiceBStub(channel)
+
+
+def collect(results):
+    """correlation_id -> (itens, error) das mensagens recebidas"""
+    lookups = {}
+    for result in results:
+        items, _ = lookups.setdefault(result.correlation_id, ([], None))
+        items.extend((item.key, item.value) for item in result.items)
+        if result.done:
+            assert lookups[result.correlation_id][1] is None, "done repetido"
+            lookups[result.correlation_id] = (items, result.error)
+    return lookups
+
+
+def test_every_lookup_gets_its_own_items(service, thread_stub):
+    requests = [lookup(i, CONTENT_IDS[i % len(CONTENT_IDS)]) for i in range(1, 41)]
+    lookups = collect(thread_stub.MultiplexMetadata(iter(requests)))
+    assert sorted(lookups) == list(range(1, 41))
+    for correlation_id, (items, error) in lookups.items():
+        assert error == ""
+        assert items == expected_items(service, CONTENT_IDS[correlation_id % len(CONTENT_IDS)])
+
+
+def test_failed_lookup_does_not_end_the_call(service, thread_stub, monkeypatch):
+    entries = service.metadata_entries
+
+    def failing(content_id, user_id=""):
+        if content_id == "m2":
+            raise RuntimeError("falhou")
+        return entries(content_id, user_id)
+
+    monkeypatch.setattr(service, "metadata_entries", failing)
+    lookups = collect(thread_stub.MultiplexMetadata(iter([lookup(1, "m1"), lookup(2, "m2"), lookup(3, "s1")])))
+    assert "falhou" in lookups[2][1]
+    assert lookups[1][1] == lookups[3][1] == ""
+    assert len(lookups[1][0]) == len(lookups[3][0]) == 7
+
+
+def test_inflight_lookups_per_call_are_capped(service, thread_stub, monkeypatch):
+    monkeypatch.setattr(service, "MULTIPLEX_MAX_INFLIGHT", 2)
+    monkeypatch.setattr(service, "PROCESSING_DELAY", 0.005)
+    lock, running, peak = threading.Lock(), [0], [0]
+    results = service.lookup_results
+
+    def counted(request):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        try:
+            yield from results(request)
+        finally:
+            with lock:
+                running[0] -= 1
+
+    monkeypatch.setattr(service, "lookup_results", counted)
+    requests = [lookup(i, f"x{i}") for i in range(1, 13)]
+    lookups = collect(thread_stub.MultiplexMetadata(iter(requests)))
+    assert len(lookups) == 12
+    assert peak[0] <= 2
+
+
+def test_client_over_aio_server(service):
+    async def scenario():
+        server = grpc.aio.server()
+        services_pb2_grpc.add_ServiceBServicer_to_server(AsyncServiceBImpl(), server)
+        port = server.add_insecure_port("localhost:0")
+        await server.start()
+        try:
+            async with grpc.aio.insecure_channel(f"localhost:{port}") as channel:
+                async with MultiplexedMetadataClient(channel, streams=2) as client:
+                    ids = CONTENT_IDS * 4
+                    found = await asyncio.gather(*(client.lookup(content_id) for content_id in ids))
+                    in_use = [call for call in client._calls if call is not None]
+                    return ids, found, len(in_use)
+        finally:
+            await server.stop(None)
+
+    ids, found, calls = asyncio.run(scenario())
+    assert calls == 2
+    for content_id, items in zip(ids, found):
+        assert [(item.key, item.value) for item in items] == expected_items(service, content_id)
+
+
+def test_client_raises_lookup_errors(service, thread_server, monkeypatch):
+    monkeypatch.setattr(service, "metadata_entries", lambda *args: 1 / 0)
+
+    async def scenario():
+        async with grpc.aio.insecure_channel(thread_server) as channel:
+            async with MultiplexedMetadataClient(channel, streams=1) as client:
+                with pytest.raises(MetadataLookupError):
+                    await client.lookup("m1")
+
+    asyncio.run(scenario())
+
+
+class BrokenCall:
+    """Chamada cuja leitura falha com `error` depois de `delay` segundos"""
+
+    def __init__(self, error, delay=0.01):
+        self.error = error
+        self.delay = delay
+        self.cancelled = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        await asyncio.sleep(self.delay)
+        raise self.error
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class BrokenStub:
+    def __init__(self, call):
+        self.call = call
+
+    def MultiplexMetadata(self, requests):
+        return self.call
+
+
+def test_unexpected_reader_error_fails_pending_lookups():
+    async def scenario():
+        call = BrokenCall(RuntimeError("quebrou"))
+        multiplexed = _MultiplexedCall(BrokenStub(call))
+        pending = [multiplexed.send(i, services_pb2.MetadataRequest(content_id="m1")) for i in (1, 2)]
+        with pytest.raises(RuntimeError):
+            await multiplexed._reader
+        return call, multiplexed, [results.get_nowait() for results in pending]
+
+    call, multiplexed, errors = asyncio.run(scenario())
+    assert call.cancelled and multiplexed.closed
+    for error in errors:
+        assert isinstance(error, ConnectionError)
+        assert isinstance(error.__cause__, RuntimeError)
+
+
+def test_cancelled_reader_fails_pending_lookups():
+    async def scenario():
+        call = BrokenCall(RuntimeError("nunca chega"), delay=60)
+        multiplexed = _MultiplexedCall(BrokenStub(call))
+        results = multiplexed.send(1, services_pb2.MetadataRequest(content_id="m1"))
+        await asyncio.sleep(0)
+        multiplexed._reader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await multiplexed._reader
+        return call, await asyncio.wait_for(results.get(), 1)
+
+    call, error = asyncio.run(scenario())
+    assert call.cancelled
+    assert isinstance(error, ConnectionError)
@@ -1,46 +1,98 @@
-from fastapi import FastAPI
-from fastapi.responses import JSONResponse
-import time
+from fastapi import FastAPI, Header, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+import asyncio
+import json
+import os
+import sys
+
+# Recomendações e grafo de similares do Service B (services/b_py); na
+# imagem ficam junto do main.py (ver Dockerfile)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "b_py"))
+from recommender import CONTENT_CATALOG, Recommender, load_catalog_file  # noqa: E402
+from similarity import SimilarityGraph, catalog_digest  # noqa: E402
 
 app = FastAPI(title="B-REST-Streaming")
 
-# Base de metadados e recomendações
+# Metadados fixos por conteúdo (os mesmos do Service B); as recomendações
+# vêm do Recommender
 METADATA_DB = {
-    "m1": [{"key": "director", "value": "James Cameron", "score": 0.95}, 
-           {"key": "cast", "value": "Chris Evans, Zoe Saldana", "score": 0.90}, 
-           {"key": "similar", "value": "Interestelar", "score": 0.85}],
-    "m2": [{"key": "director", "value": "Christopher Nolan", "score": 0.95}, 
-           {"key": "cast", "value": "Leonardo DiCaprio", "score": 0.90},
-           {"key": "similar", "value": "Amnésia", "score": 0.88}],
-    "m3": [{"key": "director", "value": "Nancy Meyers", "score": 0.92}, 
-           {"key": "cast", "value": "Julia Roberts, Tom Hanks", "score": 0.88},
-           {"key": "similar", "value": "Amor à Segunda Vista", "score": 0.85}],
-    "m4": [{"key": "director", "value": "Ridley Scott", "score": 0.94}, 
-           {"key": "cast", "value": "Tom Hardy, Charlize Theron", "score": 0.91},
-           {"key": "similar", "value": "Mad Max", "score": 0.90}],
-    "s1": [{"key": "creator", "value": "J.J. Abrams", "score": 0.96}, 
-           {"key": "cast", "value": "Millie Bobby Brown", "score": 0.92},
-           {"key": "similar", "value": "Dark", "score": 0.90}],
-    "s2": [{"key": "creator", "value": "Vince Gilligan", "score": 0.95}, 
-           {"key": "cast", "value": "Bryan Cranston", "score": 0.93},
-           {"key": "similar", "value": "True Detective", "score": 0.89}],
+    "m1": [("director", "James Cameron", 0.95), ("cast", "Chris Evans, Zoe Saldana", 0.90)],
+    "m2": [("director", "Christopher Nolan", 0.95), ("cast", "Leonardo DiCaprio", 0.90)],
+    "m3": [("director", "Nancy Meyers", 0.92), ("cast", "Julia Roberts, Tom Hanks", 0.88)],
+    "m4": [("director", "Ridley Scott", 0.94), ("cast", "Tom Hardy, Charlize Theron", 0.91)],
+    "s1": [("creator", "J.J. Abrams", 0.96), ("cast", "Millie Bobby Brown", 0.92)],
+    "s2": [("creator", "Vince Gilligan", 0.95), ("cast", "Bryan Cranston", 0.93)],
+    "s3": [("creator", "Greg Garcia", 0.90), ("cast", "Amy Poehler", 0.87)],
+    "s4": [("creator", "David Chase", 0.97), ("cast", "James Gandolfini", 0.95)],
+}
+
+# Mesmas variáveis do Service B, para que as duas pilhas devolvam os mesmos
+# itens: CATALOG_PATH, SIMILARITY_GRAPH_PATH, RECOMMENDATIONS, SIMILAR_ITEMS
+RECOMMENDATIONS = int(os.environ.get("RECOMMENDATIONS", "5"))
+MAX_USER_PROFILES = int(os.environ.get("MAX_USER_PROFILES", "100000"))
+SIMILAR_ITEMS = int(os.environ.get("SIMILAR_ITEMS", "5"))
+
+_catalog = load_catalog_file(os.environ["CATALOG_PATH"]) if os.environ.get("CATALOG_PATH") else CONTENT_CATALOG
+RECOMMENDER = Recommender(_catalog, MAX_USER_PROFILES)
+SIMILARITY_GRAPH = None
+if os.environ.get("SIMILARITY_GRAPH_PATH"):
+    SIMILARITY_GRAPH = SimilarityGraph(os.environ["SIMILARITY_GRAPH_PATH"])
+    if SIMILARITY_GRAPH.catalog_digest != catalog_digest(_catalog):
+        raise ValueError(f"{SIMILARITY_GRAPH.path} was built from a different catalog")
+del _catalog
+
+# Latência simulada por item do stream, em segundos (a mesma do
+# StreamMetadata do Service B)
+PROCESSING_DELAY = float(os.environ.get("PROCESSING_DELAY", "0.01"))
+
+STREAM_FORMATS = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+STREAM_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",  # proxies (nginx/ingress) não seguram os eventos
 }
 
+
+def metadata_for(content_id, user_id="guest"):
+    """Os mesmos itens do StreamMetadata do Service B: metadados fixos,
+    similares (se houver grafo) e recomendações para o usuário"""
+    entries = list(METADATA_DB.get(content_id, []))
+    pos = RECOMMENDER.position(content_id)
+    if SIMILARITY_GRAPH is not None and pos is not None:
+        for neighbour, score in SIMILARITY_GRAPH.neighbours(pos, SIMILAR_ITEMS):
+            entries.append(("similar", RECOMMENDER.content_id(neighbour), round(score, 4)))
+    for pos, score in RECOMMENDER.recommend(content_id, user_id, RECOMMENDATIONS):
+        entries.append(("recommendation", RECOMMENDER.title(pos), round(score, 4)))
+    RECOMMENDER.observe(content_id, user_id)
+    return [{"key": key, "value": value, "score": score} for key, value, score in entries]
+
+
+def encode(value):
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+async def ndjson_stream(items):
+    """Uma linha JSON por item, enviada assim que o item fica pronto"""
+    for item in items:
+        await asyncio.sleep(PROCESSING_DELAY)  # Simula processamento sem ocupar thread
+        yield (encode(item) + "\n").encode("utf-8")
+
+
+async def sse_stream(items, first):
+    """Um evento `item` por item, com `id` para o cliente retomar
+    (Last-Event-ID), e um evento `end` ao terminar"""
+    for index in range(first, len(items)):
+        await asyncio.sleep(PROCESSING_DELAY)  # Simula processamento sem ocupar thread
+        yield f"id: {index}\nevent: item\ndata: {encode(items[index])}\n\n".encode("utf-8")
+    yield f"event: end\ndata: {encode({'total': len(items)})}\n\n".encode("utf-8")
+
+
 @app.get("/api/metadata/{content_id}")
-def get_metadata(content_id: str, userId: str = "guest"):
+async def get_metadata(content_id: str, userId: str = "guest"):
     """Retorna metadados e recomendações para um conteúdo"""
-    metadata = METADATA_DB.get(content_id, [])
+    metadata = metadata_for(content_id, userId)
     
     # Simula processamento
-    time.sleep(0.05)
-    
-    # Se não houver metadados, retorna recomendações genéricas
-    if not metadata:
-        metadata = [
-            {"key": "recommendation", "value": f"Conteúdo recomendado #1", "score": 0.7},
-            {"key": "recommendation", "value": f"Conteúdo recomendado #2", "score": 0.6},
-            {"key": "recommendation", "value": f"Conteúdo recomendado #3", "score": 0.5},
-        ]
+    await asyncio.sleep(0.05)
     
     return JSONResponse({
         "content_id": content_id,
@@ -49,3 +101,29 @@ def get_metadata(content_id: str, userId: str = "guest"):
         "source": "B-REST"
     })
 
+
+@app.get("/api/metadata/{content_id}/stream")
+async def stream_metadata(content_id: str, userId: str = "guest",
+                          stream_format: str = Query(None, alias="format"),
+                          accept: str = Header(default=""),
+                          last_event_id: str = Header(default=None)):
+    """Equivalente REST do StreamMetadata: envia cada item assim que é
+    produzido, em NDJSON (padrão) ou Server-Sent Events (`format=sse` ou
+    `Accept: text/event-stream`).
+
+    A espera por item é um `asyncio.sleep`, então cada stream aberto custa
+    só uma corrotina; se o cliente desconecta, o gerador é cancelado.
+    """
+    if stream_format is None:
+        stream_format = "sse" if "text/event-stream" in accept else "ndjson"
+    if stream_format not in STREAM_FORMATS:
+        return JSONResponse({"error": f"format deve ser um de: {', '.join(STREAM_FORMATS)}"},
+                            status_code=400)
+
+    metadata = metadata_for(content_id, userId)
+    if stream_format == "sse":
+        first = int(last_event_id) + 1 if last_event_id and last_event_id.isdigit() else 0
+        body = sse_stream(metadata, first)
+    else:
+        body = ndjson_stream(metadata)
+    return StreamingResponse(body, media_type=STREAM_FORMATS[stream_format], headers=STREAM_HEADERS)
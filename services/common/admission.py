@@ -0,0 +1,263 @@
+"""Controle de admissão dos serviços gRPC: limite de concorrência adaptativo
+(AIMD pela espera na fila, seguro para uso entre threads) e os interceptors
+que recusam com RESOURCE_EXHAUSTED o que passa do limite"""
+import asyncio
+import inspect
+import os
+import threading
+import time
+import weakref
+
+import grpc
+from prometheus_client import Counter, Gauge
+
+CONCURRENCY_LIMIT = Gauge(
+    'grpc_server_concurrency_limit',
+    'Limit of requests admitted at the same time (adaptive in thread mode, MAX_CONCURRENT_RPCS in aio mode)',
+    multiprocess_mode='livesum'
+)
+
+INFLIGHT_REQUESTS = Gauge(
+    'grpc_server_inflight_requests',
+    'Requests admitted by the concurrency limit and not finished yet',
+    multiprocess_mode='livesum'
+)
+
+REJECTED_REQUESTS = Counter(
+    'grpc_server_rejected_requests_total',
+    'Requests rejected with RESOURCE_EXHAUSTED because the concurrency limit was reached',
+    ['method']
+)
+
+
+class AIMDLimiter:
+    """Quantas requisições podem estar admitidas (na fila ou em execução) ao mesmo tempo.
+
+    O sinal de congestionamento é quanto uma requisição admitida esperou
+    até começar a ser atendida (`observe_delay()`), não a latência total:
+    ela varia com o tipo de requisição, a espera só cresce quando há mais
+    trabalho admitido do que o servidor dá conta. Enquanto a espera fica
+    abaixo de `target_delay` e há demanda (ao menos metade do limite em uso),
+    o limite cresce aditivamente, cerca de uma vaga a cada `limit` amostras;
+    acima dela, cai multiplicativamente (× `backoff`), no máximo uma vez a
+    cada `interval` segundos, tempo para a fila refletir o corte.
+
+    `try_acquire()` reserva uma vaga ou retorna False se o limite foi
+    atingido; toda reserva bem-sucedida termina em `release()`.
+    """
+
+    def __init__(self, initial=20, min_limit=10, max_limit=1000, target_delay=0.01,
+                 backoff=0.8, interval=0.1):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_delay = target_delay
+        self.backoff = backoff
+        self.interval = interval
+        self._estimate = float(min(max(initial, min_limit), max_limit))
+        self._last_decrease = float("-inf")
+        self.inflight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def limit(self):
+        return int(self._estimate)
+
+    def try_acquire(self):
+        with self._lock:
+            if self.inflight >= int(self._estimate):
+                return False
+            self.inflight += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.inflight -= 1
+
+    def observe_delay(self, delay):
+        """Ajusta o limite pela espera (segundos) de uma requisição admitida"""
+        with self._lock:
+            if delay > self.target_delay:
+                now = time.monotonic()
+                if now - self._last_decrease >= self.interval:
+                    self._estimate = max(self.min_limit, self._estimate * self.backoff)
+                    self._last_decrease = now
+            elif self.inflight >= self._estimate / 2:
+                self._estimate = min(self.max_limit, self._estimate + 1 / self._estimate)
+
+
+def admission_limiter():
+    """Limitador de concorrência configurado pelo ambiente; None sem
+    CONCURRENCY_LIMIT (ou com 0), o padrão"""
+    initial = int(os.environ.get("CONCURRENCY_LIMIT", "0"))
+    if initial <= 0:
+        return None
+    limiter = AIMDLimiter(
+        initial,
+        min_limit=int(os.environ.get("CONCURRENCY_LIMIT_MIN", "10")),
+        max_limit=int(os.environ.get("CONCURRENCY_LIMIT_MAX", "1000")),
+        target_delay=float(os.environ.get("CONCURRENCY_TARGET_DELAY", "0.01")),
+    )
+    CONCURRENCY_LIMIT.set(limiter.limit)
+    return limiter
+
+
+def with_behavior(handler, behavior):
+    """O mesmo handler (serialização incluída) com outro comportamento"""
+    if handler.response_streaming:
+        return grpc.unary_stream_rpc_method_handler(
+            behavior,
+            request_deserializer=handler.request_deserializer,
+            response_serializer=handler.response_serializer,
+        )
+    return grpc.unary_unary_rpc_method_handler(
+        behavior,
+        request_deserializer=handler.request_deserializer,
+        response_serializer=handler.response_serializer,
+    )
+
+
+class AdmissionControl:
+    """Admite as RPCs pelo limite adaptativo (`limiter`, se houver); as
+    excedentes são recusadas com RESOURCE_EXHAUSTED na hora, em vez de
+    esperar numa fila que só aumenta a latência de todas.
+
+    Recusas também contam como erro em `request_count` (o Counter
+    grpc_server_requests_total do serviço). Chamadas com stream de entrada
+    ficam de fora: duram o quanto o cliente
+    quiser. A vaga é liberada quando o handler termina ou, se ele nem chegar
+    a rodar (cliente que cancela enquanto a RPC espera), quando o gRPC
+    descarta o handler.
+    """
+
+    def __init__(self, request_count, limiter=None):
+        self.request_count = request_count
+        self.limiter = limiter
+
+    def admit(self, handler_call_details, overloaded=False):
+        """Função que libera a vaga, ou None se a RPC foi recusada"""
+        if overloaded or (self.limiter is not None and not self.limiter.try_acquire()):
+            method = handler_call_details.method.rsplit("/", 1)[-1]
+            REJECTED_REQUESTS.labels(method=method).inc()
+            self.request_count.labels(method=method, status='error').inc()
+            return None
+        INFLIGHT_REQUESTS.inc()
+        released = False
+
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                if self.limiter is not None:
+                    self.limiter.release()
+                INFLIGHT_REQUESTS.dec()
+        return release
+
+    def observe_delay(self, delay):
+        self.limiter.observe_delay(delay)
+        CONCURRENCY_LIMIT.set(self.limiter.limit)
+
+
+class ThreadAdmissionControl(AdmissionControl, grpc.ServerInterceptor):
+    """Controle de admissão do servidor com pool de threads.
+
+    A admissão acontece na thread que recebe as chamadas, antes de a RPC
+    entrar na fila do ThreadPoolExecutor; o tempo até o handler começar é a
+    espera nessa fila, o sinal de congestionamento do limitador. As recusas
+    também passam pelo pool, mas a fila à frente delas fica limitada.
+    """
+
+    def intercept_service(self, continuation, handler_call_details):
+        handler = continuation(handler_call_details)
+        if handler is None or handler.request_streaming:
+            return handler
+        release = self.admit(handler_call_details)
+        if release is None:
+            def reject(request, context):
+                context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, "Concurrency limit reached, retry later")
+            return with_behavior(handler, reject)
+
+        admitted = time.monotonic()
+        if handler.response_streaming:
+            behavior = handler.unary_stream
+
+            def admitted_behavior(request, context):
+                self.observe_delay(time.monotonic() - admitted)
+                try:
+                    yield from behavior(request, context)
+                finally:
+                    release()
+        else:
+            behavior = handler.unary_unary
+
+            def admitted_behavior(request, context):
+                self.observe_delay(time.monotonic() - admitted)
+                try:
+                    return behavior(request, context)
+                finally:
+                    release()
+        weakref.finalize(admitted_behavior, release)
+        return with_behavior(handler, admitted_behavior)
+
+
+class AsyncAdmissionControl(AdmissionControl, grpc.aio.ServerInterceptor):
+    """Controle de admissão do servidor grpc.aio.
+
+    Aqui não há limite de RPCs em andamento: a maior parte delas só espera
+    (streams entre um item e outro, writes aguardando o cliente) sem ocupar
+    thread nenhuma, e milhares abertas ao mesmo tempo são o caso normal; o
+    teto é o MAX_CONCURRENT_RPCS do servidor. Quando o servidor não dá
+    conta, as RPCs esperam pelo event loop, antes mesmo de chegar ao
+    interceptor, então o sinal de sobrecarga é o atraso do loop, medido por
+    watch_loop_lag() (que precisa estar rodando no loop do servidor):
+    enquanto ele fica acima de `target_delay` por mais de `interval` segundos
+    seguidos, toda RPC nova é recusada.
+    """
+
+    def __init__(self, request_count, target_delay=0.01, interval=0.1):
+        super().__init__(request_count)
+        self.target_delay = target_delay
+        self.interval = interval
+        self.loop_lag = 0.0
+        self.overloaded = False
+
+    async def watch_loop_lag(self, interval=0.01):
+        loop = asyncio.get_running_loop()
+        congested_since = None
+        while True:
+            start = loop.time()
+            await asyncio.sleep(interval)
+            now = loop.time()
+            self.loop_lag = now - start - interval
+            if self.loop_lag <= self.target_delay:
+                congested_since = None
+            elif congested_since is None:
+                congested_since = now
+            self.overloaded = congested_since is not None and now - congested_since >= self.interval
+
+    async def intercept_service(self, continuation, handler_call_details):
+        handler = await continuation(handler_call_details)
+        if handler is None or handler.request_streaming:
+            return handler
+        release = self.admit(handler_call_details, self.overloaded)
+        if release is None:
+            async def reject(request, context):
+                await context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, "Concurrency limit reached, retry later")
+            return with_behavior(handler, reject)
+
+        behavior = handler.unary_stream if handler.response_streaming else handler.unary_unary
+        if inspect.isasyncgenfunction(behavior):
+            async def admitted_behavior(request, context):
+                try:
+                    async for response in behavior(request, context):
+                        yield response
+                finally:
+                    release()
+        else:
+            # Respostas únicas e streams escritos com context.write()
+            async def admitted_behavior(request, context):
+                try:
+                    return await behavior(request, context)
+                finally:
+                    release()
+        weakref.finalize(admitted_behavior, release)
+        return with_behavior(handler, admitted_behavior)
@@ -0,0 +1,30 @@
+"""Prazo e cancelamento das chamadas gRPC: o trabalho para assim que
+ninguém mais espera pelo resultado"""
+
+
+class Abandoned(Exception):
+    """O resultado não seria aproveitado: o cliente cancelou ou o prazo não basta"""
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+def expired(context):
+    remaining = context.time_remaining()
+    return remaining is not None and remaining <= 0
+
+
+def check_deadline(context, needed=0.0):
+    """Levanta Abandoned se ninguém espera mais pelo resultado ou se o prazo
+    restante não cobre `needed` segundos de trabalho.
+
+    O contexto do grpc.aio não tem is_active(); lá o cancelamento chega como
+    CancelledError no próximo await, e aqui só o prazo é conferido.
+    """
+    remaining = context.time_remaining()
+    if remaining is not None and remaining <= needed:
+        raise Abandoned("deadline")
+    is_active = getattr(context, "is_active", None)
+    if is_active is not None and not is_active():
+        raise Abandoned("cancelled")
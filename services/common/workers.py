@@ -0,0 +1,42 @@
+"""Vários processos servindo a mesma porta gRPC (WORKERS > 1)"""
+import multiprocessing
+import multiprocessing.connection
+
+from prometheus_client import CollectorRegistry, multiprocess, start_http_server
+
+
+def serve_workers(run_server, port, metrics_port, workers):
+    """Sobe `workers` processos executando `run_server(port)`, que
+    compartilham a porta gRPC via SO_REUSEPORT.
+
+    O processo pai não atende RPCs: só expõe /metrics agregando os arquivos
+    de todos os workers (MultiProcessCollector) e recria workers que morrem.
+    Os workers são criados com fork antes de qualquer servidor ou canal gRPC
+    existir no pai, que é o cenário suportado pelo gRPC.
+    """
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    start_http_server(metrics_port, registry=registry)
+    print(f"Metrics server started on :{metrics_port} ({workers} workers)", flush=True)
+    
+    ctx = multiprocessing.get_context("fork")
+    
+    def spawn():
+        process = ctx.Process(target=run_server, args=(port,), daemon=True)
+        process.start()
+        return process
+    
+    processes = [spawn() for _ in range(workers)]
+    try:
+        while True:
+            multiprocessing.connection.wait([p.sentinel for p in processes])
+            for i, process in enumerate(processes):
+                if not process.is_alive():
+                    print(f"Worker {process.pid} exited ({process.exitcode}), restarting", flush=True)
+                    multiprocess.mark_process_dead(process.pid)
+                    processes[i] = spawn()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()